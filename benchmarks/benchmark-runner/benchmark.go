@@ -4,10 +4,12 @@ import (
 	"fmt"
 	"io/ioutil"
 	"log"
+	"math"
 	"net/http"
 	"os"
 	"os/exec"
 	"runtime"
+	"sort"
 	"strings"
 	"syscall"
 	"time"
@@ -26,13 +28,29 @@ type HttpBenchStage struct {
 	ParallelClients int
 	Duration        time.Duration
 	KeepResults     bool
+	KeepAlive       bool // Reuse the connections between requests instead of opening a new one each time
+}
+
+// LatencySummary of the requests of a stage, in milliseconds
+type LatencySummary struct {
+	Mean float64 `json:"mean"`
+	P50  float64 `json:"p50"`
+	P99  float64 `json:"p99"`
+	P999 float64 `json:"p99.9"`
+	Max  float64 `json:"max"`
 }
 
 type HttpBenchResult struct {
-	Name       string
-	ExecTime   time.Duration
-	Operations int64
-	MaxRSS     int64
+	Name        string         `json:"name"`
+	TestCase    string         `json:"testCase"`
+	KeepAlive   bool           `json:"keepAlive"`
+	Concurrency int            `json:"concurrency"`
+	ExecTime    time.Duration  `json:"execTimeNs"`
+	Operations  int64          `json:"operations"`
+	Errors      int64          `json:"errors"`
+	ReqPerSec   float64        `json:"reqPerSec"`
+	LatencyMs   LatencySummary `json:"latencyMs"`
+	MaxRSS      int64          `json:"maxRssKB"`
 }
 
 type HttpBench struct {
@@ -40,7 +58,8 @@ type HttpBench struct {
 	Stages         []HttpBenchStage
 	StartupTimeout time.Duration
 	cmd            *exec.Cmd
-	client         *http.Client
+	client         *http.Client // Keep-alive client
+	closeClient    *http.Client // Client opening a new connection for every request
 }
 
 func NewHttpBench(cfg *HttpBenchConfig, stages []HttpBenchStage) *HttpBench {
@@ -49,11 +68,15 @@ func NewHttpBench(cfg *HttpBenchConfig, stages []HttpBenchStage) *HttpBench {
 	transport.MaxIdleConnsPerHost = 100000
 	transport.MaxConnsPerHost = 0
 
+	closeTransport := transport
+	closeTransport.DisableKeepAlives = true
+
 	return &HttpBench{
 		Cfg:            cfg,
 		Stages:         stages,
 		StartupTimeout: 5 * time.Second,
 		client:         &http.Client{Transport: &transport},
+		closeClient:    &http.Client{Transport: &closeTransport},
 	}
 }
 
@@ -83,13 +106,18 @@ func (b *HttpBench) stopServer() {
 	log.Print("Server stopped")
 }
 
+type workerResult struct {
+	errors    int64
+	latencies []time.Duration // Of the successful requests
+}
+
 func (b *HttpBench) parallelExec(n int, execTime time.Duration, f func(id int) bool) HttpBenchResult {
 	starts := make(chan struct{}, n)
 	stops := make(chan struct{}, n)
-	results := make(chan int64, n)
+	results := make(chan workerResult, n)
 
-	worker := func(id int, start <-chan struct{}, stop <-chan struct{}, result chan<- int64) {
-		count := int64(0)
+	worker := func(id int, start <-chan struct{}, stop <-chan struct{}, result chan<- workerResult) {
+		res := workerResult{latencies: make([]time.Duration, 0, 1024)}
 		<-start
 	mainLoop:
 		for {
@@ -97,12 +125,15 @@ func (b *HttpBench) parallelExec(n int, execTime time.Duration, f func(id int) b
 			case <-stop:
 				break mainLoop
 			default:
+				begin := time.Now()
 				if f(id) {
-					count++
+					res.latencies = append(res.latencies, time.Since(begin))
+				} else {
+					res.errors++
 				}
 			}
 		}
-		result <- count
+		result <- res
 	}
 
 	//  Create the workers
@@ -121,79 +152,95 @@ func (b *HttpBench) parallelExec(n int, execTime time.Duration, f func(id int) b
 	}
 	actualExecTime := endExec.Sub(startExec)
 	// Aggregate the results
-	total := int64(0)
+	errors := int64(0)
+	latencies := make([]time.Duration, 0)
 	for i := 0; i < n; i++ {
-		total += <-results
+		res := <-results
+		errors += res.errors
+		latencies = append(latencies, res.latencies...)
 	}
 
 	return HttpBenchResult{
-		ExecTime:   actualExecTime,
-		Operations: total,
+		Concurrency: n,
+		ExecTime:    actualExecTime,
+		Operations:  int64(len(latencies)),
+		Errors:      errors,
+		ReqPerSec:   float64(len(latencies)) / actualExecTime.Seconds(),
+		LatencyMs:   summarizeLatencies(latencies),
+	}
+}
+
+func summarizeLatencies(latencies []time.Duration) LatencySummary {
+	if len(latencies) == 0 {
+		return LatencySummary{}
+	}
+	sort.Slice(latencies, func(i, j int) bool { return latencies[i] < latencies[j] })
+	toMs := func(d time.Duration) float64 {
+		return float64(d.Nanoseconds()) / 1e6
+	}
+	// Nearest-rank percentile
+	percentile := func(p float64) float64 {
+		rank := int(math.Ceil(p*float64(len(latencies)))) - 1
+		if rank < 0 {
+			rank = 0
+		}
+		return toMs(latencies[rank])
+	}
+	total := time.Duration(0)
+	for _, latency := range latencies {
+		total += latency
+	}
+	return LatencySummary{
+		Mean: toMs(total) / float64(len(latencies)),
+		P50:  percentile(0.5),
+		P99:  percentile(0.99),
+		P999: percentile(0.999),
+		Max:  toMs(latencies[len(latencies)-1]),
 	}
 }
 
-func (b *HttpBench) fire(url string) (body []byte, ok bool) {
-	res, err := http.Get(url)
+func (b *HttpBench) fire(client *http.Client, baseURL string, testCase *TestCase) (status int, body []byte, ok bool) {
+	req, err := testCase.NewRequest(baseURL)
+	if err != nil {
+		return 0, []byte{}, false
+	}
+	res, err := client.Do(req)
 	if err != nil {
-		return []byte{}, false
+		return 0, []byte{}, false
 	}
 	defer res.Body.Close()
 	body, err = ioutil.ReadAll(res.Body)
-	ok = (err == nil)
-	return
+	return res.StatusCode, body, err == nil
 }
 
-func (b *HttpBench) Run(testCase *TestCase) (results []HttpBenchResult, ok bool) {
-	b.startServer()
-
-	url := fmt.Sprint("http://127.0.0.1:", b.Cfg.Port, testCase.Route)
-
-	// Wait for server readiness + check Reply
-	ready := func() bool {
-		timeout := time.After(b.StartupTimeout)
-		tick := time.Tick(500 * time.Millisecond)
-		for {
-			select {
-			case <-timeout:
-				b.cmd.Process.Kill()
-				log.Printf("The server is taking too long to start !!!\n--- Stdout:\n%s\n--- Stderr:\n%s",
-						b.cmd.Stdout.(*strings.Builder).String(),
-						b.cmd.Stderr.(*strings.Builder).String())
-				return false
-			case <-tick:
-
-				if body, ok := b.fire(url); ok {
-					if strings.TrimSpace(string(body)) == testCase.Expected {
-						log.Println("Response validation passed")
-						return true
-					}
-					log.Printf("Invalid response received:\n  Actual  : %s\n  Expected: %s\n", string(body), testCase.Expected)
-					return false
-				}
+// waitReady waits for the server to answer, false if it didn't start in time
+func (b *HttpBench) waitReady(baseURL string, testCase *TestCase) bool {
+	timeout := time.After(b.StartupTimeout)
+	tick := time.Tick(500 * time.Millisecond)
+	for {
+		select {
+		case <-timeout:
+			b.cmd.Process.Kill()
+			log.Printf("The server is taking too long to start !!!\n--- Stdout:\n%s\n--- Stderr:\n%s",
+				b.cmd.Stdout.(*strings.Builder).String(),
+				b.cmd.Stderr.(*strings.Builder).String())
+			return false
+		case <-tick:
+			if _, _, ok := b.fire(b.closeClient, baseURL, testCase); ok {
+				return true
 			}
 		}
-	}()
-	ok = ready
-	if ready {
-		log.Println("Starting the benchmark...")
-
-		for _, stage := range b.Stages {
-			log.Printf("#################### Starting stage %s ####################", stage.Name)
-			log.Printf("Will shoot with %d clients for %s", stage.ParallelClients, stage.Duration)
-			result := b.parallelExec(stage.ParallelClients, stage.Duration, func(id int) bool {
-				_, ok := b.fire(url)
-				return ok
-			})
-			result.Name = b.Cfg.Name
-			log.Printf(
-				"Results: %d requets processed in %s (%f req/s)\n",
-				result.Operations,
-				result.ExecTime,
-				float64(result.Operations)/result.ExecTime.Seconds(),
-			)
-			if stage.KeepResults {
-				results = append(results, result)
-			}
+	}
+}
+
+func (b *HttpBench) Run(testCases []*TestCase) (results []HttpBenchResult, ok bool) {
+	b.startServer()
+
+	baseURL := fmt.Sprint("http://127.0.0.1:", b.Cfg.Port)
+	ok = b.waitReady(baseURL, testCases[0])
+	if ok {
+		for _, testCase := range testCases {
+			results = append(results, b.runTestCase(baseURL, testCase)...)
 		}
 	}
 
@@ -214,3 +261,47 @@ func (b *HttpBench) Run(testCase *TestCase) (results []HttpBenchResult, ok bool)
 
 	return
 }
+
+func (b *HttpBench) runTestCase(baseURL string, testCase *TestCase) (results []HttpBenchResult) {
+	log.Printf("==================== Test case %s: %s %s ====================", testCase.Name, testCase.Method, testCase.Route)
+	status, body, ok := b.fire(b.closeClient, baseURL, testCase)
+	if !ok {
+		log.Printf("Request failed, test case skipped")
+		return
+	}
+	if err := testCase.Validate(status, body); err != nil {
+		log.Printf("Invalid response, test case skipped: %s", err)
+		return
+	}
+	log.Println("Response validation passed")
+
+	for _, stage := range b.Stages {
+		log.Printf("#################### Starting stage %s ####################", stage.Name)
+		log.Printf("Will shoot with %d clients for %s (keep-alive: %t)", stage.ParallelClients, stage.Duration, stage.KeepAlive)
+		client := b.closeClient
+		if stage.KeepAlive {
+			client = b.client
+		}
+		result := b.parallelExec(stage.ParallelClients, stage.Duration, func(id int) bool {
+			status, _, ok := b.fire(client, baseURL, testCase)
+			return ok && status == testCase.Status
+		})
+		result.Name = b.Cfg.Name
+		result.TestCase = testCase.Name
+		result.KeepAlive = stage.KeepAlive
+		log.Printf(
+			"Results: %d requests processed in %s (%f req/s), %d errors, latency p50 %.3f ms, p99 %.3f ms, p99.9 %.3f ms\n",
+			result.Operations,
+			result.ExecTime,
+			result.ReqPerSec,
+			result.Errors,
+			result.LatencyMs.P50,
+			result.LatencyMs.P99,
+			result.LatencyMs.P999,
+		)
+		if stage.KeepResults {
+			results = append(results, result)
+		}
+	}
+	return
+}
@@ -0,0 +1,86 @@
+package main
+
+import (
+	"encoding/json"
+	"fmt"
+	"io/ioutil"
+	"strings"
+)
+
+const (
+	readmeStartMarker = "<!-- results:start -->"
+	readmeEndMarker   = "<!-- results:end -->"
+)
+
+// FormatResults as markdown: the system information, then a table per test case
+func FormatResults(resultsFile ResultsFile) string {
+	var sb strings.Builder
+	fmt.Fprintf(&sb, "Measured on %s\n\n", resultsFile.Date.Format("2006-01-02"))
+	sb.WriteString("```\n")
+	sb.WriteString("System information:\n")
+	fmt.Fprintf(&sb, "OS:  %s\n", resultsFile.System.OS)
+	fmt.Fprintf(&sb, "CPU: %s\n", resultsFile.System.CPU)
+	fmt.Fprintf(&sb, "RAM: %d GB\n", resultsFile.System.RAMGB)
+	sb.WriteString("```\n")
+
+	// Test cases in the order they were run
+	testCases := make([]string, 0)
+	byTestCase := make(map[string][]HttpBenchResult)
+	for _, result := range resultsFile.Results {
+		if _, found := byTestCase[result.TestCase]; !found {
+			testCases = append(testCases, result.TestCase)
+		}
+		byTestCase[result.TestCase] = append(byTestCase[result.TestCase], result)
+	}
+
+	for _, testCase := range testCases {
+		fmt.Fprintf(&sb, "\n#### %s\n\n", testCase)
+		sb.WriteString("| Framework | Keep-alive | Clients | req/s | p50 (ms) | p99 (ms) | p99.9 (ms) | Errors | Peak RSS (MB) |\n")
+		sb.WriteString("| --------- | :--------: | ------: | ----: | -------: | -------: | ---------: | -----: | ------------: |\n")
+		for _, result := range byTestCase[testCase] {
+			keepAlive := ""
+			if result.KeepAlive {
+				keepAlive = "yes"
+			}
+			fmt.Fprintf(
+				&sb,
+				"| %s | %s | %d | %.1f | %.3f | %.3f | %.3f | %d | %.1f |\n",
+				result.Name,
+				keepAlive,
+				result.Concurrency,
+				result.ReqPerSec,
+				result.LatencyMs.P50,
+				result.LatencyMs.P99,
+				result.LatencyMs.P999,
+				result.Errors,
+				float64(result.MaxRSS)/1024,
+			)
+		}
+	}
+	return sb.String()
+}
+
+// UpdateReadme replaces the results section of the README, between the markers, with the tables of the results file
+func UpdateReadme(resultsPath string, readmePath string) error {
+	encoded, err := ioutil.ReadFile(resultsPath)
+	if err != nil {
+		return err
+	}
+	var resultsFile ResultsFile
+	if err := json.Unmarshal(encoded, &resultsFile); err != nil {
+		return fmt.Errorf("invalid results file %s: %w", resultsPath, err)
+	}
+
+	readme, err := ioutil.ReadFile(readmePath)
+	if err != nil {
+		return err
+	}
+	content := string(readme)
+	start := strings.Index(content, readmeStartMarker)
+	end := strings.Index(content, readmeEndMarker)
+	if start < 0 || end < start {
+		return fmt.Errorf("%s has no %s ... %s section", readmePath, readmeStartMarker, readmeEndMarker)
+	}
+	content = content[:start+len(readmeStartMarker)] + "\n" + FormatResults(resultsFile) + content[end:]
+	return ioutil.WriteFile(readmePath, []byte(content), 0644)
+}
@@ -1,12 +1,16 @@
 package main
 
 import (
+	"encoding/json"
+	"flag"
 	"fmt"
 	"io/ioutil"
 	"log"
 	"math"
 	"os"
 	"path/filepath"
+	"runtime"
+	"strconv"
 	"strings"
 	"time"
 
@@ -65,11 +69,100 @@ func discoverBenchConfigs(todo []string) (configs []HttpBenchConfig) {
 	return
 }
 
+type SystemInfo struct {
+	OS     string `json:"os"`
+	CPU    string `json:"cpu"`
+	RAMGB  uint64 `json:"ramGB"`
+	GoArch string `json:"goArch"`
+}
+
+type ResultsFile struct {
+	Date    time.Time         `json:"date"`
+	System  SystemInfo        `json:"system"`
+	Results []HttpBenchResult `json:"results"`
+}
+
+func getSystemInfo() SystemInfo {
+	hostInfo, _ := host.Info()
+	cpuInfo, _ := cpu.Info()
+	memInfo, _ := mem.VirtualMemory()
+	return SystemInfo{
+		OS:     fmt.Sprint(strings.Title(hostInfo.Platform), " ", hostInfo.PlatformVersion, " Kernel ", strings.Title(hostInfo.OS), " ", hostInfo.KernelVersion, " ", hostInfo.KernelArch),
+		CPU:    fmt.Sprint(cpuInfo[0].Cores, " X ", cpuInfo[0].ModelName),
+		RAMGB:  memInfo.Total / (1024 * 1024 * 1024),
+		GoArch: runtime.GOARCH,
+	}
+}
+
+func parseConcurrencies(value string) []int {
+	concurrencies := make([]int, 0)
+	for _, item := range strings.Split(value, ",") {
+		n, err := strconv.Atoi(strings.TrimSpace(item))
+		if err != nil || n <= 0 {
+			log.Fatalf("Invalid concurrency level '%s'", item)
+		}
+		concurrencies = append(concurrencies, n)
+	}
+	return concurrencies
+}
+
+func selectTestCases(names string) []*TestCase {
+	all := AllTestCases()
+	if names == "" {
+		return all
+	}
+	selected := make([]*TestCase, 0)
+	for _, name := range strings.Split(names, ",") {
+		found := false
+		for _, testCase := range all {
+			if testCase.Name == strings.TrimSpace(name) {
+				selected = append(selected, testCase)
+				found = true
+			}
+		}
+		if !found {
+			log.Fatalf("Unknown test case '%s'", name)
+		}
+	}
+	return selected
+}
+
+// buildStages returns a warmup, then a stage per concurrency level, with and without keep-alive
+func buildStages(concurrencies []int, duration time.Duration, warmup time.Duration) []HttpBenchStage {
+	stages := []HttpBenchStage{{"Warmup", concurrencies[len(concurrencies)-1], warmup, false, true}}
+	for _, keepAlive := range []bool{false, true} {
+		for _, n := range concurrencies {
+			name := fmt.Sprintf("Load test (%d clients, keep-alive: %t)", n, keepAlive)
+			stages = append(stages, HttpBenchStage{name, n, duration, true, keepAlive})
+		}
+	}
+	return stages
+}
+
 func main() {
-	args := os.Args[1:]
+	duration := flag.Duration("duration", 10*time.Second, "Duration of each load test")
+	warmup := flag.Duration("warmup", 5*time.Second, "Duration of the warmup of each test case")
+	concurrency := flag.String("concurrency", "1,8,64", "Comma separated numbers of parallel clients")
+	cases := flag.String("cases", "", "Comma separated test cases to run, all by default")
+	output := flag.String("output", "results.json", "JSON file the results are written to")
+	report := flag.String("report", "", "Only generate the results table of the README from this JSON results file")
+	readme := flag.String("readme", "README.md", "README updated by -report")
+	flag.Usage = func() {
+		fmt.Fprintf(flag.CommandLine.Output(), "Usage: %s [flags] [benchmark names...]\n", os.Args[0])
+		flag.PrintDefaults()
+	}
+	flag.Parse()
 
+	if *report != "" {
+		assertNoErr(UpdateReadme(*report, *readme))
+		log.Printf("%s updated with the results of %s", *readme, *report)
+		return
+	}
+
+	testCases := selectTestCases(*cases)
+	stages := buildStages(parseConcurrencies(*concurrency), *duration, *warmup)
 	results := make([]HttpBenchResult, 0)
-	configs := discoverBenchConfigs(args)
+	configs := discoverBenchConfigs(flag.Args())
 
 	// Find the longest name to adjust the log prefix size
 	longestName := 0
@@ -84,11 +177,8 @@ func main() {
 		log.Default().SetPrefix(fmt.Sprintf(prefixFmt, cfg.Name))
 		log.Printf("Config loaded: %+v", cfg)
 
-		bench := NewHttpBench(&cfg, []HttpBenchStage{
-			{"Warmup", 8, 10 * time.Second, false},
-			{"Load test", 8, 10 * time.Second, true},
-		})
-		res, ok := bench.Run(ApiHello())
+		bench := NewHttpBench(&cfg, stages)
+		res, ok := bench.Run(testCases)
 
 		if ok {
 			results = append(results, res...)
@@ -104,38 +194,11 @@ func main() {
 
 	log.Print("#################### Global results ####################\n\n")
 
-	hostInfo, _ := host.Info()
-	cpuInfo, _ := cpu.Info()
-	memInfo, _ := mem.VirtualMemory()
-	fmt.Println("System information:")
-	fmt.Println("OS: ", strings.Title(hostInfo.Platform), hostInfo.PlatformVersion, "Kernel", strings.Title(hostInfo.OS), hostInfo.KernelVersion, hostInfo.KernelArch)
-	fmt.Println("CPU:", cpuInfo[0].Cores, "X", cpuInfo[0].ModelName)
-	fmt.Println("RAM:", memInfo.Total/(1024*1024*1024), "GB")
-	fmt.Println()
-
-	table := make([][]string, len(results))
-	for i, result := range results {
-		floatToStr := func(x float64) string {
-			return fmt.Sprintf("%.3f", x)
-		}
-		table[i] = []string{
-			strings.ReplaceAll(result.Name, " ", "_"),
-			floatToStr(float64(result.Operations) / result.ExecTime.Seconds()),
-			floatToStr(float64(result.ExecTime.Microseconds()/result.Operations) / 1000),
-			floatToStr(float64(result.MaxRSS) / 1024),
-		}
-	}
-	maxWidth := make([]int, len(table[0]))
-	for i := range table {
-		for j := range table[i] {
-			if width := len(table[i][j]); width > maxWidth[j] {
-				maxWidth[j] = width
-			}
-		}
-	}
+	resultsFile := ResultsFile{Date: time.Now().UTC(), System: getSystemInfo(), Results: results}
+	encoded, err := json.MarshalIndent(resultsFile, "", "  ")
+	assertNoErr(err)
+	assertNoErr(ioutil.WriteFile(*output, append(encoded, '\n'), 0644))
+	log.Printf("Results written to %s", *output)
 
-	rowFmt := fmt.Sprintf("%%-%ds    %%%ds req/s    %%%ds ms/req    RSS: %%%ds MB\n", maxWidth[0], maxWidth[1], maxWidth[2], maxWidth[3])
-	for _, row := range table {
-		fmt.Printf(rowFmt, row[0], row[1], row[2], row[3])
-	}
+	fmt.Print(FormatResults(resultsFile))
 }
@@ -1,13 +1,150 @@
 package main
 
+import (
+	"bytes"
+	"encoding/json"
+	"fmt"
+	"io"
+	"net/http"
+	"reflect"
+	"strings"
+)
+
 type TestCase struct {
-	Route    string
-	Expected string
+	Name        string
+	Method      string
+	Route       string
+	Body        []byte
+	ContentType string
+	Status      int
+	Expected    string // JSON body, compared semantically (key order and spacing differ between frameworks). Empty to only check the status
+}
+
+// NewRequest builds a request of the test case, with a new reader of the body every time
+func (t *TestCase) NewRequest(baseURL string) (*http.Request, error) {
+	var body io.Reader
+	if t.Body != nil {
+		body = bytes.NewReader(t.Body)
+	}
+	req, err := http.NewRequest(t.Method, baseURL+t.Route, body)
+	if err == nil && t.ContentType != "" {
+		req.Header.Set("Content-Type", t.ContentType)
+	}
+	return req, err
+}
+
+// Validate checks the full response, only done once before the load test
+func (t *TestCase) Validate(status int, body []byte) error {
+	if status != t.Status {
+		return fmt.Errorf("expected status %d, got %d: %s", t.Status, status, truncate(body))
+	}
+	if t.Expected == "" {
+		return nil
+	}
+	var actual, expected interface{}
+	if err := json.Unmarshal(body, &actual); err != nil {
+		return fmt.Errorf("invalid JSON body %s: %w", truncate(body), err)
+	}
+	if err := json.Unmarshal([]byte(t.Expected), &expected); err != nil {
+		panic(err)
+	}
+	if !reflect.DeepEqual(actual, expected) {
+		return fmt.Errorf("unexpected body\n  Actual  : %s\n  Expected: %s", truncate(body), truncate([]byte(t.Expected)))
+	}
+	return nil
+}
+
+func truncate(body []byte) string {
+	if len(body) > 200 {
+		return string(body[:200]) + "..."
+	}
+	return string(body)
 }
 
 func ApiHello() *TestCase {
 	return &TestCase{
-		"/api/hello/Jeremy",
-		`{"message":"Hello Jeremy!"}`,
+		Name:     "api-hello",
+		Method:   "GET",
+		Route:    "/api/hello/Jeremy",
+		Status:   200,
+		Expected: `{"message":"Hello Jeremy!"}`,
+	}
+}
+
+func StaticRoute() *TestCase {
+	return &TestCase{
+		Name:     "static",
+		Method:   "GET",
+		Route:    "/api/status",
+		Status:   200,
+		Expected: `{"status":"ok"}`,
+	}
+}
+
+func DeepParams() *TestCase {
+	return &TestCase{
+		Name:     "deep-params",
+		Method:   "GET",
+		Route:    "/api/users/42/posts/7/comments/3",
+		Status:   200,
+		Expected: `{"user":"42","post":"7","comment":"3"}`,
 	}
 }
+
+func QueryString() *TestCase {
+	return &TestCase{
+		Name:     "query",
+		Method:   "GET",
+		Route:    "/api/search?q=nanohttpy&page=2",
+		Status:   200,
+		Expected: `{"q":"nanohttpy","page":"2"}`,
+	}
+}
+
+func postBody(name string, size int) *TestCase {
+	return &TestCase{
+		Name:        name,
+		Method:      "POST",
+		Route:       "/api/echo",
+		Body:        bytes.Repeat([]byte("a"), size),
+		ContentType: "application/octet-stream",
+		Status:      200,
+		Expected:    fmt.Sprintf(`{"size":%d}`, size),
+	}
+}
+
+func Post1KB() *TestCase {
+	return postBody("post-1kb", 1024)
+}
+
+func Post1MB() *TestCase {
+	return postBody("post-1mb", 1024*1024)
+}
+
+func NotFound() *TestCase {
+	return &TestCase{
+		Name:   "not-found",
+		Method: "GET",
+		Route:  "/api/does/not/exist",
+		Status: 404,
+	}
+}
+
+func LargeJSON() *TestCase {
+	items := make([]string, 1000)
+	for i := range items {
+		items[i] = fmt.Sprintf(`{"id":%d,"name":"item %d","price":%g,"tags":["a","b","c"]}`, i, i, float64(i)*1.5)
+	}
+	return &TestCase{
+		Name:     "large-json",
+		Method:   "GET",
+		Route:    "/api/items",
+		Status:   200,
+		Expected: `{"items":[` + strings.Join(items, ",") + `]}`,
+	}
+}
+
+// AllTestCases in the order they are run, implemented by the app of every framework
+func AllTestCases() []*TestCase {
+	return []*TestCase{ApiHello(), StaticRoute(), DeepParams(), QueryString(), Post1KB(), Post1MB(), NotFound(), LargeJSON()}
+}
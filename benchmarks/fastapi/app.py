@@ -1,9 +1,36 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 
 
 app = FastAPI()
 
+ITEMS = [{"id": i, "name": f"item {i}", "price": i * 1.5, "tags": ["a", "b", "c"]} for i in range(1000)]
+
 
 @app.get("/api/hello/{name}")
 async def api_hello(name):
     return {"message": f"Hello {name}!"}
+
+
+@app.get("/api/status")
+async def api_status():
+    return {"status": "ok"}
+
+
+@app.get("/api/users/{user}/posts/{post}/comments/{comment}")
+async def api_comment(user, post, comment):
+    return {"user": user, "post": post, "comment": comment}
+
+
+@app.get("/api/search")
+async def api_search(q: str, page: str):
+    return {"q": q, "page": page}
+
+
+@app.post("/api/echo")
+async def api_echo(request: Request):
+    return {"size": len(await request.body())}
+
+
+@app.get("/api/items")
+async def api_items():
+    return {"items": ITEMS}
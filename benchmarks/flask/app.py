@@ -1,13 +1,40 @@
-from flask import Flask, jsonify
+from flask import Flask, jsonify, request
 
 
 app = Flask(__name__)
 
+ITEMS = [{"id": i, "name": f"item {i}", "price": i * 1.5, "tags": ["a", "b", "c"]} for i in range(1000)]
+
 
 @app.route("/api/hello/<name>")
 def api_hello(name):
     return jsonify(message=f"Hello {name}!")
 
 
+@app.route("/api/status")
+def api_status():
+    return jsonify(status="ok")
+
+
+@app.route("/api/users/<user>/posts/<post>/comments/<comment>")
+def api_comment(user, post, comment):
+    return jsonify(user=user, post=post, comment=comment)
+
+
+@app.route("/api/search")
+def api_search():
+    return jsonify(q=request.args["q"], page=request.args["page"])
+
+
+@app.route("/api/echo", methods=["POST"])
+def api_echo():
+    return jsonify(size=len(request.get_data()))
+
+
+@app.route("/api/items")
+def api_items():
+    return jsonify(items=ITEMS)
+
+
 if __name__ == "__main__":
     app.run()
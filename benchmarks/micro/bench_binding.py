@@ -0,0 +1,72 @@
+"""
+Per-call overhead of the handler wrapper, before and after building the binding plan at decoration time.
+
+Usage (from the benchmarks/ folder):
+    PYTHONPATH=.. python3 micro/bench_binding.py
+"""
+from inspect import Parameter, signature
+import timeit
+from typing import Any, List
+
+from nanohttpy.binding import bind_handler
+from nanohttpy.requests import Request
+
+NUMBER = 200_000
+
+
+def legacy_wrapper(func):
+    """The handler wrapper as it was before, inspecting the signature on every call"""
+
+    def handler_wrapper(req: Request) -> Any:
+        args: List[Any] = []
+        sig = signature(func)
+        expected_params = [
+            p for p in sig.parameters.values() if p.kind == Parameter.POSITIONAL_OR_KEYWORD
+        ]
+        if len(expected_params) > 0:
+            args.append(req)
+            for arg in expected_params[1:]:
+                v = req.param(arg.name)
+                if v is None:
+                    v = req.query(arg.name)
+                args.append(v)
+        return func(*args)
+
+    return handler_wrapper
+
+
+def only_req(req):
+    return req
+
+
+def path_and_query(req, name, client, q):
+    return name
+
+
+def typed(req, name: str, count: int, ratio: float, tags: List[str]):
+    return name
+
+
+CASES = [
+    ("only_req", only_req, "/hello", "/hello", {}),
+    ("path_and_query", path_and_query, "/hello/{name}", "/hello/you?client=firefox&q=test", {"name": "you"}),
+    ("typed", typed, "/hello/{name}", "/hello/you?count=3&ratio=0.5&tags=a&tags=b", {"name": "you"}),
+]
+
+
+def bench(wrapper, req) -> float:
+    return timeit.timeit(lambda: wrapper(req), number=NUMBER) / NUMBER * 1e9
+
+
+def main():
+    print(f"{'case':<16} {'before (ns/call)':>18} {'after (ns/call)':>18} {'speedup':>8}")
+    for name, func, route, url, path_parameters in CASES:
+        req = Request("GET", url, "HTTP/1.1", {}, b"")
+        req.path_parameters = path_parameters
+        before = bench(legacy_wrapper(func), req)
+        after = bench(bind_handler(func, route), req)
+        print(f"{name:<16} {before:>18.1f} {after:>18.1f} {before / after:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
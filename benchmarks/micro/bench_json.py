@@ -0,0 +1,45 @@
+"""
+Encoding and decoding time of the installed JSON backends, on a small and a large payload.
+
+Usage (from the benchmarks/ folder):
+    PYTHONPATH=.. python3 micro/bench_json.py
+"""
+import timeit
+from typing import Any, List, Tuple
+
+from nanohttpy.exceptions import NanoHttpyError
+from nanohttpy.json import JSONBackend, get_backend
+
+SMALL = {"message": "Hello World!"}
+LARGE = {
+    "items": [
+        {"id": i, "name": f"item {i}", "price": i * 1.5, "tags": ["a", "b", "c"], "available": i % 2 == 0}
+        for i in range(1_000)
+    ]
+}
+PAYLOADS: List[Tuple[str, Any, int]] = [("small", SMALL, 200_000), ("large", LARGE, 200)]
+
+
+def installed_backends() -> List[JSONBackend]:
+    backends = []
+    for name in ("json", "ujson", "orjson"):
+        try:
+            backends.append(get_backend(name))
+        except NanoHttpyError:
+            print(f"{name} is not installed, skipped")
+    return backends
+
+
+def main():
+    backends = installed_backends()
+    print(f"{'backend':<8} {'payload':<8} {'dumps (us)':>12} {'loads (us)':>12} {'size (B)':>10}")
+    for name, payload, number in PAYLOADS:
+        for backend in backends:
+            encoded = backend.dumps(payload)
+            dumps = timeit.timeit(lambda: backend.dumps(payload), number=number) / number * 1e6
+            loads = timeit.timeit(lambda: backend.loads(encoded), number=number) / number * 1e6
+            print(f"{backend.name:<8} {name:<8} {dumps:>12.2f} {loads:>12.2f} {len(encoded):>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Cost of the metrics of a request: what NanoHttpy.handle and an engine record for every request, with the default
+metrics (in-flight gauge and request counter) and with the five phase histograms (``Metrics(phases=PHASES)``),
+compared with the same request handled with the metrics disabled. The configurations are measured in turns, several
+times, keeping the best time of each, to limit the noise of the machine. The recording times are the steadier
+measure: the overhead on handle is the difference of two noisy measures.
+
+Usage (from the benchmarks/ folder):
+    PYTHONPATH=.. python3 micro/bench_metrics.py
+"""
+import time
+import timeit
+
+from nanohttpy import NanoHttpy
+from nanohttpy.metrics import PHASES, Metrics
+from nanohttpy.requests import Request
+
+NUMBER = 100_000
+
+
+ROUNDS = 5
+
+
+def count(metrics: Metrics, req: Request) -> None:
+    """What is recorded for one request by default"""
+    shard = metrics.shard()
+    shard.in_flight += 1
+    shard.in_flight -= 1
+    metrics.count_request(shard, req, 200)
+
+
+def record(metrics: Metrics, req: Request) -> None:
+    """Everything recorded for one request with all the phases, timestamps included"""
+    start = time.perf_counter()
+    shard = metrics.shard()
+    shard.in_flight += 1
+    routed = time.perf_counter()
+    end = time.perf_counter()
+    shard.in_flight -= 1
+    metrics.record_handling(shard, req, 200, routed - start, end - routed)
+    serialized = time.perf_counter()
+    metrics.record_engine_phases(req, 0.00002, serialized - end, time.perf_counter() - serialized)
+
+
+def best_time(func) -> float:
+    """Best of 3 runs, in ns per call"""
+    return min(timeit.repeat(func, number=NUMBER, repeat=3)) / NUMBER * 1e9
+
+
+def handle_func(app: NanoHttpy):
+    @app.get("/hello/{name}")
+    def hello(req, name: str):
+        return {"message": f"Hello {name}!"}
+
+    req = Request("GET", "/hello/world", "HTTP/1.1", {}, b"")
+    return lambda: app.handle(req)
+
+
+def main():
+    req = Request("GET", "/hello/world", "HTTP/1.1", {}, b"")
+    req.route = "/hello/{name}"
+    counters, phases = Metrics(), Metrics(phases=PHASES)
+    recordings = {"counters": lambda: count(counters, req), "all": lambda: record(phases, req)}
+    handles = {
+        "none": handle_func(NanoHttpy()),
+        "counters": handle_func(NanoHttpy(metrics=True)),
+        "all": handle_func(NanoHttpy(metrics=Metrics(phases=PHASES))),
+    }
+    best = {}
+    for _ in range(ROUNDS):
+        for name, func in [*(("record " + k, f) for k, f in recordings.items()), *handles.items()]:
+            best[name] = min(best.get(name, float("inf")), best_time(func))
+
+    for name in recordings:
+        print(f"recording per request, {name}: {best['record ' + name]:.1f} ns")
+    without = best["none"]
+    print(f"{'metrics':>10} {'handle (ns)':>12} {'overhead (ns)':>14}")
+    for name in handles:
+        print(f"{name:>10} {best[name]:>12.1f} {best[name] - without:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
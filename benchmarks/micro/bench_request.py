@@ -0,0 +1,76 @@
+"""
+Timing and allocations of the Request construction path, compared with the previous eager dataclass.
+
+Usage (from the benchmarks/ folder):
+    PYTHONPATH=.. python3 micro/bench_request.py
+"""
+from dataclasses import dataclass, field
+import timeit
+import tracemalloc
+from typing import Dict, List
+
+from nanohttpy.http import URL, HTTPHeaders, fast_parse_request_path, parse_query_string
+from nanohttpy.requests import Request
+
+NUMBER = 200_000
+ALLOCATED_REQUESTS = 10_000
+
+
+@dataclass
+class LegacyRequest:  # pylint: disable=too-many-instance-attributes
+    """The Request as it was before, parsing everything in __post_init__"""
+
+    method: str
+    full_path: str
+    request_version: str
+    headers: HTTPHeaders
+    body: bytes
+    url: URL = field(init=False)
+    args: Dict[str, List[str]] = field(init=False)
+    path_parameters: Dict[str, str] = field(init=False)
+
+    def __post_init__(self):
+        self.url = fast_parse_request_path(self.full_path)
+        self.args = parse_query_string(self.url.query) if self.url.query else {}
+        self.path_parameters = {}
+
+
+URLS = [
+    ("no_query", "/api/hello/world"),
+    ("query", "/search?client=firefox&q=test#fragment"),
+]
+HEADERS = {"Host": "localhost:5000", "User-Agent": "bench", "Accept": "*/*"}
+
+
+def bench_time(factory, url: str) -> float:
+    """Construction + path read, as done by the router"""
+    if factory is LegacyRequest:
+        stmt = lambda: factory("GET", url, "HTTP/1.1", HEADERS, b"").url.path
+    else:
+        stmt = lambda: factory("GET", url, "HTTP/1.1", HEADERS, b"").path
+    return timeit.timeit(stmt, number=NUMBER) / NUMBER * 1e9
+
+
+def bench_alloc(factory, url: str) -> float:
+    """Average number of bytes kept alive per request"""
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    requests = [factory("GET", url, "HTTP/1.1", HEADERS, b"") for _ in range(ALLOCATED_REQUESTS)]
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del requests
+    return (after - before) / ALLOCATED_REQUESTS
+
+
+def main():
+    print(f"{'case':<10} {'before (ns)':>12} {'after (ns)':>12} {'before (B)':>12} {'after (B)':>12}")
+    for name, url in URLS:
+        print(
+            f"{name:<10} "
+            f"{bench_time(LegacyRequest, url):>12.1f} {bench_time(Request, url):>12.1f} "
+            f"{bench_alloc(LegacyRequest, url):>12.1f} {bench_alloc(Request, url):>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
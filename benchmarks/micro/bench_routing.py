@@ -0,0 +1,94 @@
+"""
+Route lookup with 10, 1,000 and 10,000 routes, frozen router (with and without lookup cache) compared with the previous
+tree walk.
+
+Usage (from the benchmarks/ folder):
+    PYTHONPATH=.. python3 micro/bench_routing.py
+"""
+import timeit
+from typing import List, Tuple
+
+from nanohttpy.exceptions import MethodNotAllowedError, NotFoundError
+from nanohttpy.requests import Request
+from nanohttpy.routing import RouteTree, Router, check_param, tokenize_path
+
+NUMBER = 100_000
+SIZES = [10, 1_000, 10_000]
+
+
+def handler(_):
+    pass
+
+
+class LegacyRouter:
+    """The router as it was before: a tree walk through a generator for every request"""
+
+    def __init__(self) -> None:
+        self._route_tree = RouteTree("")
+
+    def add_route(self, method: str, path: str) -> None:
+        curr_route = self._route_tree
+        for path_comp in tokenize_path(path):
+            if check_param(path_comp):
+                curr_route = curr_route.get_or_create_wild_child(path_comp[1:-1])
+            else:
+                curr_route = curr_route.get_or_create_child(path_comp)
+        curr_route.set_handler(method, handler)
+
+    def get_handler(self, req: Request):
+        curr_route = self._route_tree
+        for path_comp in tokenize_path(req.path):
+            opt_route = curr_route.get_child(path_comp, req.path_parameters)
+            if opt_route is None:
+                raise NotFoundError()
+            curr_route = opt_route
+        res = curr_route.get_handler(req.method)
+        if res is None:
+            raise MethodNotAllowedError()
+        return res
+
+
+def generate_routes(n: int) -> List[str]:
+    """Half static routes, half parameterized ones, spread over a few prefixes"""
+    routes = []
+    for i in range(n // 2):
+        routes.append(f"/api/v{i % 4}/static{i}/items")
+        routes.append(f"/api/v{i % 4}/resource{i}/{{id}}/details")
+    return routes
+
+
+def bench(router, url: str) -> float:
+    req = Request("GET", url, "HTTP/1.1", {}, b"")
+
+    def lookup():
+        router.get_handler(req)
+
+    return timeit.timeit(lookup, number=NUMBER) / NUMBER * 1e9
+
+
+def main():
+    print(f"{'routes':>7} {'case':<8} {'before (ns)':>12} {'after (ns)':>12} {'speedup':>8} {'cached (ns)':>12}")
+    for n in SIZES:
+        routes = generate_routes(n)
+        legacy, router, cached = LegacyRouter(), Router(), Router(cache_size=1024)
+        for path in routes:
+            legacy.add_route("GET", path)
+            router.add_route("GET", path, handler)
+            cached.add_route("GET", path, handler)
+        router.freeze()
+        cached.freeze()
+
+        last = n // 2 - 1
+        cases: List[Tuple[str, str]] = [
+            ("static", f"/api/v{last % 4}/static{last}/items"),
+            ("param", f"/api/v{last % 4}/resource{last}/42/details"),
+        ]
+        for name, url in cases:
+            before, after = bench(legacy, url), bench(router, url)
+            print(
+                f"{n:>7} {name:<8} {before:>12.1f} {after:>12.1f} {before / after:>7.1f}x {bench(cached, url):>12.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Cold start: import time of the package (``python -X importtime``), and time to first response of a new process, in
+process (``NanoHttpy.handle``) and over a socket with each engine, compared with an empty interpreter.
+
+Usage (from the benchmarks/ folder):
+    PYTHONPATH=.. python3 micro/bench_startup.py
+"""
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from typing import List, Optional
+
+RUNS = 20
+TIMEOUT = 10.0
+
+APP = """
+from nanohttpy import NanoHttpy
+
+app = NanoHttpy()
+
+
+@app.get("/api/hello/{name}")
+def hello(req, name: str):
+    return {"message": f"Hello {name}!"}
+"""
+
+IN_PROCESS = APP + """
+from nanohttpy.requests import Request
+
+assert app.handle(Request("GET", "/api/hello/world", "HTTP/1.1", {}, b"")).status_code == 200
+"""
+
+SERVER = APP + """
+import sys
+from nanohttpy import engines
+
+app.run(port=int(sys.argv[1]), engine=getattr(engines, sys.argv[2]))
+"""
+
+ENGINES = ["PythonEngine", "ThreadedPythonEngine", "UvloopEngine"]
+
+
+def env() -> dict:
+    return dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+
+
+def import_time_us() -> int:
+    """Cumulative import time of the package reported by ``python -X importtime``, in us"""
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import nanohttpy"],
+        env=env(),
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+    for line in output.splitlines():
+        _, cumulative, name = line.split("|")
+        if name.strip() == "nanohttpy":
+            return int(cumulative)
+    raise RuntimeError(f"nanohttpy not found in the import times:\n{output}")
+
+
+def run_time_ms(code: str) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], env=env(), check=True)
+    return (time.perf_counter() - start) * 1000
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def first_response(port: int) -> Optional[bytes]:
+    try:
+        with socket.create_connection(("127.0.0.1", port), timeout=1) as sock:
+            sock.sendall(b"GET /api/hello/world HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n")
+            return sock.recv(4096)
+    except OSError:
+        return None
+
+
+def first_response_ms(engine: str) -> float:
+    """From the start of the server process to its first response"""
+    port = free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(  # pylint: disable=consider-using-with
+        [sys.executable, "-c", SERVER, str(port), engine],
+        env=env(),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < TIMEOUT:
+            response = first_response(port)
+            if response is not None and response.startswith((b"HTTP/1.0 200", b"HTTP/1.1 200")):
+                return (time.perf_counter() - start) * 1000
+            time.sleep(0.001)
+        raise RuntimeError(f"No response from {engine} after {TIMEOUT}s")
+    finally:
+        server.kill()
+        server.wait()
+
+
+def summary(samples: List[float]) -> str:
+    return f"{min(samples):>10.1f} {statistics.median(samples):>10.1f}"
+
+
+def main():
+    print(f"{'case':<40} {'min':>10} {'median':>10}")
+    print(f"{'import nanohttpy (importtime, ms)':<40} {summary([import_time_us() / 1000 for _ in range(RUNS)])}")
+    print(f"{'empty interpreter (ms)':<40} {summary([run_time_ms('pass') for _ in range(RUNS)])}")
+    print(f"{'import nanohttpy (ms)':<40} {summary([run_time_ms('import nanohttpy') for _ in range(RUNS)])}")
+    print(f"{'first response, in process (ms)':<40} {summary([run_time_ms(IN_PROCESS) for _ in range(RUNS)])}")
+    for engine in ENGINES:
+        print(f"{'first response, ' + engine + ' (ms)':<40} {summary([first_response_ms(engine) for _ in range(RUNS)])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Serialization of a small response, compared with the previous per-header formatting of http.server's send_header.
+
+Usage (from the benchmarks/ folder):
+    PYTHONPATH=.. python3 micro/bench_wire.py
+"""
+from email.utils import formatdate
+import io
+import time
+import timeit
+
+from nanohttpy.responses import JSONResponse
+from nanohttpy.wire import serialize_response
+
+NUMBER = 200_000
+
+
+def legacy_serialize(response, version: str) -> bytes:
+    """What send_response + send_header + end_headers did: one formatted and encoded line per header"""
+    buffer = []
+    buffer.append(f"{version} {response.status_code} {response.status_reason}\r\n".encode("latin-1", "strict"))
+    buffer.append(f"Date: {formatdate(time.time(), usegmt=True)}\r\n".encode("latin-1", "strict"))
+    for k, v in response.headers.items():
+        buffer.append(f"{k}: {v}\r\n".encode("latin-1", "strict"))
+    buffer.append(b"\r\n")
+    out = io.BytesIO()
+    out.write(b"".join(buffer))
+    out.write(response.encoded_body)
+    return out.getvalue()
+
+
+def main():
+    response = JSONResponse({"message": "Hello World!"})
+    before = timeit.timeit(lambda: legacy_serialize(response, "HTTP/1.1"), number=NUMBER) / NUMBER * 1e9
+    after = timeit.timeit(lambda: serialize_response(response, "HTTP/1.1"), number=NUMBER) / NUMBER * 1e9
+    print(f"{'before (ns)':>12} {'after (ns)':>12} {'speedup':>8}")
+    print(f"{before:>12.1f} {after:>12.1f} {before / after:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
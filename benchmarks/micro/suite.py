@@ -0,0 +1,230 @@
+"""
+Timing of each stage of the request hot path, in process: URL parsing, Request construction, route registration and
+lookup at several route table sizes, handler wrapper, response adaptation, JSON rendering, and the whole
+``NanoHttpy.handle``. Unlike the benchmark runner, which only measures whole requests over sockets, it tells which
+layer got slower.
+
+The results (best time per call in ns, over several repeats) are written as JSON. With ``--baseline``, they are
+compared with a previous run, and the script fails if a stage is slower than the baseline by more than
+``--threshold`` (a fraction, 0.2 = 20%). The timings only make sense on the same machine, see ``make micro-compare``.
+
+Usage (from the benchmarks/ folder):
+    PYTHONPATH=.. python3 micro/suite.py [--output micro/results.json] [--baseline micro/baseline.json]
+        [--threshold 0.2] [--filter router]
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+import timeit
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from nanohttpy import NanoHttpy
+from nanohttpy.binding import bind_handler
+from nanohttpy.forms import parse_form
+from nanohttpy.http import fast_parse_request_path
+from nanohttpy.requests import Request
+from nanohttpy.responses import JSONResponse, adapt_response
+from nanohttpy.routing import Router
+
+ROUTER_SIZES = [10, 1_000, 10_000]
+REPEAT = 5
+# Minimum duration of a repeat, in seconds
+MIN_DURATION = 0.1
+
+# Raw headers, as received by the engines
+HEADERS = [(b"Host", b"localhost:5000"), (b"User-Agent", b"bench"), (b"Accept", b"*/*"), (b"Accept-Encoding", b"gzip")]
+URLENCODED = "application/x-www-form-urlencoded"
+URLENCODED_FORM = b"name=J%C3%A9r%C3%A9my&email=jeremy%40example.com&age=42&newsletter=on&comment=Hello+World%21"
+MULTIPART = "multipart/form-data; boundary=----WebKitFormBoundary7MA4YWxkTrZu0gW"
+MULTIPART_FORM = (
+    b"------WebKitFormBoundary7MA4YWxkTrZu0gW\r\n"
+    b'Content-Disposition: form-data; name="title"\r\n\r\nHoliday pictures\r\n'
+    b"------WebKitFormBoundary7MA4YWxkTrZu0gW\r\n"
+    b'Content-Disposition: form-data; name="picture"; filename="beach.jpg"\r\nContent-Type: image/jpeg\r\n\r\n'
+    + b"\xff" * 16 * 1024
+    + b"\r\n------WebKitFormBoundary7MA4YWxkTrZu0gW--\r\n"
+)
+SMALL_JSON = {"message": "Hello World!"}
+LARGE_JSON = {
+    "items": [
+        {"id": i, "name": f"item {i}", "price": i * 1.5, "tags": ["a", "b", "c"], "available": i % 2 == 0}
+        for i in range(1_000)
+    ]
+}
+
+# Name, function timed, and number of operations per call (the time is reported per operation)
+Stage = Tuple[str, Callable[[], Any], int]
+
+
+def noop_handler(_):
+    pass
+
+
+def generate_routes(n: int) -> List[str]:
+    """Half static routes, half parameterized ones, spread over a few prefixes"""
+    routes = []
+    for i in range(n // 2):
+        routes.append(f"/api/v{i % 4}/static{i}/items")
+        routes.append(f"/api/v{i % 4}/resource{i}/{{id}}/details")
+    return routes
+
+
+def make_request(url: str) -> Request:
+    return Request("GET", url, "HTTP/1.1", HEADERS, b"")
+
+
+def parsing_stages() -> Iterator[Stage]:
+    yield "parse_path.no_query", lambda: fast_parse_request_path("/api/hello/world"), 1
+    yield "parse_path.query", lambda: fast_parse_request_path("/search?client=firefox&q=test#fragment"), 1
+    yield "request.init", lambda: make_request("/api/hello/world").path, 1
+    yield "request.init_query", lambda: make_request("/search?client=firefox&q=test").args, 1
+    yield "request.headers.get", lambda: make_request("/").headers.get("accept-encoding"), 1
+    yield "request.headers.miss", lambda: make_request("/").headers.get("Content-Length"), 1
+    yield "form.urlencoded", lambda: parse_form(URLENCODED, [URLENCODED_FORM]), 1
+    yield "form.multipart", lambda: parse_form(MULTIPART, [MULTIPART_FORM]), 1
+
+
+def router_stages() -> Iterator[Stage]:
+    for n in ROUTER_SIZES:
+        routes = generate_routes(n)
+
+        def add_routes(routes=routes):
+            router = Router()
+            for path in routes:
+                router.add_route("GET", path, noop_handler)
+            return router
+
+        def freeze(add_routes=add_routes):
+            # A frozen router is not compiled again, so a new one is built for each call and only the freeze is timed
+            router = add_routes()
+            start = time.perf_counter()
+            router.freeze()
+            return time.perf_counter() - start
+
+        yield f"router.add_route.{n}", add_routes, n
+        yield f"router.freeze.{n}", freeze, n
+
+        router = add_routes()
+        router.freeze()
+        last = n // 2 - 1
+        static_req = make_request(f"/api/v{last % 4}/static{last}/items")
+        param_req = make_request(f"/api/v{last % 4}/resource{last}/42/details")
+        yield f"router.get_handler.static.{n}", lambda router=router, req=static_req: router.get_handler(req), 1
+        yield f"router.get_handler.param.{n}", lambda router=router, req=param_req: router.get_handler(req), 1
+
+
+def handler_stages() -> Iterator[Stage]:
+    def typed(req, name: str, count: int = 1):  # pylint: disable=unused-argument
+        return name
+
+    wrapper = bind_handler(typed, "/hello/{name}")
+    req = make_request("/hello/world?count=3")
+    req.path_parameters = {"name": "world"}
+    yield "handler.wrapper", lambda: wrapper(req), 1
+    yield "adapt_response.str", lambda: adapt_response("Hello World!"), 1
+    yield "adapt_response.dict", lambda: adapt_response(SMALL_JSON), 1
+    yield "json_response.small", lambda: JSONResponse(SMALL_JSON), 1
+    yield "json_response.large", lambda: JSONResponse(LARGE_JSON), 1
+
+    app = NanoHttpy()
+
+    @app.get("/api/hello/{name}")
+    def hello(req, name: str):  # pylint: disable=unused-argument
+        return {"message": f"Hello {name}!"}
+
+    yield "app.handle", lambda: app.handle(make_request("/api/hello/world")), 1
+
+
+def all_stages() -> Iterator[Stage]:
+    yield from parsing_stages()
+    yield from router_stages()
+    yield from handler_stages()
+
+
+def best_time(func: Callable[[], Any], operations: int) -> float:
+    """Best time of ``REPEAT`` repeats, in ns per operation"""
+    timer = timeit.Timer(func)
+    number, duration = timer.autorange()
+    if duration < MIN_DURATION:
+        number = max(1, int(number * MIN_DURATION / max(duration, 1e-9)))
+    return min(timer.repeat(REPEAT, number)) / number / operations * 1e9
+
+
+def best_freeze_time(func: Callable[[], float], operations: int) -> float:
+    """Best of the durations measured by ``func`` itself, in ns per operation"""
+    return min(func() for _ in range(REPEAT)) / operations * 1e9
+
+
+def run(name_filter: Optional[str]) -> Dict[str, Any]:
+    stages: Dict[str, float] = {}
+    for name, func, operations in all_stages():
+        if name_filter and name_filter not in name:
+            continue
+        if name.startswith("router.freeze."):
+            stages[name] = best_freeze_time(func, operations)
+        else:
+            stages[name] = best_time(func, operations)
+        print(f"{name:<36} {stages[name]:>12.1f} ns", flush=True)
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "timestamp": int(time.time()),
+        "unit": "ns",
+        "stages": stages,
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Print the comparison with the baseline, return the stages slower than it beyond the threshold"""
+    regressions = []
+    print(f"\n{'stage':<36} {'baseline (ns)':>14} {'current (ns)':>14} {'change':>8}")
+    for name, current in results["stages"].items():
+        before = baseline["stages"].get(name)
+        if before is None:
+            print(f"{name:<36} {'-':>14} {current:>14.1f} {'new':>8}")
+            continue
+        change = current / before - 1
+        regressed = change > threshold
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<36} {before:>14.1f} {current:>14.1f} {change:>+7.1%}{' REGRESSION' if regressed else ''}")
+    if baseline.get("python") != results["python"] or baseline.get("platform") != results["platform"]:
+        print(
+            f"\nWarning: the baseline was measured with Python {baseline.get('python')} on {baseline.get('platform')}"
+        )
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--output", help="JSON file the results are written to")
+    parser.add_argument("--baseline", help="JSON file of a previous run to compare with")
+    parser.add_argument(
+        "--threshold", type=float, default=0.2, help="Slowdown beyond which a stage fails the comparison (0.2 = 20%%)"
+    )
+    parser.add_argument("--filter", help="Only run the stages whose name contains this string")
+    args = parser.parse_args(argv)
+
+    results = run(args.filter)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} stage(s) slower than the baseline by more than {args.threshold:.0%}:")
+            for name in regressions:
+                print(f"  {name}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
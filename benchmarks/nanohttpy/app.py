@@ -4,22 +4,56 @@ import sys
 app = NanoHttpy(debug=False)
 
 
+ITEMS = [{"id": i, "name": f"item {i}", "price": i * 1.5, "tags": ["a", "b", "c"]} for i in range(1000)]
+
+
 @app.get("/api/hello/{name}")
 def api_hello(_, name):
     return {"message": f"Hello {name}!"}
 
 
+@app.get("/api/status")
+def api_status(_):
+    return {"status": "ok"}
+
+
+@app.get("/api/users/{user}/posts/{post}/comments/{comment}")
+def api_comment(_, user, post, comment):
+    return {"user": user, "post": post, "comment": comment}
+
+
+@app.get("/api/search")
+def api_search(_, q, page):
+    return {"q": q, "page": page}
+
+
+@app.post("/api/echo")
+def api_echo(req):
+    return {"size": sum(len(chunk) for chunk in req.stream())}
+
+
+@app.get("/api/items")
+def api_items(_):
+    return {"items": ITEMS}
+
+
 if __name__ == "__main__":
     engine = None
+    workers = 1
     if len(sys.argv) >= 2:
         if sys.argv[1] == "--python":
             from nanohttpy.engines import PythonEngine
             engine = PythonEngine
+        elif sys.argv[1] == "--threaded":
+            from nanohttpy.engines import ThreadedPythonEngine
+            engine = ThreadedPythonEngine
         elif sys.argv[1] == "--uvloop":
-            from nanohttpy.engines import PythonEngine
-            engine = PythonEngine
+            from nanohttpy.engines import UvloopEngine
+            engine = UvloopEngine
+    if len(sys.argv) >= 4 and sys.argv[2] == "--workers":
+        workers = int(sys.argv[3])
     if engine is None:
         from nanohttpy.engines import PythonEngine
         engine = PythonEngine
 
-    app.run(port=5000, engine=engine)
+    app.run(port=5000, engine=engine, workers=workers)
@@ -3,10 +3,38 @@ from starlette.responses import JSONResponse
 from starlette.routing import Route
 
 
+ITEMS = [{"id": i, "name": f"item {i}", "price": i * 1.5, "tags": ["a", "b", "c"]} for i in range(1000)]
+
+
 async def api_hello(request):
     return JSONResponse({"message": f"Hello {request.path_params['name']}!"})
 
 
+async def api_status(request):
+    return JSONResponse({"status": "ok"})
+
+
+async def api_comment(request):
+    return JSONResponse(request.path_params)
+
+
+async def api_search(request):
+    return JSONResponse({"q": request.query_params["q"], "page": request.query_params["page"]})
+
+
+async def api_echo(request):
+    return JSONResponse({"size": len(await request.body())})
+
+
+async def api_items(request):
+    return JSONResponse({"items": ITEMS})
+
+
 app = Starlette(debug=True, routes=[
     Route("/api/hello/{name}", api_hello),
+    Route("/api/status", api_status),
+    Route("/api/users/{user}/posts/{post}/comments/{comment}", api_comment),
+    Route("/api/search", api_search),
+    Route("/api/echo", api_echo, methods=["POST"]),
+    Route("/api/items", api_items),
 ])
@@ -1,87 +1,415 @@
 import functools
-from inspect import Parameter, signature
+import inspect
 import logging
-import traceback
-from typing import Any, Callable, List
-from nanohttpy.exceptions import HttpError
+import time
+from typing import TYPE_CHECKING, Any, Callable, List, Optional, Sequence, Tuple, Union
+from nanohttpy.binding import bind_handler
+from nanohttpy.bodies import DEFAULT_MAX_BODY_SIZE, DEFAULT_SPILL_THRESHOLD, BodyLimits
+from nanohttpy.caching import CacheInfo
+from nanohttpy.concurrency import BlockingExecutor, ExecutorStats, run_coroutine_sync
+from nanohttpy.exceptions import HttpError, NanoHttpyError, NotFoundError
+from nanohttpy.http import check_response_headers
+from nanohttpy.lazy_loader import LazyLoader
 from nanohttpy.requests import Request
+from nanohttpy.response_cache import CACHEABLE_METHODS, CachePolicy, ResponseCache
 from nanohttpy.responses import Response, adapt_response
 from nanohttpy.routing import Router
-from nanohttpy.logging import logger
+from nanohttpy.staticfiles import StaticFiles
+from nanohttpy.logging import access_logger, logger
 from nanohttpy.types import DecoratedHandlerFunc, HandlerFunc
 
+if TYPE_CHECKING:
+    import asyncio
+    from nanohttpy import compression as _compression, metrics as _metrics
+    from nanohttpy.compression import Compression
+    from nanohttpy.metrics import Metrics
+    from nanohttpy.profiling import Profiler
+else:
+    # Not needed to define the routes: imported by the first request, or when the feature is enabled
+    asyncio = LazyLoader("asyncio", globals(), "asyncio")
+    _compression = LazyLoader("_compression", globals(), "nanohttpy.compression")
+    _metrics = LazyLoader("_metrics", globals(), "nanohttpy.metrics")
+
+
+def is_async_handler(handler: DecoratedHandlerFunc) -> bool:
+    """Whether the handler returns a coroutine that must be awaited"""
+    return getattr(handler, "_nanohttpy_async", False)
+
+
+def is_blocking_handler(handler: DecoratedHandlerFunc) -> bool:
+    """Whether the handler must be offloaded to a thread pool by the event loop based engines"""
+    return getattr(handler, "_nanohttpy_blocking", False)
+
+
+def get_cache_policy(handler: DecoratedHandlerFunc) -> Optional[CachePolicy]:
+    """Cache settings of the route, None if its responses are not cached"""
+    return getattr(handler, "_nanohttpy_cache", None)
+
+
+def _call_handler_sync(handler: HandlerFunc, req: Request) -> Any:
+    result = handler(req)
+    if is_async_handler(handler):
+        result = run_coroutine_sync(result)
+    return result
+
 
 class NanoHttpy:
+    body_limits: BodyLimits
+    compression: Optional["Compression"]
+    metrics: Optional["Metrics"]
+    profiler: Optional["Profiler"]
     _debug: bool
+    _access_log: bool
     _router: Router
+    _mounts: List[Tuple[str, DecoratedHandlerFunc]]
+    _blocking: bool
+    _executor: BlockingExecutor
+    _response_cache: ResponseCache
 
-    def __init__(self, debug=False) -> None:
+    def __init__(
+        self,
+        debug=False,
+        blocking=False,
+        executor_workers: Optional[int] = None,
+        route_cache_size: int = 0,
+        access_log: bool = False,
+        json_backend: Any = None,
+        max_body_size: Optional[int] = DEFAULT_MAX_BODY_SIZE,
+        body_spill_threshold: int = DEFAULT_SPILL_THRESHOLD,
+        compression: Union[bool, "Compression"] = False,
+        response_cache_size: int = 1024,
+        response_cache_max_bytes: int = 64 * 1024 * 1024,
+        metrics: Union[bool, "Metrics"] = False,
+        metrics_path: Optional[str] = None,
+        profiler: Optional["Profiler"] = None,
+    ) -> None:
+        """
+        ``blocking`` sets whether the sync handlers are run on a thread pool of ``executor_workers`` threads by the
+        event loop based engines. It can be overridden per route.
+        ``route_cache_size`` enables a LRU cache of that many route lookup results, useful when most of the traffic
+        hits a limited set of URLs.
+        ``access_log`` writes one JSON line per request (method, path, status, duration) to the
+        ``nanohttpy.access`` logger.
+        ``json_backend`` is no longer supported: the JSON backend is global to the process, it is selected with
+        ``nanohttpy.json.set_backend``.
+        ``max_body_size`` is the maximum size in bytes of the request bodies (413 beyond, None for no limit). The
+        bodies bigger than ``body_spill_threshold`` bytes are written to a temporary file, see ``Request.stream()``.
+        ``compression`` compresses the responses with gzip or deflate, according to the ``Accept-Encoding`` of the
+        requests: True for the default settings, or a ``Compression`` instance to tune them.
+        ``response_cache_size`` and ``response_cache_max_bytes`` bound the cache of the routes declared with
+        ``cache_ttl``, shared by all of them.
+        ``metrics`` records the requests by route and status, and optionally the latency of their phases (see
+        ``nanohttpy.metrics``), served in the Prometheus text format on ``metrics_path`` (e.g. "/metrics") if set:
+        True for the counters only, or a ``Metrics`` instance to tune them, e.g. ``Metrics(phases=PHASES)`` for the
+        latency histograms. With several workers, each process has its own metrics.
+        ``profiler`` profiles the handler calls of some requests with cProfile, see ``nanohttpy.profiling``.
+        """
         if debug:
             logger.warning('Running in "debug" mode. Remove debug=True in production.')
             # TODO: actually, even in debug the user should see the debug logs of the framework
             logger.setLevel(logging.DEBUG)
 
-        self._router = Router()
+        if json_backend is not None:
+            raise NanoHttpyError(
+                "NanoHttpy(json_backend=...) is no longer supported: the JSON backend is global to the process and "
+                "affects every app, select it with nanohttpy.json.set_backend() at startup"
+            )
+        self._access_log = access_log
+        self.body_limits = BodyLimits(max_body_size, body_spill_threshold)
+        if compression is True:
+            compression = _compression.Compression()
+        self.compression = compression or None
+        self._router = Router(cache_size=route_cache_size)
+        self._mounts = []
+        self._blocking = blocking
+        self._executor = BlockingExecutor(executor_workers)
+        self._response_cache = ResponseCache(response_cache_size, response_cache_max_bytes)
+        if metrics is True:
+            metrics = _metrics.Metrics()
+        self.metrics = metrics or None
+        if metrics_path is not None:
+            self._add_metrics_route(metrics_path)
+        self.profiler = profiler
+
+    def route_cache_info(self) -> Optional[CacheInfo]:
+        """Statistics of the route lookup cache, None if disabled"""
+        return self._router.cache_info()
+
+    def response_cache_info(self) -> CacheInfo:
+        """Statistics of the cache of the routes declared with ``cache_ttl``"""
+        return self._response_cache.info()
+
+    def executor_stats(self) -> ExecutorStats:
+        """Load of the thread pool running the blocking handlers"""
+        return self._executor.stats()
 
     def route(
-        self, path: str, methods: List[str] = ["GET"]
+        self, path: str, methods: List[str] = ["GET"], **options: Any
     ) -> Callable[[HandlerFunc], DecoratedHandlerFunc]:
         """
         Flask-style decorator to bind a function to an URL.
         By default, just listens to GET, use ``methods=[...]`` to handle other methods.
+
+        The first parameter of the handler receives the request, the following ones the path parameters or the
+        query args of the same name, converted according to their annotation (``int``, ``float``, ``bool``,
+        ``List[...]``). Handlers can also be ``async def`` functions.
+
+        Options, also accepted by the FastAPI-style decorators:
+         - ``blocking``: run the (sync) handler on the thread pool of the event loop based engines, instead of the
+           loop thread. Defaults to the ``blocking`` parameter of the app.
+         - ``cache_ttl``: cache the 200 responses to GET and HEAD requests for that many seconds, the handler is not
+           called while the cached response is fresh. The cached responses have an ``ETag`` and the requests with a
+           matching ``If-None-Match`` get a 304. The key is the path and the whole query string, or only the query
+           args listed in ``cache_query``, and the values of the request headers listed in ``cache_headers``.
         """
         # TODO: Flask binds HEAD and OPTIONS as well automatically, we need to see how to handle these correctly...
-        return self._generate_handler_decorator(methods, path)
+        return self._generate_handler_decorator(methods, path, **options)
 
-    def get(self, path: str) -> Callable[[HandlerFunc], DecoratedHandlerFunc]:
+    def get(
+        self, path: str, **options: Any
+    ) -> Callable[[HandlerFunc], DecoratedHandlerFunc]:
         """FastAPI-style decorator to bind a function to a GET request"""
-        return self._generate_handler_decorator(["GET"], path)
+        return self._generate_handler_decorator(["GET"], path, **options)
 
-    def head(self, path: str) -> Callable[[HandlerFunc], DecoratedHandlerFunc]:
+    def head(
+        self, path: str, **options: Any
+    ) -> Callable[[HandlerFunc], DecoratedHandlerFunc]:
         """FastAPI-style decorator to bind a function to a HEAD request"""
-        return self._generate_handler_decorator(["HEAD"], path)
+        return self._generate_handler_decorator(["HEAD"], path, **options)
 
-    def post(self, path: str) -> Callable[[HandlerFunc], DecoratedHandlerFunc]:
+    def post(
+        self, path: str, **options: Any
+    ) -> Callable[[HandlerFunc], DecoratedHandlerFunc]:
         """FastAPI-style decorator to bind a function to a POST request"""
-        return self._generate_handler_decorator(["POST"], path)
+        return self._generate_handler_decorator(["POST"], path, **options)
 
-    def put(self, path: str) -> Callable[[HandlerFunc], DecoratedHandlerFunc]:
+    def put(
+        self, path: str, **options: Any
+    ) -> Callable[[HandlerFunc], DecoratedHandlerFunc]:
         """FastAPI-style decorator to bind a function to a PUT request"""
-        return self._generate_handler_decorator(["PUT"], path)
+        return self._generate_handler_decorator(["PUT"], path, **options)
 
-    def delete(self, path: str) -> Callable[[HandlerFunc], DecoratedHandlerFunc]:
+    def delete(
+        self, path: str, **options: Any
+    ) -> Callable[[HandlerFunc], DecoratedHandlerFunc]:
         """FastAPI-style decorator to bind a function to a DELETE request"""
-        return self._generate_handler_decorator(["DELETE"], path)
+        return self._generate_handler_decorator(["DELETE"], path, **options)
 
-    def connect(self, path: str) -> Callable[[HandlerFunc], DecoratedHandlerFunc]:
+    def connect(
+        self, path: str, **options: Any
+    ) -> Callable[[HandlerFunc], DecoratedHandlerFunc]:
         """FastAPI-style decorator to bind a function to a CONNECT request"""
-        return self._generate_handler_decorator(["CONNECT"], path)
+        return self._generate_handler_decorator(["CONNECT"], path, **options)
 
-    def options(self, path: str) -> Callable[[HandlerFunc], DecoratedHandlerFunc]:
+    def options(
+        self, path: str, **options: Any
+    ) -> Callable[[HandlerFunc], DecoratedHandlerFunc]:
         """FastAPI-style decorator to bind a function to a OPTIONS request"""
-        return self._generate_handler_decorator(["OPTIONS"], path)
+        return self._generate_handler_decorator(["OPTIONS"], path, **options)
 
-    def trace(self, path: str) -> Callable[[HandlerFunc], DecoratedHandlerFunc]:
+    def trace(
+        self, path: str, **options: Any
+    ) -> Callable[[HandlerFunc], DecoratedHandlerFunc]:
         """FastAPI-style decorator to bind a function to a TRACE request"""
-        return self._generate_handler_decorator(["TRACE"], path)
+        return self._generate_handler_decorator(["TRACE"], path, **options)
+
+    def mount_static(self, prefix: str, directory: str, **options: Any) -> StaticFiles:
+        """
+        Serve the files of ``directory`` under the URL ``prefix``, e.g. ``app.mount_static("/assets", "./static")``.
+        The routes take precedence over the mounts. ``options`` are passed to ``StaticFiles`` (cache sizes).
+        """
+        static_files = StaticFiles(directory, **options)
+        prefix = "/" + prefix.strip("/")
+        start = len(prefix)
+
+        def static_handler(req: Request) -> Response:
+            return static_files.serve(req, req.path[start:])
+
+        static_handler._nanohttpy_route = prefix.rstrip("/") + "/{path}"  # type: ignore
+
+        self._mounts.append((prefix if prefix != "/" else "", static_handler))
+        # Longest prefix first
+        self._mounts.sort(key=lambda mount: len(mount[0]), reverse=True)
+        return static_files
 
     def lookup(self, req: Request) -> HandlerFunc:
-        handler = self._router.get_handler(req)
+        """The handler of the request. Sets ``req.route`` to the pattern of the matching route"""
+        try:
+            handler = self._router.get_handler(req)
+        except NotFoundError:
+            # Only looked up when no route matches, the routes don't pay for the mounts
+            path = req.path
+            for prefix, handler in self._mounts:
+                if path.startswith(prefix) and path[len(prefix) : len(prefix) + 1] == "/":
+                    req.route = handler._nanohttpy_route  # type: ignore
+                    return handler
+            raise
+        req.route = getattr(handler, "_nanohttpy_route", None)
         return handler
 
     def handle(self, req: Request) -> Response:
+        """
+        Synchronous entrypoint, used by the thread based engines.
+        Async handlers are run to completion on an event loop dedicated to the calling thread.
+        """
+        start, shard = self._start_handling()
+        routed = 0.0
         try:
-            handler = self.lookup(req)
-            return adapt_response(handler(req))
-        except HttpError as e:
+            handler, routed, res, cache_key = self._before_handler(req)
+            if res is None:
+                profiler = self.profiler
+                if profiler is not None and profiler.should_profile(req):
+                    result = profiler.profile_call(req, _call_handler_sync, handler, req)
+                else:
+                    result = handler(req)
+                    if is_async_handler(handler):
+                        result = run_coroutine_sync(result)
+                res = self._after_handler(req, handler, result, cache_key)
+        except (SystemExit, KeyboardInterrupt):
+            # The process is stopping (SIGTERM of a worker, Ctrl-C), not a failure of the request: answering with a
+            # 500 would keep the worker serving
+            if shard is not None:
+                shard.in_flight -= 1
+            raise
+        except BaseException as e:  # pylint: disable=broad-except
+            res = self._handle_exception(e)
+        self._end_handling(req, res, start, routed, shard)
+        return res
+
+    async def handle_async(self, req: Request) -> Response:
+        """Asynchronous entrypoint, used by the event loop based engines"""
+        start, shard = self._start_handling()
+        routed = 0.0
+        try:
+            handler, routed, res, cache_key = self._before_handler(req)
+            if res is None:
+                profiler = self.profiler
+                if profiler is not None and profiler.should_profile(req):
+                    result = await self._call_handler_profiled(profiler, handler, req)
+                elif is_blocking_handler(handler):
+                    result = await self._executor.run(handler, req)
+                else:
+                    result = handler(req)
+                    if is_async_handler(handler):
+                        result = await result
+                res = self._after_handler(req, handler, result, cache_key)
+        except (asyncio.CancelledError, SystemExit, KeyboardInterrupt):
+            # Cancelled, or the process is stopping, see handle
+            if shard is not None:
+                shard.in_flight -= 1
+            raise
+        except BaseException as e:  # pylint: disable=broad-except
+            res = self._handle_exception(e)
+        self._end_handling(req, res, start, routed, shard)
+        return res
+
+    # The steps shared by handle and handle_async, which only differ in how they call the handler
+
+    def _start_handling(self) -> Tuple[float, Any]:
+        """Start time of the request, and the metrics shard where it is counted in flight (None without metrics)"""
+        metrics = self.metrics
+        shard = None
+        if metrics is None:
+            start = time.perf_counter() if self._access_log else 0.0
+        else:
+            start = time.perf_counter() if self._access_log or metrics.timed_handling else 0.0
+            shard = metrics.shard()
+            shard.in_flight += 1
+        return start, shard
+
+    def _before_handler(self, req: Request) -> Tuple[HandlerFunc, float, Optional[Response], Any]:
+        """
+        Handler of the request, end time of the routing (0.0 if the phases are not timed), the cached response if any,
+        ready to be sent, and the key to store the response under when the route is cached but the response is not.
+        """
+        handler = self.lookup(req)
+        metrics = self.metrics
+        routed = time.perf_counter() if metrics is not None and metrics.timed_handling else 0.0
+        cache_policy = get_cache_policy(handler)
+        if cache_policy is None or req.method not in CACHEABLE_METHODS:
+            return handler, routed, None, None
+        cache_key = cache_policy.key(req)
+        res = self._response_cache.get(cache_key, req)
+        if res is None:
+            return handler, routed, None, cache_key
+        return handler, routed, self._compress(req, res), None
+
+    def _after_handler(self, req: Request, handler: HandlerFunc, result: Any, cache_key: Any) -> Response:
+        """Response to send for the result of the handler, stored in the response cache under ``cache_key`` if given"""
+        res = adapt_response(result).prepare(req)
+        # Raises before the response is cached: an invalid header is a bug of the handler, answered with a 500
+        check_response_headers(res.headers)
+        if cache_key is not None:
+            res = self._response_cache.put(cache_key, get_cache_policy(handler).ttl, req, res)  # type: ignore
+        return self._compress(req, res)
+
+    def _compress(self, req: Request, res: Response) -> Response:
+        if self.compression is None:
+            return res
+        return self.compression.compress_response(req, res)
+
+    def _end_handling(self, req: Request, res: Response, start: float, routed: float, shard: Any) -> None:
+        """Records the metrics and the access log of the request"""
+        metrics = self.metrics
+        if metrics is not None:
+            shard.in_flight -= 1
+            if not metrics.timed_handling:
+                # Only counted
+                metrics.count_request(shard, req, res.status_code)
+            elif routed:
+                metrics.record_handling(shard, req, res.status_code, routed - start, time.perf_counter() - routed)
+            else:
+                # No route matched
+                metrics.record_handling(shard, req, res.status_code, time.perf_counter() - start, None)
+        if self._access_log:
+            self._log_access(req, res, start)
+
+    async def _call_handler_profiled(self, profiler: "Profiler", handler: HandlerFunc, req: Request) -> Any:
+        if is_blocking_handler(handler):
+            return await self._executor.run(profiler.profile_call, req, handler, req)
+        if is_async_handler(handler):
+            return await profiler.profile_coroutine(req, handler(req))
+        return profiler.profile_call(req, handler, req)
+
+    def _handle_exception(self, e: BaseException) -> Response:
+        if isinstance(e, HttpError):
             # TODO: special Response subtype for errors ?
             # TODO: What about description ?
             return Response(status_code=e.code)
-        except BaseException as e:  # pylint: disable=broad-except
-            logger.error("%s\n%s", e, traceback.format_exc())
-            return Response(status_code=500)
+        # The traceback is formatted by the log writer thread
+        logger.error("%s", e, exc_info=e)
+        return Response(status_code=500)
+
+    def _add_metrics_route(self, path: str) -> None:
+        metrics = self.metrics
+        if metrics is None:
+            raise NanoHttpyError("metrics_path requires metrics=True")
+
+        @self.get(path)
+        def metrics_handler(req: Request) -> Response:  # pylint: disable=unused-argument
+            return Response(metrics.render(), headers={"Content-Type": _metrics.CONTENT_TYPE})
+
+    @staticmethod
+    def _log_access(req: Request, res: Response, start: float) -> None:
+        access_logger.info(
+            "%s %s %d",
+            req.method,
+            req.full_path,
+            res.status_code,
+            extra={
+                "method": req.method,
+                "path": req.full_path,
+                "version": req.request_version,
+                "status": res.status_code,
+                "duration_ms": round((time.perf_counter() - start) * 1000, 3),
+            },
+        )
 
-    def run(self, port=5000, engine=None):
+    def run(self, port=5000, engine=None, workers=1, reuse_port=False):
+        """
+        Serve the app until interrupted. With ``workers > 1``, the engine is run in as many forked processes,
+        sharing the listening socket (or each binding its own with ``reuse_port``, using SO_REUSEPORT).
+        """
         if engine is None:
             # We import inside the method to limit the import overhead when the user uses a custom engine
             # And btw it gets rid of the cyclic dep between the PythonEngine and this class
@@ -95,35 +423,56 @@ class NanoHttpy:
             engine.__module__,
             engine.__name__,
         )
-        engine = engine(("", port), self)
+        # Compiled once in the parent process, shared by the workers. Reports the conflicting routes before serving
+        self._router.freeze()
+        server_address = ("", port)
+
+        def serve(sock=None):
+            # The engine is created in the worker, after the fork, as it may start an event loop or threads
+            engine(server_address, self, sock=sock).serve_forever()
 
         logger.info("Running on http://127.0.0.1:%d (Press CTRL+C to quit)", port)
-        engine.serve_forever()
+        if workers > 1:
+            from nanohttpy.workers import (  # pylint: disable=import-outside-toplevel
+                run_workers,
+            )
+            logger.info("Starting %d worker processes", workers)
+            run_workers(serve, server_address, workers, reuse_port=reuse_port)
+        else:
+            serve()
 
     def _generate_handler_decorator(
-        self, http_methods: List[str], path: str
+        self,
+        http_methods: List[str],
+        path: str,
+        blocking: Optional[bool] = None,
+        cache_ttl: Optional[float] = None,
+        cache_query: Optional[Sequence[str]] = None,
+        cache_headers: Sequence[str] = (),
     ) -> Callable[[HandlerFunc], DecoratedHandlerFunc]:
+        if cache_ttl is None and (cache_query is not None or cache_headers):
+            raise NanoHttpyError(f"cache_query and cache_headers of route '{path}' require cache_ttl")
+        cache_policy = (
+            CachePolicy.create(cache_ttl, cache_query, cache_headers) if cache_ttl is not None else None
+        )
+
         def handler(func: HandlerFunc) -> DecoratedHandlerFunc:
-            @functools.wraps(func)
-            def handler_wrapper(req: Request) -> HandlerFunc:
-                args: List[Any] = []
-                sig = signature(func)
-                expected_params = [
-                    p
-                    for p in sig.parameters.values()
-                    if p.kind == Parameter.POSITIONAL_OR_KEYWORD
-                ]
-                if len(expected_params) > 0:
-                    # The first arg is always the request
-                    args.append(req)
-                    # For the rest, we test first the path_param, then the query args
-                    for arg in expected_params[1:]:
-                        v = req.param(arg.name)
-                        if v is None:
-                            v = req.query(arg.name)
-                        args.append(v)
-                logger.debug("Calling handler with args %s", args)
-                return func(*args)
+            # When decorators are stacked, bind the original function rather than the previous wrapper
+            func = getattr(func, "_nanohttpy_func", func)
+            handler_wrapper = functools.wraps(func)(bind_handler(func, path))
+            handler_wrapper._nanohttpy_func = func  # type: ignore
+            # Detected once here, rather than for every request
+            is_async = inspect.iscoroutinefunction(func)
+            if is_async and blocking:
+                raise NanoHttpyError(
+                    f"Async handler <{func.__name__}> cannot be run on the blocking thread pool"
+                )
+            handler_wrapper._nanohttpy_async = is_async  # type: ignore
+            handler_wrapper._nanohttpy_blocking = not is_async and (  # type: ignore
+                self._blocking if blocking is None else blocking
+            )
+            handler_wrapper._nanohttpy_cache = cache_policy  # type: ignore
+            handler_wrapper._nanohttpy_route = path  # type: ignore
 
             for method in http_methods:
                 self._router.add_route(method, path, handler_wrapper)
@@ -0,0 +1,208 @@
+from enum import Enum
+from inspect import Parameter, signature
+from typing import (
+    Any,
+    Callable,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+    get_args,
+    get_origin,
+    get_type_hints,
+)
+
+from nanohttpy.exceptions import BadRequestError
+from nanohttpy.logging import logger
+from nanohttpy.requests import Request
+from nanohttpy.routing import check_param, tokenize_path
+from nanohttpy.types import DecoratedHandlerFunc, HandlerFunc
+
+Converter = Callable[[str], Any]
+ArgGetter = Callable[[Request], Any]
+
+_TRUE_VALUES = frozenset(("1", "true", "yes", "on"))
+_FALSE_VALUES = frozenset(("0", "false", "no", "off", ""))
+
+
+class ParamSource(Enum):
+    REQUEST = "request"
+    PATH = "path"
+    QUERY = "query"
+
+
+class ParamBinding(NamedTuple):
+    """Describes where the value of a handler parameter comes from, and how to convert it"""
+
+    name: str
+    source: ParamSource
+    converter: Optional[Converter] = None
+    multiple: bool = False  # Whether the parameter expects all the values, e.g. `List[str]`
+    default: Any = None
+
+
+def convert_bool(value: str) -> bool:
+    lowered = value.lower()
+    if lowered in _TRUE_VALUES:
+        return True
+    if lowered in _FALSE_VALUES:
+        return False
+    raise ValueError(f"invalid literal for bool: '{value}'")
+
+
+_CONVERTERS = {
+    str: None,
+    int: int,
+    float: float,
+    bool: convert_bool,
+}
+
+
+def path_parameter_names(path: str) -> Set[str]:
+    return {comp[1:-1] for comp in tokenize_path(path) if check_param(comp)}
+
+
+def _unwrap_optional(annotation: Any) -> Any:
+    if get_origin(annotation) is Union:
+        args = [a for a in get_args(annotation) if a is not type(None)]
+        if len(args) == 1:
+            return args[0]
+    return annotation
+
+
+def _resolve_annotation(annotation: Any) -> Tuple[Optional[Converter], bool]:
+    """Returns the converter of an annotation, and whether it's a list of values"""
+    annotation = _unwrap_optional(annotation)
+    multiple = False
+    if annotation is list or get_origin(annotation) in (list, List):
+        multiple = True
+        args = get_args(annotation)
+        annotation = _unwrap_optional(args[0]) if args else str
+    # Unknown annotations are left untouched, the handler will receive the raw str
+    return _CONVERTERS.get(annotation, None), multiple
+
+
+def build_binding_plan(func: HandlerFunc, path: str) -> List[ParamBinding]:
+    """
+    Inspect the signature of a handler, and decide once for all where each parameter comes from.
+    The first parameter is always the request, the others are path parameters if the route declares them,
+    otherwise query args.
+    """
+    try:
+        hints = get_type_hints(func)
+    except Exception:  # pylint: disable=broad-except
+        # Unresolvable forward references, we fallback on the raw annotations
+        hints = {}
+    path_params = path_parameter_names(path)
+    expected_params = [
+        p
+        for p in signature(func).parameters.values()
+        if p.kind == Parameter.POSITIONAL_OR_KEYWORD
+    ]
+
+    plan: List[ParamBinding] = []
+    for i, param in enumerate(expected_params):
+        annotation = hints.get(param.name, param.annotation)
+        if i == 0 or annotation is Request:
+            plan.append(ParamBinding(param.name, ParamSource.REQUEST))
+            continue
+        converter, multiple = _resolve_annotation(annotation)
+        plan.append(
+            ParamBinding(
+                param.name,
+                ParamSource.PATH if param.name in path_params else ParamSource.QUERY,
+                converter,
+                multiple,
+                None if param.default is Parameter.empty else param.default,
+            )
+        )
+    return plan
+
+
+def _convert(binding: ParamBinding, value: str) -> Any:
+    try:
+        return binding.converter(value)  # type: ignore
+    except ValueError as e:
+        raise BadRequestError(
+            f"Invalid value for {binding.source.value} parameter '{binding.name}': {e}"
+        ) from e
+
+
+def _request_getter(req: Request) -> Request:
+    return req
+
+
+def make_arg_getter(binding: ParamBinding) -> ArgGetter:
+    """Generate a specialized function retrieving the value of a parameter from a request"""
+    if binding.source is ParamSource.REQUEST:
+        return _request_getter
+
+    name, converter, default = binding.name, binding.converter, binding.default
+
+    if binding.source is ParamSource.PATH:
+        if binding.multiple:
+
+            def path_list_getter(req: Request) -> Any:
+                v = req.path_parameters.get(name)
+                if v is None:
+                    return default
+                return [v if converter is None else _convert(binding, v)]
+
+            return path_list_getter
+
+        def path_getter(req: Request) -> Any:
+            v = req.path_parameters.get(name)
+            if v is None:
+                return default
+            return v if converter is None else _convert(binding, v)
+
+        return path_getter
+
+    if binding.multiple:
+
+        def query_list_getter(req: Request) -> Any:
+            values = req.args.get(name)
+            if not values:
+                return default
+            if converter is None:
+                return list(values)
+            return [_convert(binding, v) for v in values]
+
+        return query_list_getter
+
+    def query_getter(req: Request) -> Any:
+        values = req.args.get(name)
+        if not values:
+            return default
+        return values[0] if converter is None else _convert(binding, values[0])
+
+    return query_getter
+
+
+def bind_handler(func: HandlerFunc, path: str) -> DecoratedHandlerFunc:
+    """Wrap a handler in a function taking only a request, and running its binding plan"""
+    plan = build_binding_plan(func, path)
+    logger.debug("Binding plan for handler <%s>: %s", func.__name__, plan)
+
+    if not plan:
+
+        def no_arg_wrapper(_: Request) -> Any:
+            return func()
+
+        return no_arg_wrapper
+
+    if len(plan) == 1:
+
+        def req_only_wrapper(req: Request) -> Any:
+            return func(req)
+
+        return req_only_wrapper
+
+    getters = tuple(make_arg_getter(b) for b in plan)
+
+    def wrapper(req: Request) -> Any:
+        return func(*[g(req) for g in getters])
+
+    return wrapper
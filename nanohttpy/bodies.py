@@ -0,0 +1,186 @@
+"""
+Request bodies, received the same way by all the engines: bounded by a maximum size (413 beyond), kept in memory up to
+a threshold and spilled to a temporary file above.
+"""
+import re
+from typing import TYPE_CHECKING, Any, BinaryIO, Callable, Iterator, List, NamedTuple, Optional, Union
+
+from nanohttpy.exceptions import BadRequestError, PayloadTooLargeError
+from nanohttpy.headers import Headers
+from nanohttpy.lazy_loader import LazyLoader
+
+if TYPE_CHECKING:
+    import tempfile
+else:
+    # Only needed by the big bodies
+    tempfile = LazyLoader("tempfile", globals(), "tempfile")
+
+# Size of the reads from the socket or the temporary file
+CHUNK_SIZE = 64 * 1024
+
+DEFAULT_MAX_BODY_SIZE = 100 * 1024 * 1024
+DEFAULT_SPILL_THRESHOLD = 1024 * 1024
+
+
+class BodyLimits(NamedTuple):
+    max_size: Optional[int] = DEFAULT_MAX_BODY_SIZE
+    spill_threshold: int = DEFAULT_SPILL_THRESHOLD
+
+
+class RequestBody:
+    """
+    Body of a request received by chunks. Kept in memory up to ``spill_threshold`` bytes, then in a temporary file
+    (deleted once the request is garbage collected). Raises PayloadTooLargeError beyond ``max_size`` bytes.
+    """
+
+    __slots__ = ("_limits", "_chunks", "_size", "_file")
+
+    _limits: BodyLimits
+    _chunks: List[bytes]
+    _size: int
+    _file: Optional[BinaryIO]
+
+    def __init__(self, limits: BodyLimits) -> None:
+        self._limits = limits
+        self._chunks = []
+        self._size = 0
+        self._file = None
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def spilled(self) -> bool:
+        return self._file is not None
+
+    def write(self, data: Union[bytes, memoryview]) -> None:
+        size = self._size + len(data)
+        max_size = self._limits.max_size
+        if max_size is not None and size > max_size:
+            raise PayloadTooLargeError()
+        self._size = size
+        if self._file is not None:
+            self._file.write(data)
+        elif size > self._limits.spill_threshold:
+            self._file = tempfile.TemporaryFile(prefix="nanohttpy-body-")  # pylint: disable=consider-using-with
+            self._file.writelines(self._chunks)
+            self._file.write(data)
+            self._chunks = []
+        else:
+            self._chunks.append(bytes(data))
+
+    def finish(self) -> Union[bytes, "RequestBody"]:
+        """The body as bytes if it stayed in memory, otherwise this object to read the temporary file"""
+        if self._file is None:
+            return b"".join(self._chunks)
+        return self
+
+    def read(self) -> bytes:
+        """The whole body, loaded in memory"""
+        if self._file is None:
+            return b"".join(self._chunks)
+        self._file.seek(0)
+        return self._file.read()
+
+    def iter_chunks(self, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        if self._file is None:
+            yield from self._chunks
+            return
+        self._file.seek(0)
+        while True:
+            data = self._file.read(chunk_size)
+            if not data:
+                return
+            yield data
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+
+
+def read_body(
+    rfile: Any,
+    headers: Headers,
+    limits: BodyLimits,
+    send_continue: Optional[Callable[[], None]] = None,
+) -> Union[bytes, RequestBody]:
+    """
+    Read the body of a request from a blocking file-like object, framed by ``Transfer-Encoding: chunked`` or
+    ``Content-Length`` (no body otherwise). ``send_continue`` answers ``Expect: 100-continue``, it is only called if
+    the body is going to be read.
+    Raises BadRequestError if the framing is invalid, PayloadTooLargeError if the body is too big.
+    """
+    transfer_encoding = headers.get("Transfer-Encoding")
+    if transfer_encoding is not None:
+        if transfer_encoding.strip().lower() != "chunked":
+            raise BadRequestError(f"Unsupported Transfer-Encoding '{transfer_encoding}'")
+        if send_continue is not None:
+            send_continue()
+        body = RequestBody(limits)
+        _read_chunked(rfile, body)
+        return body.finish()
+
+    content_lengths = headers.get_all("Content-Length")
+    if not content_lengths:
+        return b""
+    content_length = content_lengths[0]
+    # Repeated, the values must agree, otherwise the framing is ambiguous (request smuggling)
+    if any(value != content_length for value in content_lengths):
+        raise BadRequestError("Conflicting Content-Length")
+    # Only digits, int() would also accept a sign, underscores and surrounding whitespace
+    if not _is_content_length(content_length):
+        raise BadRequestError("Invalid Content-Length")
+    length = int(content_length)
+    if limits.max_size is not None and length > limits.max_size:
+        # Rejected before the client sends it
+        raise PayloadTooLargeError()
+    if length == 0:
+        return b""
+    if send_continue is not None:
+        send_continue()
+    if length <= limits.spill_threshold:
+        data = rfile.read(length)
+        if len(data) < length:
+            raise BadRequestError("Incomplete body")
+        return data
+
+    body = RequestBody(limits)
+    remaining = length
+    while remaining > 0:
+        data = rfile.read(min(remaining, CHUNK_SIZE))
+        if not data:
+            raise BadRequestError("Incomplete body")
+        body.write(data)
+        remaining -= len(data)
+    return body.finish()
+
+
+# Only hex digits: int(..., 16) also accepts a sign, a "0x" prefix and underscores
+_is_chunk_size = re.compile(rb"[0-9A-Fa-f]+").fullmatch
+_is_content_length = re.compile(r"[0-9]+").fullmatch
+
+
+def _read_chunked(rfile: Any, body: RequestBody) -> None:
+    while True:
+        line = rfile.readline(CHUNK_SIZE + 1)
+        # Chunk extensions are ignored
+        size_field = line.split(b";", 1)[0].strip()
+        if _is_chunk_size(size_field) is None:
+            raise BadRequestError("Invalid chunk size")
+        size = int(size_field, 16)
+        if size == 0:
+            break
+        while size > 0:
+            data = rfile.read(min(size, CHUNK_SIZE))
+            if not data:
+                raise BadRequestError("Incomplete body")
+            body.write(data)
+            size -= len(data)
+        if rfile.read(2) != b"\r\n":
+            raise BadRequestError("Invalid chunk")
+    # Trailer fields, ignored
+    while True:
+        line = rfile.readline(CHUNK_SIZE + 1)
+        if line in (b"\r\n", b"\n", b""):
+            return
@@ -0,0 +1,106 @@
+from collections import OrderedDict
+import threading
+from typing import Callable, Generic, Hashable, NamedTuple, Optional, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    maxsize: int
+    currsize: int
+    currbytes: int  # Always 0 if the cache is not bounded by size
+
+
+class LRUCache(Generic[K, V]):
+    """
+    Thread-safe LRU cache, bounded by number of entries and optionally by total size of the values, as measured
+    by ``sizeof``. Values bigger than ``max_bytes`` are never stored.
+    """
+
+    maxsize: int
+    max_bytes: Optional[int]
+    _sizeof: Optional[Callable[[V], int]]
+    _data: "OrderedDict[K, V]"
+    _lock: threading.Lock
+    _bytes: int
+    _hits: int
+    _misses: int
+    _evictions: int
+
+    def __init__(
+        self,
+        maxsize: int,
+        max_bytes: Optional[int] = None,
+        sizeof: Optional[Callable[[V], int]] = None,
+    ) -> None:
+        if max_bytes is not None and sizeof is None:
+            sizeof = len  # type: ignore
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof if max_bytes is not None else None
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._hits = self._misses = self._evictions = 0
+
+    def get(self, key: K) -> Optional[V]:
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self._misses += 1
+                return None
+            self._data.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def put(self, key: K, value: V) -> None:
+        size = self._sizeof(value) if self._sizeof is not None else 0
+        if self.maxsize <= 0 or (self.max_bytes is not None and size > self.max_bytes):
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None and self._sizeof is not None:
+                self._bytes -= self._sizeof(old)
+            self._data[key] = value
+            self._bytes += size
+            while len(self._data) > self.maxsize or (
+                self.max_bytes is not None and self._bytes > self.max_bytes
+            ):
+                _, evicted = self._data.popitem(last=False)
+                if self._sizeof is not None:
+                    self._bytes -= self._sizeof(evicted)
+                self._evictions += 1
+
+    def pop(self, key: K) -> Optional[V]:
+        with self._lock:
+            value = self._data.pop(key, None)
+            if value is not None and self._sizeof is not None:
+                self._bytes -= self._sizeof(value)
+            return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(
+                self._hits,
+                self._misses,
+                self._evictions,
+                self.maxsize,
+                len(self._data),
+                self._bytes,
+            )
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._data
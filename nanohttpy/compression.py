@@ -0,0 +1,186 @@
+"""
+Response compression, negotiated with the ``Accept-Encoding`` header of the request: gzip or deflate, for the
+compressible content types only. The streaming responses are compressed chunk by chunk, as they are sent.
+"""
+import zlib
+from typing import Any, AsyncIterator, Dict, FrozenSet, Iterable, Iterator, NamedTuple, Optional, Tuple, cast
+
+from nanohttpy.caching import CacheInfo, LRUCache
+from nanohttpy.exceptions import NanoHttpyError
+from nanohttpy.http import accepts_encoding, find_response_header, get_response_header
+from nanohttpy.requests import Request
+from nanohttpy.responses import FileResponse, Response, StreamingResponse
+
+DEFAULT_COMPRESSIBLE_TYPES = frozenset(
+    {
+        "text/*",
+        "application/json",
+        "application/x-ndjson",
+        "application/javascript",
+        "application/xml",
+        "application/xhtml+xml",
+        "application/wasm",
+        "image/svg+xml",
+    }
+)
+
+# By order of preference, with their zlib wbits (gzip container, or the zlib one expected by "deflate")
+_ENCODINGS: Dict[str, int] = {"gzip": 16 + zlib.MAX_WBITS, "deflate": zlib.MAX_WBITS}
+
+
+class _CompressedBody(NamedTuple):
+    source_size: int
+    data: bytes
+
+
+class Compression:
+    """
+    Compresses the responses of at least ``min_size`` bytes whose type is in ``content_types`` (``"text/*"`` matches
+    all the text types), with the first of ``encodings`` accepted by the client, at zlib ``level``. The responses that
+    already have a Content-Encoding, the files (sent with sendfile) and the partial responses are left untouched.
+
+    The compressed bodies are kept in a LRU cache of ``cache_size`` entries and ``cache_max_bytes`` bytes (source and
+    compressed bodies), keyed by the body itself: a response that never changes is only compressed once.
+    """
+
+    min_size: int
+    level: int
+    encodings: Tuple[str, ...]
+    content_types: FrozenSet[str]
+    _cache: LRUCache[Tuple[str, bytes], _CompressedBody]
+
+    def __init__(
+        self,
+        min_size: int = 1024,
+        content_types: Iterable[str] = DEFAULT_COMPRESSIBLE_TYPES,
+        level: int = 6,
+        encodings: Iterable[str] = ("gzip", "deflate"),
+        cache_size: int = 256,
+        cache_max_bytes: int = 8 * 1024 * 1024,
+    ) -> None:
+        self.min_size = min_size
+        self.level = level
+        self.encodings = tuple(encodings)
+        for encoding in self.encodings:
+            if encoding not in _ENCODINGS:
+                raise NanoHttpyError(f"Unsupported encoding '{encoding}', expected one of {list(_ENCODINGS)}")
+        self.content_types = frozenset(t.lower() for t in content_types)
+        self._cache = LRUCache(
+            cache_size, max_bytes=cache_max_bytes, sizeof=lambda c: c.source_size + len(c.data)
+        )
+
+    def cache_info(self) -> CacheInfo:
+        return self._cache.info()
+
+    def is_compressible(self, content_type: Optional[str]) -> bool:
+        if not content_type:
+            return False
+        media_type = content_type.partition(";")[0].strip().lower()
+        content_types = self.content_types
+        return media_type in content_types or media_type.partition("/")[0] + "/*" in content_types
+
+    def negotiate(self, accept_encoding: Optional[str]) -> Optional[str]:
+        """The encoding to use for the ``Accept-Encoding`` header value, None to not compress"""
+        if not accept_encoding:
+            return None
+        for encoding in self.encodings:
+            if accepts_encoding(accept_encoding, encoding):
+                return encoding
+        return None
+
+    def compress_response(self, req: Request, res: Response) -> Response:
+        """The response to send for the request: ``res`` itself, or a compressed copy. ``res`` is never modified"""
+        status_code = res.status_code
+        if status_code < 200 or status_code in (204, 206, 304) or isinstance(res, FileResponse):
+            return res
+        # The handlers may set the headers in any case
+        headers = res.headers
+        if find_response_header(headers, "Content-Encoding") is not None:
+            return res
+        if "no-transform" in (get_response_header(headers, "Cache-Control") or "").lower():
+            return res
+        streaming = isinstance(res, StreamingResponse)
+        if not streaming and len(res.encoded_body) < self.min_size:
+            return res
+        if not self.is_compressible(get_response_header(headers, "Content-Type")):
+            return res
+
+        # Whether compressed or not, the response depends on the Accept-Encoding of the request
+        headers = dict(headers)
+        vary_header = find_response_header(headers, "Vary")
+        vary = headers.pop(vary_header) if vary_header is not None else None
+        if not vary:
+            vary = "Accept-Encoding"
+        elif "accept-encoding" not in vary.lower() and vary.strip() != "*":
+            vary += ", Accept-Encoding"
+        headers["Vary"] = vary
+
+        encoding = self.negotiate(req.headers.get("Accept-Encoding"))
+        if streaming:
+            source = cast(StreamingResponse, res)
+            stream = source.body_iterator
+            if encoding is not None:
+                headers["Content-Encoding"] = encoding
+                _pop_header(headers, "Content-Length")
+                _weaken_etag(headers)
+                compressor = zlib.compressobj(self.level, zlib.DEFLATED, _ENCODINGS[encoding])
+                if hasattr(stream, "__aiter__"):
+                    stream = _compress_async(source, compressor)
+                else:
+                    stream = _compress_sync(source, compressor)
+            return StreamingResponse(stream, status_code, headers)
+
+        body = res.encoded_body
+        if encoding is not None:
+            compressed = self._compress(encoding, body)
+            # Not worth it for incompressible content
+            if len(compressed) < len(body):
+                headers["Content-Encoding"] = encoding
+                # Set again for the compressed body by the Response
+                _pop_header(headers, "Content-Length")
+                body = compressed
+                _weaken_etag(headers)
+        return Response(body, status_code, headers)
+
+    def _compress(self, encoding: str, body: bytes) -> bytes:
+        key = (encoding, body)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached.data
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, _ENCODINGS[encoding])
+        data = compressor.compress(body) + compressor.flush()
+        self._cache.put(key, _CompressedBody(len(body), data))
+        return data
+
+
+def _pop_header(headers: Dict[str, str], name: str) -> None:
+    header = find_response_header(headers, name)
+    while header is not None:
+        del headers[header]
+        header = find_response_header(headers, name)
+
+
+def _weaken_etag(headers: Dict[str, str]) -> None:
+    # The compressed body is not byte-identical to the one the ETag was computed for, only semantically equivalent
+    header = find_response_header(headers, "ETag")
+    if header is not None and not headers[header].startswith("W/"):
+        headers[header] = "W/" + headers[header]
+
+
+def _compress_sync(source: StreamingResponse, compressor: Any) -> Iterator[bytes]:
+    try:
+        for chunk in source.iter_sync():
+            # Flushed for every chunk, so that the client receives them as they are produced
+            yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        yield compressor.flush()
+    finally:
+        source.close()
+
+
+async def _compress_async(source: StreamingResponse, compressor: Any) -> AsyncIterator[bytes]:
+    try:
+        async for chunk in source.iter_async():
+            yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        yield compressor.flush()
+    finally:
+        await source.aclose()
@@ -0,0 +1,103 @@
+import os
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Coroutine, NamedTuple, Optional, Tuple, TypeVar
+
+from nanohttpy.exceptions import NanoHttpyError
+from nanohttpy.lazy_loader import LazyLoader
+
+if TYPE_CHECKING:
+    import asyncio
+    from concurrent import futures
+else:
+    # Only needed to run the handlers, not to define the routes: imported on first use, as they are slow to import
+    asyncio = LazyLoader("asyncio", globals(), "asyncio")
+    futures = LazyLoader("futures", globals(), "concurrent.futures")
+
+T = TypeVar("T")
+
+_thread_local = threading.local()
+
+
+def run_coroutine_sync(coro: Coroutine[Any, Any, T]) -> T:
+    """
+    Bridge used by the synchronous engines to run async handlers.
+    Each thread lazily creates its own event loop, and reuses it for the following calls.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        pass
+    else:
+        coro.close()
+        raise NanoHttpyError(
+            "Cannot run an async handler synchronously from a running event loop, use NanoHttpy.handle_async instead"
+        )
+
+    loop = getattr(_thread_local, "loop", None)
+    if loop is None or loop.is_closed():
+        loop = _thread_local.loop = asyncio.new_event_loop()
+    return loop.run_until_complete(coro)
+
+
+class ExecutorStats(NamedTuple):
+    max_workers: int
+    queue_depth: int  # Submitted calls waiting for a free thread
+    active: int  # Calls currently running
+    completed: int
+
+
+class BlockingExecutor:
+    """
+    Bounded thread pool used by the event loop based engines to run the blocking handlers.
+    The threads are only started on the first call, which keeps the app fork-friendly.
+    """
+
+    max_workers: int
+    _pool: Optional["futures.ThreadPoolExecutor"]
+    _lock: threading.Lock
+    _submitted: int
+    _started: int
+    _completed: int
+
+    def __init__(self, max_workers: Optional[int] = None) -> None:
+        # Same default as ThreadPoolExecutor
+        self.max_workers = max_workers or min(32, (os.cpu_count() or 1) + 4)
+        self._pool = None
+        self._lock = threading.Lock()
+        self._submitted = 0
+        self._started = 0
+        self._completed = 0
+
+    def run(self, func: Callable[..., T], *args: Any) -> "asyncio.Future[T]":
+        """Schedule ``func(*args)`` on the pool, must be called from the event loop"""
+        if self._pool is None:
+            self._pool = futures.ThreadPoolExecutor(
+                self.max_workers, thread_name_prefix="nanohttpy-blocking"
+            )
+        self._submitted += 1  # Only incremented from the loop thread, no need to lock
+        return asyncio.get_running_loop().run_in_executor(
+            self._pool, self._tracked_call, func, args
+        )
+
+    def _tracked_call(self, func: Callable[..., T], args: Tuple[Any, ...]) -> T:
+        with self._lock:
+            self._started += 1
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self._completed += 1
+
+    def stats(self) -> ExecutorStats:
+        submitted, started, completed = self._submitted, self._started, self._completed
+        return ExecutorStats(
+            self.max_workers,
+            max(submitted - started, 0),
+            max(started - completed, 0),
+            completed,
+        )
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
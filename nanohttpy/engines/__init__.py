@@ -3,7 +3,7 @@ from typing import TYPE_CHECKING
 from nanohttpy.lazy_loader import LazyLoader as _LazyLoader
 
 if TYPE_CHECKING:
-    from nanohttpy.engines.python import PythonEngine
+    from nanohttpy.engines.python import PythonEngine, ThreadedPythonEngine
     from nanohttpy.engines.uvloop import UvloopEngine
 
 _engines_package = "nanohttpy.engines."
@@ -16,6 +16,8 @@ _uvloop = _LazyLoader("_uvloop", globals(), _engines_package + "uvloop")
 def __getattr__(name):
     if name in ['PythonEngine']:
         return _python.PythonEngine
+    elif name in ['ThreadedPythonEngine']:
+        return _python.ThreadedPythonEngine
     elif name in ['UvloopEngine']:
         return _uvloop.UvloopEngine
     else:
@@ -1,39 +1,183 @@
+from concurrent.futures import ThreadPoolExecutor
 from http.server import HTTPServer, BaseHTTPRequestHandler
-from typing import Tuple, cast
+import socket
+import threading
+import time
+from typing import Mapping, Optional, Set, Tuple, cast
 
-from nanohttpy.http import HTTP_METHODS, HTTPHeaders
+from nanohttpy.http import HTTP_METHODS
 from nanohttpy.applications import NanoHttpy
+from nanohttpy.bodies import read_body
+from nanohttpy.exceptions import HttpError
+from nanohttpy.headers import Headers
+from nanohttpy.logging import logger
 from nanohttpy.requests import Request
+from nanohttpy.responses import FileResponse, Response, StreamingResponse
+from nanohttpy.wire import LAST_CHUNK, encode_chunk, response_connection, serialize_head, serialize_response
+
+# How long the rest of a rejected request is read and discarded before closing the connection
+_LINGER_TIMEOUT = 2.0
 
 
 class _PythonEngineHandler(BaseHTTPRequestHandler):
+    _expect_continue = False
+    _parse_start = 0.0
+
     def _get_app(self) -> NanoHttpy:
         return cast(PythonEngine, self.server).app
 
-    def generic_do(self, method: str, read_body=True) -> None:
-        request = Request(
-            method,
-            self.path,
-            self.request_version,
-            cast(HTTPHeaders, self.headers),
-            # TODO: handle Transfer-Encoding etc...
-            self.rfile.read(int(self.headers["Content-Length"])) if read_body else b'',
-        )
-        response = self._get_app().handle(request)
-        self.send_response(response.status_code)
-        for k, v in response.headers.items():
-            self.send_header(k, v)
-        self.end_headers()
-        self.wfile.write(response.encoded_body)
+    def handle_expect_100(self) -> bool:
+        # The 100 Continue is only sent once we know that the body is going to be read, see read_body
+        self._expect_continue = True
+        return True
+
+    def parse_request(self) -> bool:
+        # Start of the parse phase of the metrics, once the request line is received
+        metrics = self._get_app().metrics
+        self._parse_start = time.perf_counter() if metrics is not None and metrics.timed_engine else 0.0
+        return super().parse_request()
+
+    def _send_continue(self) -> None:
+        self.wfile.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+
+    def _linger(self) -> None:
+        """
+        Half-close the connection after an error response, and discard the rest of the request until the client closes
+        its side, for at most _LINGER_TIMEOUT. Closing with unread data would reset the connection, and the client
+        could lose the response.
+        """
+        deadline = time.monotonic() + _LINGER_TIMEOUT
+        try:
+            self.wfile.flush()
+            self.connection.shutdown(socket.SHUT_WR)
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                self.connection.settimeout(remaining)
+                if not self.connection.recv(64 * 1024):
+                    return
+        except OSError:
+            pass
+
+    def generic_do(self, method: str) -> None:
+        app = self._get_app()
+        # The headers parsed by http.server, in the same container as the other engines
+        headers = Headers(cast(Mapping[str, str], self.headers))
+        send_continue = self._send_continue if self._expect_continue else None
+        self._expect_continue = False
+        try:
+            body = read_body(self.rfile, headers, app.body_limits, send_continue)
+        except HttpError as e:
+            # The rest of the body, if any, is not read: the connection can't be reused
+            self.close_connection = True
+            self.wfile.write(
+                serialize_response(
+                    Response(status_code=e.code),
+                    self.protocol_version,
+                    "close" if self.protocol_version != "HTTP/1.0" else None,
+                )
+            )
+            self._linger()
+            return
+        request = Request(method, self.path, self.request_version, headers, body)
+        metrics = app.metrics
+        # The phases of the engine are only timed if they have a histogram
+        if metrics is not None and not metrics.timed_engine:
+            metrics = None
+        parsed = time.perf_counter() if metrics is not None else 0.0
+        response = app.handle(request)
+        streaming = isinstance(response, StreamingResponse)
+        # Chunked encoding is only understood by HTTP/1.1 clients, the others read the body until the connection closes
+        chunked = streaming and self.protocol_version != "HTTP/1.0" and self.request_version != "HTTP/1.0"
+        if (streaming and not chunked) or response_connection(response) == "close":
+            self.close_connection = True
+        connection = None
+        if self.close_connection:
+            if self.protocol_version != "HTTP/1.0":
+                connection = "close"
+        elif self.request_version == "HTTP/1.0":
+            # Keep-alive is not the default in HTTP/1.0, the client must know that we accepted it
+            connection = "keep-alive"
+        # The response to a HEAD request has the headers of the GET response, but never a body
+        include_body = method != "HEAD"
+        start = time.perf_counter() if metrics is not None else 0.0
+        serialize_duration = None
+        if streaming:
+            self._send_streaming(cast(StreamingResponse, response), connection, chunked, include_body)
+        elif isinstance(response, FileResponse):
+            self._send_file(response, connection, include_body)
+        else:
+            data = serialize_response(response, self.protocol_version, connection, include_body)
+            if metrics is not None:
+                serialized = time.perf_counter()
+                serialize_duration = serialized - start
+                start = serialized
+            self.wfile.write(data)
+        if metrics is not None:
+            metrics.record_engine_phases(
+                request, parsed - self._parse_start, serialize_duration, time.perf_counter() - start
+            )
+
+    def _send_streaming(
+        self, response: StreamingResponse, connection: Optional[str], chunked: bool, include_body: bool
+    ) -> None:
+        self.wfile.write(serialize_head(response, self.protocol_version, connection, chunked))
+        try:
+            if include_body:
+                for data in response.iter_sync():
+                    self.wfile.write(encode_chunk(data) if chunked else data)
+                if chunked:
+                    self.wfile.write(LAST_CHUNK)
+        except OSError:
+            # The client went away
+            self.close_connection = True
+        except Exception:  # pylint: disable=broad-except
+            # Too late to change the status, the client sees a truncated body
+            logger.exception("Error while streaming the response")
+            self.close_connection = True
+        finally:
+            response.close()
+
+    def _send_file(self, response: FileResponse, connection: Optional[str], include_body: bool) -> None:
+        self.wfile.write(serialize_head(response, self.protocol_version, connection))
+        if not include_body or not response.count:
+            return
+        try:
+            with open(response.path, "rb") as file:
+                # Zero-copy with os.sendfile, the file content never goes through Python
+                sent = self.connection.sendfile(file, response.offset, response.count)
+        except OSError:
+            sent = 0
+        if sent < response.count:
+            # The file was truncated or the client went away, the connection is out of sync
+            self.close_connection = True
+
+    def log_request(self, code="-", size="-") -> None:
+        # The access log is written by the app, when enabled
+        pass
+
+    def log_message(self, format: str, *args) -> None:  # pylint: disable=redefined-builtin
+        # Through the background log writer rather than a synchronous write to stderr
+        logger.info("%s - %s", self.address_string(), format % args)
+
+
+class _KeepAliveHandler(_PythonEngineHandler):
+    """HTTP/1.1 handler, the connection is kept open until the client closes it or stays idle for too long"""
+
+    protocol_version = "HTTP/1.1"
+
+    def setup(self) -> None:
+        self.timeout = cast(ThreadedPythonEngine, self.server).keep_alive_timeout
+        super().setup()
 
 
 def _init():
     """Method called once on module import"""
 
     def generate_http_callback(http_method: str):
-        read_body = http_method not in ("GET", "DELETE")
         def http_callback(self: _PythonEngineHandler) -> None:
-            self.generic_do(http_method, read_body=read_body)
+            self.generic_do(http_method)
 
         return http_callback
 
@@ -50,11 +194,93 @@ _init()
 
 
 class PythonEngine(HTTPServer):
+    """Single threaded engine, handling one connection at a time"""
+
     app: NanoHttpy
+    handler_class = _PythonEngineHandler
 
-    def __init__(self, server_address: Tuple[str, int], app: NanoHttpy) -> None:
-        HTTPServer.__init__(self, server_address, _PythonEngineHandler)
+    def __init__(
+        self,
+        server_address: Tuple[str, int],
+        app: NanoHttpy,
+        sock: Optional[socket.socket] = None,
+    ) -> None:
+        """``sock`` is an already listening socket to use, instead of binding ``server_address``"""
+        HTTPServer.__init__(
+            self, server_address, self.handler_class, bind_and_activate=sock is None
+        )
+        if sock is not None:
+            self.socket.close()
+            self.socket = sock
+            self.server_address = sock.getsockname()
+            self.server_name, self.server_port = socket.getfqdn(), self.server_address[1]
         self.app = app
 
     def serve_forever(self, poll_interval: float = 0.5):
-        HTTPServer.serve_forever(self, poll_interval)
+        try:
+            HTTPServer.serve_forever(self, poll_interval)
+        finally:
+            self.server_close()
+
+
+class ThreadedPythonEngine(PythonEngine):
+    """
+    Engine speaking HTTP/1.1 with persistent connections, each connection being handled by a thread of a bounded pool.
+    Once ``max_connections`` are open, the new connections wait in the listen backlog until one is closed.
+    Only relies on the standard library.
+    """
+
+    handler_class = _KeepAliveHandler
+    keep_alive_timeout: float
+    _pool: ThreadPoolExecutor
+    _connection_slots: threading.BoundedSemaphore
+    _connections: Set[socket.socket]
+    _connections_lock: threading.Lock
+
+    def __init__(
+        self,
+        server_address: Tuple[str, int],
+        app: NanoHttpy,
+        sock: Optional[socket.socket] = None,
+        max_connections: int = 64,
+        keep_alive_timeout: float = 5.0,
+    ) -> None:
+        """``keep_alive_timeout`` is the number of seconds an idle persistent connection is kept open"""
+        PythonEngine.__init__(self, server_address, app, sock=sock)
+        self.keep_alive_timeout = keep_alive_timeout
+        # One thread per open connection, the pool and the semaphore bound the concurrency together
+        self._pool = ThreadPoolExecutor(
+            max_connections, thread_name_prefix="nanohttpy-connection"
+        )
+        self._connection_slots = threading.BoundedSemaphore(max_connections)
+        self._connections = set()
+        self._connections_lock = threading.Lock()
+
+    def process_request(self, request, client_address):
+        # Blocks the accept loop while all the slots are taken
+        self._connection_slots.acquire()
+        with self._connections_lock:
+            self._connections.add(request)
+        self._pool.submit(self._process_request_thread, request, client_address)
+
+    def _process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:  # pylint: disable=broad-except
+            self.handle_error(request, client_address)
+        finally:
+            with self._connections_lock:
+                self._connections.discard(request)
+            self.shutdown_request(request)
+            self._connection_slots.release()
+
+    def server_close(self):
+        super().server_close()
+        # Wake up the threads waiting on idle connections, so that the pool can stop promptly
+        with self._connections_lock:
+            for conn in self._connections:
+                try:
+                    conn.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+        self._pool.shutdown(wait=True)
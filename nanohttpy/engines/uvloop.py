@@ -1,82 +1,418 @@
 import uvloop
 import asyncio
+import os
+import socket
+import time
+from collections import deque
+from httptools import HttpParserError, HttpParserUpgrade
 from  httptools.parser.parser import HttpRequestParser
-from typing import Any, Tuple
-from aiohttp.http import StreamWriter
+from typing import Any, Deque, List, Optional, Tuple, Union, cast
 from aiohttp.base_protocol import BaseProtocol
-from multidict import CIMultiDict
 
 from nanohttpy.applications import NanoHttpy
+from nanohttpy.bodies import RequestBody
+from nanohttpy.exceptions import PayloadTooLargeError
+from nanohttpy.logging import logger
 from nanohttpy.requests import Request
-from nanohttpy.http import HTTPHeaders
+from nanohttpy.responses import FileResponse, StreamingResponse
+from nanohttpy.wire import LAST_CHUNK, response_connection, serialize_head, serialize_response_parts
+
+_HTTP_VERSIONS = {"1.1": "HTTP/1.1", "1.0": "HTTP/1.0"}
+
+# Size of the reads when the file can't be sent with os.sendfile (e.g. TLS transport)
+_FILE_CHUNK_SIZE = 256 * 1024
+
+# Beyond this number of pipelined requests waiting for a response, we stop reading from the socket
+_MAX_PIPELINED_REQUESTS = 16
+
+_BAD_REQUEST_RESPONSE = (
+    b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\nConnection: close\r\n\r\n"
+)
+_PAYLOAD_TOO_LARGE_RESPONSE = (
+    b"HTTP/1.1 413 Payload Too Large\r\nContent-Length: 0\r\nConnection: close\r\n\r\n"
+)
+_CONTINUE_RESPONSE = b"HTTP/1.1 100 Continue\r\n\r\n"
+# How long the rest of a rejected request is read and discarded before closing the connection
+_LINGER_TIMEOUT = 2.0
+
 
 class _HttpProtocol(BaseProtocol):
+    """
+    One instance per connection. The connection is kept open according to the HTTP/1.0 and HTTP/1.1 rules, and
+    pipelined requests are queued and answered in order.
+    """
+
     _app: NanoHttpy
+    _keep_alive_timeout: float
     _current_parser: Any
     _current_url: str
-    _current_headers: HTTPHeaders
-    _current_body: bytes
+    _current_headers: List[Tuple[bytes, bytes]]
+    _current_body: Optional[RequestBody]
+    _current_content_length: Optional[int]
+    _current_expect_continue: bool
+    _current_parse_start: float
+    # The requests to answer (with their parse duration), or the raw error responses to send
+    _pipeline: Deque[Tuple[Union[Request, bytes], bool, float]]
+    _pipeline_task: Optional["asyncio.Task[None]"]
+    # Closes the connection when the client stays silent for keep_alive_timeout, between requests or within one
+    _idle_timer: Optional[asyncio.TimerHandle]
+    _closing: bool
+    # The rest of the received data is ignored, after an error response
+    _discarding: bool
 
-    def __init__(self, app: NanoHttpy, loop: asyncio.BaseEventLoop):
+    def __init__(
+        self, app: NanoHttpy, loop: asyncio.BaseEventLoop, keep_alive_timeout: float
+    ):
         super().__init__(loop)
         self._app = app
+        self._keep_alive_timeout = keep_alive_timeout
+        self._current_parser = None
+        self._pipeline = deque()
+        self._pipeline_task = None
+        self._idle_timer = None
+        self._closing = False
+        self._discarding = False
         self.reset()
 
     def reset(self):
-        self._current_parser = None
         self._current_url = ''
-        self._current_headers = {}
-        self._current_body = b''
+        self._current_headers = []
+        self._current_body = None
+        self._current_content_length = None
+        self._current_expect_continue = False
+        self._current_parse_start = 0.0
 
     def connection_made(self, transport: asyncio.BaseTransport):
         super().connection_made(transport)
         self.reset()
         self._current_parser = HttpRequestParser(self)
+        self._start_idle_timer()
 
     def connection_lost(self, exc):
         super().connection_lost(exc)
         self._current_parser = None
+        self._cancel_idle_timer()
+        self._pipeline.clear()
+        if self._pipeline_task is not None:
+            self._pipeline_task.cancel()
 
     def data_received(self, data):
-        self._current_parser.feed_data(data)
+        if self._discarding:
+            return
+        self._cancel_idle_timer()
+        self._feed(data)
+        if self._pipeline_task is None and not self._closing:
+            # In the middle of a request: the client must send the rest before the timeout, like between requests
+            self._start_idle_timer()
+
+    def _feed(self, data: bytes):
+        while True:
+            try:
+                self._current_parser.feed_data(data)
+                return
+            except HttpParserUpgrade as e:
+                # Protocol upgrades (h2c, websockets...) are not supported: the offer is ignored and the request, already
+                # queued, answered in HTTP/1.1. The parser stops after it, what follows is fed again
+                data = data[e.args[0]:]
+                if not data or self._discarding:
+                    return
+            except HttpParserError:
+                if self._closing:
+                    # Trailing data after a "Connection: close" request, ignored
+                    return
+                # Answer 400 once the requests received before the malformed one are answered
+                self._reject(_BAD_REQUEST_RESPONSE)
+                return
+
+    def eof_received(self) -> Optional[bool]:
+        if self._pipeline_task is None:
+            # Nothing in flight, let the transport close itself
+            return None
+        # The client half-closed the connection, but still expects the responses of its pending requests
+        self._closing = True
+        return True
 
     def on_message_begin(self):
-        pass
+        self.reset()
+        metrics = self._app.metrics
+        self._current_parse_start = time.perf_counter() if metrics is not None and metrics.timed_engine else 0.0
 
     def on_url(self, url: bytes):
-        self._current_url = url.decode()
+        self._current_url += url.decode()
 
     def on_header(self, name: bytes, value: bytes):
-        self._current_headers[name.decode()] = value.decode()
+        # Decoded by the request, only if the handler reads them
+        self._current_headers.append((name, value))
+        if len(name) == 14 and name.lower() == b"content-length":
+            try:
+                self._current_content_length = int(value)
+            except ValueError:
+                pass
+        elif len(name) == 6 and name.lower() == b"expect":
+            self._current_expect_continue = value.lower() == b"100-continue"
 
     def on_headers_complete(self):
-        pass
+        max_size = self._app.body_limits.max_size
+        content_length = self._current_content_length
+        if max_size is not None and content_length is not None and content_length > max_size:
+            # Rejected before the client sends the body
+            self._reject(_PAYLOAD_TOO_LARGE_RESPONSE)
+        elif (
+            self._current_expect_continue
+            and self._current_parser.get_http_version() == "1.1"
+            and self._pipeline_task is None
+            and not self._closing
+        ):
+            # Only when no response is pending, otherwise the client sends the body after its own timeout
+            self.transport.write(_CONTINUE_RESPONSE)
 
     def on_body(self, body: bytes):
-        self._current_body = body
+        if self._discarding:
+            return
+        request_body = self._current_body
+        if request_body is None:
+            request_body = self._current_body = RequestBody(self._app.body_limits)
+        try:
+            request_body.write(body)
+        except PayloadTooLargeError:
+            self._reject(_PAYLOAD_TOO_LARGE_RESPONSE)
 
     def on_message_complete(self):
-        self._current_request = Request(
+        if self._closing:
+            return
+        request_body = self._current_body
+        request = Request(
             self._current_parser.get_method().decode(),
             self._current_url,
-            self._current_parser.get_http_version(),
+            _HTTP_VERSIONS.get(self._current_parser.get_http_version(), "HTTP/1.1"),
             self._current_headers,
-            self._current_body,
+            request_body.finish() if request_body is not None else b"",
         )
-        asyncio.ensure_future(self.handle(self._current_request), loop=self._loop)
+        parse_duration = time.perf_counter() - self._current_parse_start if self._current_parse_start else 0.0
+        self._enqueue(request, self._current_parser.should_keep_alive(), parse_duration)
+
+    def _reject(self, response: bytes):
+        """Answer with an error response once the previous requests are answered, then close the connection"""
+        self._discarding = True
+        self._enqueue(response, False)
+
+    def _enqueue(self, request: Union[Request, bytes], keep_alive: bool, parse_duration: float = 0.0):
+        """Queue a request to answer, or a raw error response"""
+        if not keep_alive:
+            # No request after this one will be answered
+            self._closing = True
+        self._pipeline.append((request, keep_alive, parse_duration))
+        if len(self._pipeline) >= _MAX_PIPELINED_REQUESTS:
+            # Back-pressure: let the kernel buffers fill up until we caught up with the client
+            self._pause_transport_reading()
+        if self._pipeline_task is None:
+            self._pipeline_task = self._loop.create_task(self._process_pipeline())
+
+    async def _process_pipeline(self):
+        try:
+            while self._pipeline and self.transport is not None:
+                request, keep_alive, parse_duration = self._pipeline.popleft()
+                if len(self._pipeline) < _MAX_PIPELINED_REQUESTS // 2:
+                    self._resume_transport_reading()
+                if isinstance(request, bytes):
+                    self.transport.write(request)
+                    self._linger()
+                    return
+                keep_alive = await self.handle(request, keep_alive, parse_duration)
+                if not keep_alive:
+                    self._close()
+                    return
+        except ConnectionError:
+            # The client went away
+            self._close()
+            return
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("Unexpected error while writing the response")
+            self._close()
+            return
+        finally:
+            self._pipeline_task = None
+
+        if self._closing:
+            self._close()
+        else:
+            self._start_idle_timer()
+
+    async def handle(self, request: Request, keep_alive: bool, parse_duration: float = 0.0) -> bool:
+        """Answer the request, returns whether the connection can be kept open"""
+        response = await self._app.handle_async(request)
+        metrics = self._app.metrics
+        # The phases of the engine are only timed if they have a histogram
+        if metrics is not None and not metrics.timed_engine:
+            metrics = None
+        start = time.perf_counter() if metrics is not None else 0.0
+        streaming = isinstance(response, StreamingResponse)
+        # Chunked encoding is only understood by HTTP/1.1 clients, the others read the body until the connection closes
+        chunked = streaming and request.request_version != "HTTP/1.0"
+        if (streaming and not chunked) or response_connection(response) == "close":
+            keep_alive = False
+
+        connection = None
+        if not keep_alive:
+            connection = "close"
+        elif request.request_version == "HTTP/1.0":
+            # Keep-alive is not the default in HTTP/1.0, the client must know that we accepted it
+            connection = "keep-alive"
 
-    async def handle(self, request):
-        response = self._app.handle(request)
+        # The response to a HEAD request has the headers of the GET response, but never a body
+        include_body = request.method != "HEAD"
+        serialize_duration = None
+        if streaming:
+            await self._send_streaming(
+                cast(StreamingResponse, response), request.request_version, connection, chunked, include_body
+            )
+        elif isinstance(response, FileResponse):
+            self.transport.write(serialize_head(response, request.request_version, connection))
+            if include_body and response.count and not await self._send_file(response):
+                # The file was truncated, the connection is out of sync
+                keep_alive = False
+        else:
+            parts = serialize_response_parts(response, request.request_version, connection, include_body)
+            if metrics is not None:
+                serialized = time.perf_counter()
+                serialize_duration = serialized - start
+                start = serialized
+            self.transport.writelines(parts)
+            if self.writing_paused:
+                await self._drain_helper()
+        if metrics is not None:
+            metrics.record_engine_phases(request, parse_duration, serialize_duration, time.perf_counter() - start)
+        return keep_alive
+
+    async def _send_streaming(
+        self,
+        response: StreamingResponse,
+        version: str,
+        connection: Optional[str],
+        chunked: bool,
+        include_body: bool,
+    ):
+        transport = self.transport
+        transport.write(serialize_head(response, version, connection, chunked))
+        try:
+            if include_body:
+                async for data in response.iter_async():
+                    if self.transport is None:
+                        raise ConnectionResetError()
+                    if chunked:
+                        transport.writelines((b"%x\r\n" % len(data), data, b"\r\n"))
+                    else:
+                        transport.write(data)
+                    # Stop producing while the transport buffer is above its high-water mark
+                    if self.writing_paused:
+                        await self._drain_helper()
+                if chunked:
+                    transport.write(LAST_CHUNK)
+        finally:
+            await response.aclose()
+
+    async def _send_file(self, response: FileResponse) -> bool:
+        """Returns whether the whole part of the file was sent"""
+        with open(response.path, "rb") as file:
+            sock = self.transport.get_extra_info("socket")
+            if sock is None or not hasattr(os, "sendfile"):
+                return await self._copy_file(file, response.offset, response.count)
+            # The headers must be on the wire before the file is written directly to the socket
+            await self._wait_flushed()
+            return await self._sendfile(sock.fileno(), file.fileno(), response.offset, response.count)
+
+    async def _wait_flushed(self):
+        transport = self.transport
+        if not transport.get_write_buffer_size():
+            return
+        # pause_writing() is called while anything is buffered, resume_writing() once it is all written
+        low, high = transport.get_write_buffer_limits()
+        transport.set_write_buffer_limits(high=0, low=0)
+        try:
+            if self.writing_paused:
+                await self._drain_helper()
+        finally:
+            transport.set_write_buffer_limits(high=high, low=low)
+
+    async def _sendfile(self, sock_fd: int, file_fd: int, offset: int, count: int) -> bool:
+        # uvloop implements neither loop.sendfile nor a zero-copy fallback: os.sendfile on the non-blocking socket,
+        # waiting for it to be writable through a duplicate, as the loop refuses to watch a transport's fd
+        writer_fd = os.dup(sock_fd)
+        try:
+            while count > 0:
+                try:
+                    sent = os.sendfile(sock_fd, file_fd, offset, count)
+                except BlockingIOError:
+                    await self._wait_writable(writer_fd)
+                    continue
+                if sent == 0:
+                    return False
+                offset += sent
+                count -= sent
+            return True
+        finally:
+            os.close(writer_fd)
+
+    async def _wait_writable(self, fd: int):
+        waiter = self._loop.create_future()
+
+        def on_writable():
+            if not waiter.done():
+                waiter.set_result(None)
+
+        self._loop.add_writer(fd, on_writable)
+        try:
+            await waiter
+        finally:
+            self._loop.remove_writer(fd)
+        if self.transport is None:
+            raise ConnectionResetError()
+
+    async def _copy_file(self, file: Any, offset: int, count: int) -> bool:
+        file.seek(offset)
+        while count > 0:
+            data = file.read(min(count, _FILE_CHUNK_SIZE))
+            if not data:
+                return False
+            self.transport.write(data)
+            count -= len(data)
+            if self.writing_paused:
+                await self._drain_helper()
+        return True
 
-        writer = StreamWriter(self, self._loop)
+    def _linger(self):
+        """
+        Close the connection after an error response while the client may still be sending its request: half-close it
+        and discard what is received until the client closes its side, for at most _LINGER_TIMEOUT. Closing with unread
+        data would reset the connection, and the client could lose the response.
+        """
+        self._closing = True
+        self._pipeline.clear()
+        self._resume_transport_reading()
+        if self.transport is None or not self.transport.can_write_eof():
+            self._close()
+            return
+        self.transport.write_eof()
+        self._cancel_idle_timer()
+        self._idle_timer = self._loop.call_later(_LINGER_TIMEOUT, self._close)
 
-        status_line = f"HTTP/{request.request_version} {response.status_code} {response.status_reason}"
-        await writer.write_headers(status_line, CIMultiDict(response.headers))
-        await writer.write(response.encoded_body)
-        await writer.write_eof()
+    def _start_idle_timer(self):
+        if self._keep_alive_timeout > 0:
+            self._idle_timer = self._loop.call_later(
+                self._keep_alive_timeout, self._close
+            )
 
-        self.transport.close()
+    def _cancel_idle_timer(self):
+        if self._idle_timer is not None:
+            self._idle_timer.cancel()
+            self._idle_timer = None
 
+    def _close(self):
+        self._closing = True
+        self._pipeline.clear()
+        self._cancel_idle_timer()
+        if self.transport is not None:
+            self.transport.close()
 
 
 class UvloopEngine:
@@ -84,20 +420,34 @@ class UvloopEngine:
     server: asyncio.Server
     loop: asyncio.BaseEventLoop
 
-    def __init__(self, server_address: Tuple[str, int], app: NanoHttpy) -> None:
+    def __init__(
+        self,
+        server_address: Tuple[str, int],
+        app: NanoHttpy,
+        sock: Optional[socket.socket] = None,
+        keep_alive_timeout: float = 5.0,
+    ) -> None:
+        """
+        ``sock`` is an already listening socket to use, instead of binding ``server_address``.
+        ``keep_alive_timeout`` is the number of seconds an idle persistent connection is kept open,
+        ``0`` to never close them.
+        """
         self.app = app
 
         self.loop = uvloop.new_event_loop()
         asyncio.set_event_loop(self.loop)
         self.loop.set_debug(False)
 
-        self.server = self.loop.run_until_complete(
-            self.loop.create_server(
-                lambda: _HttpProtocol(self.app, self.loop),
-                host=server_address[0],
-                port=server_address[1],
+        def protocol_factory():
+            return _HttpProtocol(self.app, self.loop, keep_alive_timeout)
+
+        if sock is None:
+            server = self.loop.create_server(
+                protocol_factory, host=server_address[0], port=server_address[1]
             )
-        )
+        else:
+            server = self.loop.create_server(protocol_factory, sock=sock)
+        self.server = self.loop.run_until_complete(server)
 
     def serve_forever(self):
         try:
@@ -1,4 +1,5 @@
 import http
+from typing import Optional
 
 
 class NanoHttpyError(RuntimeError):
@@ -9,8 +10,20 @@ class HttpError(NanoHttpyError):
     code: int
     description: str
 
+    def __init__(self, description: Optional[str] = None) -> None:
+        super().__init__(description)
+        if description is not None:
+            self.description = description
+
     def __str__(self) -> str:
-        return f"{self.code} {http.client.responses[self.code]}: {self.description}"
+        # http.HTTPStatus rather than http.client.responses: http.client is slow to import, and only imported by the
+        # Python engines
+        return f"{self.code} {http.HTTPStatus(self.code).phrase}: {self.description}"
+
+
+class BadRequestError(HttpError):
+    code = 400
+    description = "The browser (or proxy) sent a request that this server could not understand"
 
 
 class NotFoundError(HttpError):
@@ -21,3 +34,13 @@ class NotFoundError(HttpError):
 class MethodNotAllowedError(HttpError):
     code = 405
     description = "The method is not allowed for the requested URL"
+
+
+class PayloadTooLargeError(HttpError):
+    code = 413
+    description = "The data value transmitted exceeds the capacity limit"
+
+
+class RangeNotSatisfiableError(HttpError):
+    code = 416
+    description = "The requested range is not satisfiable"
@@ -0,0 +1,330 @@
+"""
+Form bodies, ``application/x-www-form-urlencoded`` and ``multipart/form-data``, parsed incrementally: the parsers are fed
+the chunks of the body as they are read, so that only the current chunk and the small fields are in memory. The uploaded
+files are kept in memory up to a threshold, and spilled to temporary files above, like the request bodies.
+"""
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from nanohttpy.bodies import CHUNK_SIZE, DEFAULT_SPILL_THRESHOLD, BodyLimits, RequestBody
+from nanohttpy.exceptions import BadRequestError, PayloadTooLargeError
+from nanohttpy.http import parse_header_options
+from nanohttpy.lazy_loader import LazyLoader
+
+if TYPE_CHECKING:
+    from urllib import parse as urllib_parse
+else:
+    # Imported on first use, as it is slow to import
+    urllib_parse = LazyLoader("urllib_parse", globals(), "urllib.parse")
+
+FormFields = Dict[str, List[str]]
+FormFiles = Dict[str, List["UploadFile"]]
+
+# Size of the headers of a multipart part, beyond which the body is rejected
+_MAX_PART_HEADERS_SIZE = 16 * 1024
+
+_PREAMBLE, _DELIMITER, _HEADERS, _PART, _EPILOGUE = range(5)
+
+
+class FormLimits(NamedTuple):
+    # Fields and files together
+    max_parts: int = 1000
+    # Size of a field, kept in memory
+    max_field_size: int = 1024 * 1024
+    # Size of a file, None to only be bounded by the maximum size of the body
+    max_file_size: Optional[int] = None
+    # Size of a file above which it is spilled to a temporary file
+    spill_threshold: int = DEFAULT_SPILL_THRESHOLD
+
+
+DEFAULT_FORM_LIMITS = FormLimits()
+
+
+class UploadFile:
+    """
+    File part of a multipart form. Kept in memory up to ``FormLimits.spill_threshold`` bytes, then in a temporary file
+    (deleted once the file is garbage collected).
+    """
+
+    __slots__ = ("name", "filename", "content_type", "_body")
+
+    name: str
+    filename: str
+    content_type: Optional[str]
+    _body: RequestBody
+
+    def __init__(self, name: str, filename: str, content_type: Optional[str], body: RequestBody) -> None:
+        self.name = name
+        self.filename = filename
+        self.content_type = content_type
+        self._body = body
+
+    @property
+    def size(self) -> int:
+        return self._body.size
+
+    @property
+    def spilled(self) -> bool:
+        return self._body.spilled
+
+    def read(self) -> bytes:
+        """The whole content, loaded in memory"""
+        return self._body.read()
+
+    def iter_chunks(self, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        return self._body.iter_chunks(chunk_size)
+
+    def save(self, path: str) -> None:
+        """Copy the content to ``path``, by chunks"""
+        with open(path, "wb") as file:
+            for data in self.iter_chunks():
+                file.write(data)
+
+    def close(self) -> None:
+        self._body.close()
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(name={self.name!r}, filename={self.filename!r}, "
+            f"content_type={self.content_type!r}, size={self.size})"
+        )
+
+
+class UrlencodedParser:
+    """Incremental parser of an ``application/x-www-form-urlencoded`` body, only a field is buffered at a time"""
+
+    __slots__ = ("fields", "_limits", "_buffer", "_parts")
+
+    fields: FormFields
+    _limits: FormLimits
+    _buffer: bytearray
+    _parts: int
+
+    def __init__(self, limits: FormLimits = DEFAULT_FORM_LIMITS) -> None:
+        self.fields = {}
+        self._limits = limits
+        self._buffer = bytearray()
+        self._parts = 0
+
+    def feed(self, data: bytes) -> None:
+        buffer = self._buffer
+        buffer += data
+        start = 0
+        while True:
+            end = buffer.find(b"&", start)
+            if end < 0:
+                break
+            self._add(buffer[start:end])
+            start = end + 1
+        del buffer[:start]
+        if len(buffer) > self._limits.max_field_size:
+            raise PayloadTooLargeError("Form field too large")
+
+    def finish(self) -> FormFields:
+        if self._buffer:
+            self._add(self._buffer)
+            self._buffer = bytearray()
+        return self.fields
+
+    def _add(self, pair: bytearray) -> None:
+        if not pair:
+            return
+        if len(pair) > self._limits.max_field_size:
+            raise PayloadTooLargeError("Form field too large")
+        self._parts += 1
+        if self._parts > self._limits.max_parts:
+            raise BadRequestError("Too many form fields")
+        name, _, value = pair.decode("utf-8", errors="replace").partition("=")
+        self.fields.setdefault(_unquote(name), []).append(_unquote(value))
+
+
+def _unquote(value: str) -> str:
+    # Most names and values have nothing to unquote, unquote_plus is much slower than the check
+    if "%" in value or "+" in value:
+        return urllib_parse.unquote_plus(value)
+    return value
+
+
+class MultipartParser:  # pylint: disable=too-many-instance-attributes
+    """
+    Incremental parser of a ``multipart/form-data`` body (RFC 7578). Only the data that may be the start of a delimiter
+    is kept between two chunks, the content of a part is written to its field or file as soon as it is received.
+    """
+
+    __slots__ = (
+        "fields",
+        "files",
+        "_limits",
+        "_delimiter",
+        "_buffer",
+        "_state",
+        "_parts",
+        "_name",
+        "_field",
+        "_field_size",
+        "_file",
+    )
+
+    fields: FormFields
+    files: FormFiles
+    _limits: FormLimits
+    _delimiter: bytes
+    _buffer: bytearray
+    _state: int
+    _parts: int
+    # Part being received, either a field or a file
+    _name: str
+    _field: List[bytes]
+    _field_size: int
+    _file: Optional[RequestBody]
+
+    def __init__(self, boundary: str, limits: FormLimits = DEFAULT_FORM_LIMITS) -> None:
+        if not 1 <= len(boundary) <= 70:
+            raise BadRequestError("Invalid multipart boundary")
+        self.fields = {}
+        self.files = {}
+        self._limits = limits
+        self._delimiter = b"\r\n--" + boundary.encode("latin-1", errors="replace")
+        # The first delimiter is at the very start of the body when there is no preamble, without the line break
+        self._buffer = bytearray(b"\r\n")
+        self._state = _PREAMBLE
+        self._parts = 0
+        self._name = ""
+        self._field = []
+        self._field_size = 0
+        self._file = None
+
+    def feed(self, data: bytes) -> None:  # pylint: disable=too-many-branches
+        buffer = self._buffer
+        buffer += data
+        delimiter = self._delimiter
+        while True:
+            state = self._state
+            if state == _PREAMBLE or state == _PART:  # pylint: disable=consider-using-in
+                end = buffer.find(delimiter)
+                if end < 0:
+                    # The end of the buffer may be the start of a delimiter, it is kept for the next chunk
+                    keep = len(delimiter) - 1
+                    if len(buffer) > keep:
+                        if state == _PART:
+                            self._write(buffer[:-keep])
+                        del buffer[:-keep]
+                    return
+                if state == _PART:
+                    self._write(buffer[:end])
+                    self._end_part()
+                del buffer[: end + len(delimiter)]
+                self._state = _DELIMITER
+            elif state == _DELIMITER:
+                # "--" after the last delimiter, otherwise a line break, possibly after some whitespace
+                if len(buffer) < 2:
+                    return
+                if buffer.startswith(b"--"):
+                    self._state = _EPILOGUE
+                    continue
+                end = buffer.find(b"\r\n")
+                if end < 0:
+                    if len(buffer) > _MAX_PART_HEADERS_SIZE:
+                        raise BadRequestError("Invalid multipart delimiter")
+                    return
+                if buffer[:end].strip(b" \t"):
+                    raise BadRequestError("Invalid multipart delimiter")
+                del buffer[: end + 2]
+                self._state = _HEADERS
+            elif state == _HEADERS:
+                if buffer.startswith(b"\r\n"):
+                    # Part without headers
+                    self._start_part(b"")
+                    del buffer[:2]
+                else:
+                    end = buffer.find(b"\r\n\r\n")
+                    if end < 0:
+                        if len(buffer) > _MAX_PART_HEADERS_SIZE:
+                            raise BadRequestError("Multipart part headers too large")
+                        return
+                    self._start_part(bytes(buffer[:end]))
+                    del buffer[: end + 4]
+                self._state = _PART
+            else:
+                # Epilogue, ignored
+                buffer.clear()
+                return
+
+    def finish(self) -> Tuple[FormFields, FormFiles]:
+        if self._state != _EPILOGUE:
+            raise BadRequestError("Incomplete multipart body")
+        return self.fields, self.files
+
+    def _start_part(self, headers: bytes) -> None:
+        limits = self._limits
+        self._parts += 1
+        if self._parts > limits.max_parts:
+            raise BadRequestError("Too many form parts")
+        disposition = content_type = None
+        # The file names are sent in utf-8 by the browsers
+        for line in headers.decode("utf-8", errors="replace").split("\r\n") if headers else ():
+            name, sep, value = line.partition(":")
+            if not sep:
+                raise BadRequestError("Invalid multipart part header")
+            name = name.strip().lower()
+            if name == "content-disposition":
+                disposition = value
+            elif name == "content-type":
+                content_type = value.strip()
+        options = parse_header_options(disposition)[1] if disposition is not None else {}
+        if "name" not in options:
+            raise BadRequestError("Multipart part without a form-data name")
+        self._name = options["name"]
+        filename = options.get("filename")
+        if "filename*" in options:
+            # RFC 5987 extended notation: charset'language'percent-encoded-value
+            charset, _, encoded = options["filename*"].partition("'")
+            filename = urllib_parse.unquote(encoded.partition("'")[2], charset or "utf-8", errors="replace")
+        if filename is None:
+            self._field = []
+            self._field_size = 0
+            self._file = None
+        else:
+            self._file = RequestBody(BodyLimits(limits.max_file_size, limits.spill_threshold))
+            self.files.setdefault(self._name, []).append(UploadFile(self._name, filename, content_type, self._file))
+
+    def _write(self, data: bytearray) -> None:
+        if not data:
+            return
+        if self._file is not None:
+            self._file.write(data)
+            return
+        self._field_size += len(data)
+        if self._field_size > self._limits.max_field_size:
+            raise PayloadTooLargeError("Form field too large")
+        self._field.append(bytes(data))
+
+    def _end_part(self) -> None:
+        if self._file is None:
+            value = b"".join(self._field).decode("utf-8", errors="replace")
+            self.fields.setdefault(self._name, []).append(value)
+            self._field = []
+        self._file = None
+
+
+def parse_form(
+    content_type: Optional[str], chunks: Iterable[Union[bytes, bytearray]], limits: FormLimits = DEFAULT_FORM_LIMITS
+) -> Tuple[FormFields, FormFiles]:
+    """
+    Fields and files of a form body read by chunks, according to its ``Content-Type``. Both are empty for the other
+    content types. Raises BadRequestError if the body is invalid, PayloadTooLargeError if a field or a file is too big.
+    """
+    media_type, options = parse_header_options(content_type or "")
+    if media_type == "application/x-www-form-urlencoded":
+        urlencoded = UrlencodedParser(limits)
+        for data in chunks:
+            urlencoded.feed(data)
+        return urlencoded.finish(), {}
+    if media_type == "multipart/form-data":
+        boundary = options.get("boundary")
+        if boundary is None:
+            raise BadRequestError("Multipart body without boundary")
+        multipart = MultipartParser(boundary, limits)
+        for data in chunks:
+            multipart.feed(data)
+        return multipart.finish()
+    return {}, {}
@@ -0,0 +1,109 @@
+"""
+Headers of a request, shared by all the engines: kept as the raw bytes received, and decoded only when they are read.
+"""
+from operator import itemgetter
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+
+_HTTP_HEADER_ENCODING = "iso-8859-1"
+
+# Headers as received by an engine, in the order of the request
+RawHTTPHeaders = Sequence[Tuple[bytes, bytes]]
+
+
+class Headers(Mapping[str, str]):
+    """
+    Read-only headers of a request, backed by the raw (name, value) pairs received by the engine. Names are looked up
+    case-insensitively, and a value is only decoded when it is read.
+    A repeated header is kept: the mapping gives its first value, ``get_all`` every value.
+    """
+
+    # No index of the names: a request has a few headers, and a handler reads a few of them, scanning the list for each
+    # lookup is cheaper than building a dict
+    __slots__ = ("_raw",)
+
+    _raw: RawHTTPHeaders
+
+    def __init__(self, headers: Union[RawHTTPHeaders, Mapping[str, str], None] = None) -> None:
+        """``headers`` is a list of raw pairs, used without copy, or a mapping of decoded names and values"""
+        if headers is None:
+            self._raw = []
+        elif isinstance(headers, (list, tuple)):
+            self._raw = headers
+        elif isinstance(headers, Headers):
+            self._raw = headers._raw
+        else:
+            # items() rather than iterating on the mapping, to keep the repeated headers of an email.message.Message
+            self._raw = [
+                (k.encode(_HTTP_HEADER_ENCODING), v.encode(_HTTP_HEADER_ENCODING)) for k, v in headers.items()
+            ]
+
+    @property
+    def raw(self) -> RawHTTPHeaders:
+        """The (name, value) pairs as received, not decoded"""
+        return self._raw
+
+    def _find(self, name: str) -> Optional[bytes]:
+        """Raw value of the first header named ``name``"""
+        try:
+            key = name.encode(_HTTP_HEADER_ENCODING).lower()
+        except UnicodeEncodeError:
+            return None
+        for k, v in self._raw:
+            if k.lower() == key:
+                return v
+        return None
+
+    def _names(self) -> Dict[bytes, bytes]:
+        """Lowercase name -> name of the first occurrence, in the order of the request"""
+        names: Dict[bytes, bytes] = {}
+        for k, _ in self._raw:
+            names.setdefault(k.lower(), k)
+        return names
+
+    def __getitem__(self, name: str) -> str:
+        value = self._find(name)
+        if value is None:
+            raise KeyError(name)
+        return value.decode(_HTTP_HEADER_ENCODING)
+
+    def get(self, name: str, default: Any = None) -> Any:
+        value = self._find(name)
+        return default if value is None else value.decode(_HTTP_HEADER_ENCODING)
+
+    def get_all(self, name: str) -> List[str]:
+        """Every value of the header, in the order of the request"""
+        try:
+            key = name.encode(_HTTP_HEADER_ENCODING).lower()
+        except UnicodeEncodeError:
+            return []
+        return [v.decode(_HTTP_HEADER_ENCODING) for k, v in self._raw if k.lower() == key]
+
+    def multi_items(self) -> List[Tuple[str, str]]:
+        """Every (name, value) pair, repeated headers included, in the order of the request"""
+        return [(k.decode(_HTTP_HEADER_ENCODING), v.decode(_HTTP_HEADER_ENCODING)) for k, v in self._raw]
+
+    def __contains__(self, name: object) -> bool:
+        return isinstance(name, str) and self._find(name) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        """The distinct names, with the case of their first occurrence"""
+        return (name.decode(_HTTP_HEADER_ENCODING) for name in self._names().values())
+
+    def __len__(self) -> int:
+        return len(self._names())
+
+    def _normalized(self) -> List[Tuple[bytes, bytes]]:
+        # Sorted by name only, the order of the values of a repeated header matters
+        return sorted(((k.lower(), v) for k, v in self._raw), key=itemgetter(0))
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, Headers):
+            if not isinstance(other, Mapping):
+                return NotImplemented
+            other = Headers(other)
+        return self._normalized() == other._normalized()
+
+    __hash__ = None  # type: ignore
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.multi_items()!r})"
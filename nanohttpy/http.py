@@ -1,13 +1,43 @@
 from dataclasses import dataclass
 import re
-from typing import Dict, List
-from urllib.parse import parse_qs
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple
+
+from nanohttpy.exceptions import NanoHttpyError, RangeNotSatisfiableError
+from nanohttpy.lazy_loader import LazyLoader
+
+if TYPE_CHECKING:
+    from email import utils as email_utils
+    from urllib import parse as urllib_parse
+else:
+    # Imported on first use, as they are slow to import
+    email_utils = LazyLoader("email_utils", globals(), "email.utils")
+    urllib_parse = LazyLoader("urllib_parse", globals(), "urllib.parse")
 
 
 HTTP_METHODS = ["GET", "HEAD", "POST", "PUT", "DELETE", "CONNECT", "OPTIONS", "TRACE"]
 
 HTTPHeaders = Dict[str, str]
 
+
+def find_response_header(headers: HTTPHeaders, name: str) -> Optional[str]:
+    """
+    Name of the header ``name`` as set in the headers of a response, the handlers may use any case, None if it is not
+    set. The usual case is looked up first, without scanning the headers.
+    """
+    if name in headers:
+        return name
+    key = name.lower()
+    for header in headers:
+        if header.lower() == key:
+            return header
+    return None
+
+
+def get_response_header(headers: HTTPHeaders, name: str, default: Optional[str] = None) -> Optional[str]:
+    """Value of the header ``name`` of a response, the name being matched case-insensitively"""
+    header = find_response_header(headers, name)
+    return default if header is None else headers[header]
+
 @dataclass
 class URL:
     scheme: str
@@ -43,4 +73,133 @@ def fast_parse_request_path(url: str) -> URL:
 
 
 def parse_query_string(query_string: str) -> Dict[str, List[str]]:
-    return parse_qs(query_string)
+    return urllib_parse.parse_qs(query_string)
+
+
+def parse_range_header(value: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    First and last byte positions (inclusive) of a ``Range: bytes=...`` header, for a resource of ``size`` bytes.
+    Returns None if the header must be ignored (malformed, or several ranges), raises RangeNotSatisfiableError if the
+    range is out of the resource.
+    """
+    unit, _, spec = value.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    first, last = first.strip(), last.strip()
+    if not sep or not (first or last) or (first and not first.isdigit()) or (last and not last.isdigit()):
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise RangeNotSatisfiableError()
+        return max(0, size - length), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiableError()
+    return start, min(int(last), size - 1) if last else size - 1
+
+
+_re_header_option = re.compile(r';\s*([^\s=;]+)\s*=\s*("[^"]*"|[^;]*)')
+
+
+def parse_header_options(value: str) -> Tuple[str, Dict[str, str]]:
+    """
+    Main value and parameters of a header such as ``Content-Type: text/plain; charset=utf-8``. The main value and the
+    names of the parameters are lowercased, the values are unquoted. Backslashes are kept as is, as browsers send them
+    unescaped in the file names.
+    """
+    main, sep, params = value.partition(";")
+    options = {}
+    if sep:
+        for name, option in _re_header_option.findall(sep + params):
+            option = option.strip()
+            if len(option) >= 2 and option[0] == option[-1] == '"':
+                option = option[1:-1]
+            options[name.lower()] = option
+    return main.strip().lower(), options
+
+
+# Header names are tokens (RFC 7230 section 3.2.6)
+_is_token = re.compile(r"[!#$%&'*+\-.^_`|~0-9A-Za-z]+").fullmatch
+
+# Header names already checked: the responses reuse a few constant names, a set lookup is cheaper than the regex
+_valid_header_names: Set[str] = set()
+_MAX_VALID_HEADER_NAMES = 1024
+
+
+def check_response_headers(headers: HTTPHeaders) -> None:
+    """
+    Raises NanoHttpyError if a header name is not a token, or a value contains a line break or a NUL character: sent as
+    is, a value coming from the request could inject headers, or a whole response (response splitting). Also if a value
+    is not encodable as iso-8859-1, the encoding of the head on the wire.
+    """
+    for name, value in headers.items():
+        if name not in _valid_header_names:
+            if _is_token(name) is None:
+                raise NanoHttpyError(f"Invalid response header name {name!r}")
+            if len(_valid_header_names) < _MAX_VALID_HEADER_NAMES:
+                _valid_header_names.add(name)
+        if "\r" in value or "\n" in value or "\0" in value:
+            raise NanoHttpyError(f"Invalid value of the response header {name}: {value!r}")
+        if not value.isascii():
+            try:
+                value.encode("iso-8859-1")
+            except UnicodeEncodeError as e:
+                raise NanoHttpyError(f"Value of the response header {name} is not iso-8859-1: {value!r}") from e
+
+
+def _is_acceptable(params: str) -> bool:
+    """Whether the parameters of an ``Accept-Encoding`` item give it a non-zero quality"""
+    quality = params.strip().replace(" ", "")
+    if quality.startswith("q="):
+        try:
+            return float(quality[2:]) > 0
+        except ValueError:
+            return False
+    return True
+
+
+def accepts_encoding(accept_encoding: Optional[str], encoding: str) -> bool:
+    """
+    Whether the ``Accept-Encoding`` header value allows the content coding ``encoding`` (gzip, deflate...). An item
+    naming the encoding takes precedence over ``*``, wherever it is: ``*;q=0.1, gzip;q=0`` refuses gzip.
+    """
+    if not accept_encoding:
+        return False
+    wildcard = False
+    for item in accept_encoding.split(","):
+        name, _, params = item.partition(";")
+        name = name.strip().lower()
+        if name == encoding:
+            return _is_acceptable(params)
+        if name == "*":
+            wildcard = _is_acceptable(params)
+    return wildcard
+
+
+def is_not_modified_since(if_modified_since: str, mtime: float) -> bool:
+    """Whether a resource modified at ``mtime`` (timestamp) is unchanged since the ``If-Modified-Since`` header value"""
+    try:
+        since = email_utils.parsedate_to_datetime(if_modified_since).timestamp()
+    except (TypeError, ValueError):
+        return False
+    # Last-Modified has a precision of one second
+    return int(mtime) <= since
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Whether the ``If-None-Match`` header value matches ``etag``, with the weak comparison of RFC 7232"""
+    if if_none_match.strip() == "*":
+        return True
+    etag = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
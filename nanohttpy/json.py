@@ -0,0 +1,108 @@
+"""
+JSON encoder and decoder used by JSONResponse and Request.json(). By default, the fastest installed library among
+orjson, ujson and the stdlib json module is used. The backend is a process-wide setting, shared by all the applications:
+it is chosen with ``set_backend``, typically at startup, before the first request.
+"""
+import functools
+from typing import Any, Callable, Dict, NamedTuple, Optional, Union
+
+from nanohttpy.exceptions import NanoHttpyError
+
+
+class JSONBackend(NamedTuple):
+    name: str
+    # Compact and utf-8 encoded, without NaN nor Infinity
+    dumps: Callable[[Any], bytes]
+    loads: Callable[[Union[bytes, str]], Any]
+
+
+def _orjson_backend() -> JSONBackend:
+    import orjson  # pylint: disable=import-outside-toplevel
+
+    # Like the stdlib, convert the int, float etc... keys to strings
+    return JSONBackend(
+        "orjson",
+        functools.partial(orjson.dumps, option=orjson.OPT_NON_STR_KEYS),
+        orjson.loads,
+    )
+
+
+def _ujson_backend() -> JSONBackend:
+    import ujson  # pylint: disable=import-outside-toplevel
+
+    def dumps(obj: Any) -> bytes:
+        return ujson.dumps(
+            obj, ensure_ascii=False, escape_forward_slashes=False, reject_bytes=True
+        ).encode("utf-8")
+
+    return JSONBackend("ujson", dumps, ujson.loads)
+
+
+def _stdlib_backend() -> JSONBackend:
+    import json  # pylint: disable=import-outside-toplevel
+
+    def dumps(obj: Any) -> bytes:
+        # Since we encode in utf-8, no need to worry about ensure_ascii
+        return json.dumps(
+            obj, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+        ).encode("utf-8")
+
+    return JSONBackend("json", dumps, json.loads)
+
+
+# By order of preference
+_BACKEND_FACTORIES: Dict[str, Callable[[], JSONBackend]] = {
+    "orjson": _orjson_backend,
+    "ujson": _ujson_backend,
+    "json": _stdlib_backend,
+}
+
+# Resolved on first use, to not import the JSON library until needed
+_backend: Optional[JSONBackend] = None
+
+
+def get_backend(name: Optional[str] = None) -> JSONBackend:
+    """The backend ``name`` ("orjson", "ujson" or "json"), or the first one installed if None"""
+    if name is None:
+        for factory in _BACKEND_FACTORIES.values():
+            try:
+                return factory()
+            except ImportError:
+                pass
+    factory = _BACKEND_FACTORIES.get(name)  # type: ignore
+    if factory is None:
+        raise NanoHttpyError(
+            f"Unknown JSON backend '{name}', expected one of {list(_BACKEND_FACTORIES)}"
+        )
+    try:
+        return factory()
+    except ImportError as e:
+        raise NanoHttpyError(f"JSON backend '{name}' is not installed") from e
+
+
+def set_backend(backend: Union[str, JSONBackend, None]) -> JSONBackend:
+    """
+    Select the backend by name ("orjson", "ujson", "json"), or use a custom one. None selects the first one installed.
+    The setting is global to the process: it affects every app in it, and every request, so it is meant to be called
+    once, at startup.
+    """
+    global _backend  # pylint: disable=global-statement
+    if not isinstance(backend, JSONBackend):
+        backend = get_backend(backend)
+    _backend = backend
+    return backend
+
+
+def current_backend() -> JSONBackend:
+    backend = _backend
+    if backend is None:
+        backend = set_backend(None)
+    return backend
+
+
+def dumps(obj: Any) -> bytes:
+    return current_backend().dumps(obj)
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    return current_backend().loads(data)
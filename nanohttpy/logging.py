@@ -1,13 +1,188 @@
+"""
+The records of the NanoHttpy loggers are queued, and written in batches by a background thread, so that the request
+latency doesn't depend on the speed of stderr or of the disk.
+
+Production mode: the debug logs of the request path are guarded by ``if __debug__:`` blocks, which are removed
+entirely by ``python -O`` (or ``PYTHONOPTIMIZE=1``).
+"""
+import atexit
 import logging
+import os
+import queue
+import threading
+from typing import TYPE_CHECKING, List, Optional
+import weakref
+
+from nanohttpy.lazy_loader import LazyLoader
+
+if TYPE_CHECKING:
+    import json
+else:
+    # Only needed to format the access logs
+    json = LazyLoader("json", globals(), "json")
+
+_background_handlers: "weakref.WeakSet[BackgroundHandler]" = weakref.WeakSet()
+
+
+class BackgroundHandler(logging.Handler):
+    """
+    Queue the records, and let a background thread write them in batches to the ``target`` handler.
+    When the queue is full, the records are dropped rather than blocking the caller.
+    """
+
+    target: logging.Handler
+    batch_size: int
+    max_queue: int
+    dropped: int
+    _queue: "queue.Queue[Optional[logging.LogRecord]]"
+    _thread: Optional[threading.Thread]
+    _pid: int
+
+    def __init__(
+        self, target: logging.Handler, batch_size: int = 256, max_queue: int = 10000
+    ) -> None:
+        super().__init__()
+        self.target = target
+        self.batch_size = batch_size
+        self.max_queue = max_queue
+        self.dropped = 0
+        self._thread = None
+        self._pid = -1
+        _background_handlers.add(self)
+
+    def _ensure_started(self) -> None:
+        # The thread doesn't survive a fork, and the queue lock might have been held at that time: each process starts
+        # its own
+        if self._pid != os.getpid():
+            # The handler lock, reinitialized by logging after a fork, so that concurrent first records start a single
+            # thread
+            with self.lock:  # type: ignore
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue(self.max_queue)
+                    self._thread = threading.Thread(
+                        target=self._run, name="nanohttpy-log-writer", daemon=True
+                    )
+                    self._thread.start()
+                    self._pid = os.getpid()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self._ensure_started()
+            # The message is merged now, as the arguments may be modified later on, but the expensive formatting
+            # (traceback etc...) is left to the writer thread
+            record.msg = record.getMessage()
+            record.args = None
+        except Exception:  # pylint: disable=broad-except
+            self.handleError(record)
+            return
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        q = self._queue
+        while True:
+            record = q.get()
+            batch: List[logging.LogRecord] = []
+            stop = record is None
+            if record is not None:
+                batch.append(record)
+            while not stop and len(batch) < self.batch_size:
+                try:
+                    record = q.get_nowait()
+                except queue.Empty:
+                    break
+                if record is None:
+                    stop = True
+                else:
+                    batch.append(record)
+            self._write_batch(batch)
+            for _ in range(len(batch) + stop):
+                q.task_done()
+            if stop:
+                return
+
+    def _write_batch(self, batch: List[logging.LogRecord]) -> None:
+        target = self.target
+        if not isinstance(target, logging.StreamHandler):
+            for record in batch:
+                target.handle(record)
+            return
+        # One write and one flush for the whole batch
+        lines = []
+        for record in batch:
+            if record.levelno >= target.level:
+                try:
+                    lines.append(target.format(record) + target.terminator)
+                except Exception:  # pylint: disable=broad-except
+                    target.handleError(record)
+        if not lines:
+            return
+        with target.lock:  # type: ignore
+            try:
+                target.stream.write("".join(lines))
+                target.flush()
+            except Exception:  # pylint: disable=broad-except
+                target.handleError(batch[-1])
+
+    def flush(self) -> None:
+        """Wait for the queued records to be written"""
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+
+    def close(self) -> None:
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self._thread = None
+        self._pid = -1
+        super().close()
+
+
+def flush_logs() -> None:
+    """Wait for all the queued records to be written, e.g. before exiting the process"""
+    for handler in list(_background_handlers):
+        handler.flush()
+
+
+atexit.register(flush_logs)
+
+
+class AccessLogFormatter(logging.Formatter):
+    """One JSON object per request"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps(
+            {
+                "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S")
+                + f".{int(record.msecs):03d}",
+                "method": getattr(record, "method", None),
+                "path": getattr(record, "path", None),
+                "version": getattr(record, "version", None),
+                "status": getattr(record, "status", None),
+                "duration_ms": getattr(record, "duration_ms", None),
+            },
+            separators=(",", ":"),
+        )
+
 
 logger = logging.Logger("nanohttpy")
 
 logger.setLevel(logging.INFO)
-logger.addHandler(logging.StreamHandler())
+_stream_handler = logging.StreamHandler()
+logger.addHandler(BackgroundHandler(_stream_handler))
 
 __logger_formatter = logging.Formatter(
     "%(asctime)s.%(msecs)03d | %(name)-12s | %(levelname)-8s | %(message)s",
     "%Y-%m-%d %H:%M:%S",
 )
-for h in logger.handlers:
-    h.setFormatter(__logger_formatter)
+_stream_handler.setFormatter(__logger_formatter)
+
+# Structured access log, enabled with NanoHttpy(access_log=True)
+access_logger = logging.Logger("nanohttpy.access")
+
+access_logger.setLevel(logging.INFO)
+_access_stream_handler = logging.StreamHandler()
+_access_stream_handler.setFormatter(AccessLogFormatter())
+access_logger.addHandler(BackgroundHandler(_access_stream_handler))
@@ -0,0 +1,305 @@
+"""
+Request metrics, rendered in the Prometheus text format: requests by route pattern and status, requests in
+flight, and latency histograms of the phases of a request:
+ - ``parse``: request line, headers and body received and parsed, by the engine
+ - ``route``: lookup of the handler
+ - ``handler``: handler, conversion of its result to a response, cache and compression
+ - ``serialize``: status line and headers (and body, when not streamed) encoded by the engine
+ - ``write``: response sent to the socket by the engine
+
+By default only the counters are kept, which costs a few dict updates per request. The histograms are opt-in, with
+``Metrics(phases=PHASES)`` or the phases of interest: each phase kept needs timestamps and measures recorded for every
+request. When none of the phases of the app (route, handler) or of the engine (parse, serialize, write) is kept, they
+don't even take timestamps.
+
+The histograms have fixed buckets, so the memory only depends on the number of routes. Each thread records in its own
+shard, without locking, counting its requests directly and appending their durations to short lists aggregated in bulk;
+the shards are summed when rendered.
+"""
+from bisect import bisect_left, bisect_right
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from nanohttpy.exceptions import NanoHttpyError
+from nanohttpy.requests import Request
+
+# Upper bounds of the histogram buckets, in seconds
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+PHASES = ("parse", "route", "handler", "serialize", "write")
+_PARSE, _ROUTE, _HANDLER, _SERIALIZE, _WRITE = range(len(PHASES))
+
+# Recorded instead of None for a phase that a request didn't go through: sorted before the durations, where it is
+# skipped with one bisection, rather than filtering every sample
+_NO_DURATION = -1.0
+
+# Route label of the requests that matched no route (404, 405)
+UNMATCHED_ROUTE = "<unmatched>"
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# Number of pending requests of a route after which their measures are aggregated in its histograms
+_FLUSH_SIZE = 256
+# Length of the pending lists at that point, each request adding 2 measures of the app, and 3 of the engine
+_FLUSH_HANDLING_LENGTH = 2 * _FLUSH_SIZE
+_FLUSH_ENGINE_LENGTH = 3 * _FLUSH_SIZE
+
+
+class _RouteMetrics:
+    """
+    Metrics of a route, recorded by a single thread. Each request is counted directly, and appends its durations to
+    flat lists, aggregated in bulk once ``_FLUSH_SIZE`` requests are pending: sorting the samples and bisecting once per
+    bucket is much cheaper than bisecting once per sample, and slicing a flat list much cheaper than unzipping tuples.
+    """
+
+    __slots__ = ("pending_handling", "pending_engine", "requests", "counts", "sums")
+
+    # route duration, handler duration or _NO_DURATION, ... of the requests not aggregated yet
+    pending_handling: List[float]
+    # parse duration, serialize duration or _NO_DURATION, write duration, ... of the requests not aggregated yet
+    pending_engine: List[float]
+    # Status -> count
+    requests: Dict[int, int]
+    # Count per bucket of each phase, the last bucket being +Inf
+    counts: List[List[int]]
+    # Sum of the durations of each phase
+    sums: List[float]
+
+    def __init__(self, bucket_count: int) -> None:
+        self.pending_handling = []
+        self.pending_engine = []
+        self.requests = {}
+        self.counts = [[0] * bucket_count for _ in PHASES]
+        self.sums = [0.0] * len(PHASES)
+
+    def flush(self, buckets: Tuple[float, ...], phases: Tuple[bool, ...]) -> None:
+        """Aggregate the pending measures, only called by the thread recording them"""
+        handling, engine = self.pending_handling, self.pending_engine
+        self.pending_handling, self.pending_engine = [], []
+        _aggregate_durations(handling, engine, buckets, phases, self.counts, self.sums)
+
+
+def _aggregate_durations(
+    handling: List[float],
+    engine: List[float],
+    buckets: Tuple[float, ...],
+    phases: Tuple[bool, ...],
+    counts: List[List[int]],
+    sums: List[float],
+) -> None:
+    """``phases`` tells for each phase whether it is kept, the durations of the others are not aggregated"""
+    if handling:
+        if phases[_ROUTE]:
+            _aggregate_phase(handling[0::2], buckets, counts, sums, _ROUTE)
+        if phases[_HANDLER]:
+            _aggregate_phase(handling[1::2], buckets, counts, sums, _HANDLER)
+    if engine:
+        if phases[_PARSE]:
+            _aggregate_phase(engine[0::3], buckets, counts, sums, _PARSE)
+        if phases[_SERIALIZE]:
+            _aggregate_phase(engine[1::3], buckets, counts, sums, _SERIALIZE)
+        if phases[_WRITE]:
+            _aggregate_phase(engine[2::3], buckets, counts, sums, _WRITE)
+
+
+def _aggregate_phase(
+    samples: List[float], buckets: Tuple[float, ...], counts: List[List[int]], sums: List[float], phase: int
+) -> None:
+    samples.sort()
+    # The _NO_DURATION of the requests without this phase come first
+    first = bisect_left(samples, 0.0)
+    if first < len(samples):
+        _aggregate(samples, first, buckets, counts[phase])
+        sums[phase] += sum(samples[first:]) if first else sum(samples)
+
+
+def _aggregate(samples: List[float], first: int, buckets: Tuple[float, ...], counts: List[int]) -> None:
+    """Add the sorted samples from index ``first`` to the count of their bucket"""
+    previous = first
+    end = len(samples)
+    for i, bound in enumerate(buckets):
+        below = bisect_right(samples, bound, previous)
+        counts[i] += below - previous
+        previous = below
+        if previous == end:
+            # The upper buckets, usually most of them, are left empty
+            return
+    counts[-1] += end - previous
+
+
+class _Shard:
+    """Metrics recorded by a single thread"""
+
+    __slots__ = ("routes", "in_flight")
+
+    routes: Dict[str, _RouteMetrics]
+    in_flight: int
+
+    def __init__(self) -> None:
+        self.routes = {}
+        self.in_flight = 0
+
+
+class Metrics:
+    """Metrics of an app, recorded by ``NanoHttpy.handle`` and the engines when ``NanoHttpy(metrics=True)``"""
+
+    buckets: Tuple[float, ...]
+    phases: Tuple[str, ...]
+    # Whether the app, and the engines, time the phases of the requests
+    timed_handling: bool
+    timed_engine: bool
+    # Whether each phase of PHASES is kept
+    _phases: Tuple[bool, ...]
+    _local: threading.local
+    _shards: List[_Shard]
+    _lock: threading.Lock
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, phases: Sequence[str] = ()) -> None:
+        """
+        ``phases`` are the phases having a latency histogram, among PHASES, none by default. The requests are always
+        counted.
+        """
+        unknown = set(phases) - set(PHASES)
+        if unknown:
+            raise NanoHttpyError(f"Unknown metrics phases {sorted(unknown)}, expected some of {list(PHASES)}")
+        self.buckets = tuple(sorted(buckets))
+        self.phases = tuple(phase for phase in PHASES if phase in phases)
+        self._phases = tuple(phase in phases for phase in PHASES)
+        self.timed_handling = self._phases[_ROUTE] or self._phases[_HANDLER]
+        self.timed_engine = self._phases[_PARSE] or self._phases[_SERIALIZE] or self._phases[_WRITE]
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()
+
+    def shard(self) -> _Shard:
+        """The shard of the calling thread"""
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = _Shard()
+            with self._lock:
+                self._shards.append(shard)
+            return shard
+
+    def _route_metrics(self, shard: _Shard, route: Optional[str]) -> _RouteMetrics:
+        route = route or UNMATCHED_ROUTE
+        route_metrics = shard.routes.get(route)
+        if route_metrics is None:
+            # With the +Inf bucket
+            route_metrics = shard.routes[route] = _RouteMetrics(len(self.buckets) + 1)
+        return route_metrics
+
+    def count_request(self, shard: _Shard, req: Request, status: int) -> None:
+        """Request handled by the app, counted with its status. Called instead of ``record_handling`` when not timed"""
+        route_metrics = shard.routes.get(req.route or UNMATCHED_ROUTE) or self._route_metrics(shard, req.route)
+        requests = route_metrics.requests
+        requests[status] = requests.get(status, 0) + 1
+
+    def record_handling(
+        self, shard: _Shard, req: Request, status: int, route_duration: float, handler_duration: Optional[float]
+    ) -> None:
+        """
+        Request handled by the app: counted with its status, and the durations of its route and handler phases in
+        seconds (``handler_duration`` is None if no route matched). Only called by the app if ``timed_handling``.
+        """
+        route_metrics = shard.routes.get(req.route or UNMATCHED_ROUTE) or self._route_metrics(shard, req.route)
+        requests = route_metrics.requests
+        requests[status] = requests.get(status, 0) + 1
+        pending = route_metrics.pending_handling
+        pending.extend((route_duration, _NO_DURATION if handler_duration is None else handler_duration))
+        if len(pending) >= _FLUSH_HANDLING_LENGTH:
+            route_metrics.flush(self.buckets, self._phases)
+
+    def record_engine_phases(
+        self, req: Request, parse_duration: float, serialize_duration: Optional[float], write_duration: float
+    ) -> None:
+        """
+        Phases measured by an engine, in seconds. ``serialize_duration`` is None when the head is serialized while
+        writing (streaming and files). Only called by the engines if ``timed_engine``.
+        """
+        shard = self.shard()
+        route_metrics = shard.routes.get(req.route or UNMATCHED_ROUTE) or self._route_metrics(shard, req.route)
+        pending = route_metrics.pending_engine
+        if serialize_duration is None:
+            serialize_duration = _NO_DURATION
+        pending.extend((parse_duration, serialize_duration, write_duration))
+        if len(pending) >= _FLUSH_ENGINE_LENGTH:
+            route_metrics.flush(self.buckets, self._phases)
+
+    def collect(self) -> Tuple[Dict[Tuple[str, int], int], Dict[Tuple[str, str], Tuple[List[int], float]], int]:
+        """
+        Sum of the shards: the request counts by (route, status), the histograms by (route, phase) as the
+        count per bucket and the sum of the durations, and the requests in flight
+        """
+        with self._lock:
+            shards = list(self._shards)
+        buckets = self.buckets
+        requests: Dict[Tuple[str, int], int] = {}
+        histograms: Dict[Tuple[str, str], Tuple[List[int], float]] = {}
+        in_flight = 0
+        for shard in shards:
+            in_flight += shard.in_flight
+            for route, route_metrics in list(shard.routes.items()):
+                # Copied before being read, the thread of the shard may be recording. The pending measures are
+                # aggregated on the copies, only the recording thread flushes them.
+                route_requests = dict(route_metrics.requests)
+                counts = [list(phase_counts) for phase_counts in route_metrics.counts]
+                sums = list(route_metrics.sums)
+                _aggregate_durations(
+                    list(route_metrics.pending_handling),
+                    list(route_metrics.pending_engine),
+                    buckets,
+                    self._phases,
+                    counts,
+                    sums,
+                )
+                for status, count in route_requests.items():
+                    requests[(route, status)] = requests.get((route, status), 0) + count
+                for phase_index, phase in enumerate(PHASES):
+                    phase_counts, total = counts[phase_index], sums[phase_index]
+                    if not any(phase_counts):
+                        continue
+                    previous = histograms.get((route, phase))
+                    if previous is not None:
+                        phase_counts = [a + b for a, b in zip(previous[0], phase_counts)]
+                        total += previous[1]
+                    histograms[(route, phase)] = (phase_counts, total)
+        return requests, histograms, in_flight
+
+    def render(self) -> str:
+        """All the metrics, in the Prometheus text exposition format"""
+        requests, histograms, in_flight = self.collect()
+        lines = [
+            "# HELP nanohttpy_requests_total Requests handled, by route pattern and status code.",
+            "# TYPE nanohttpy_requests_total counter",
+        ]
+        for (route, status), count in sorted(requests.items()):
+            lines.append(f'nanohttpy_requests_total{{route="{_escape(route)}",status="{status}"}} {count}')
+        lines += [
+            "# HELP nanohttpy_requests_in_flight Requests being handled.",
+            "# TYPE nanohttpy_requests_in_flight gauge",
+            f"nanohttpy_requests_in_flight {in_flight}",
+            "# HELP nanohttpy_phase_duration_seconds Duration of the phases of the requests, by route pattern.",
+            "# TYPE nanohttpy_phase_duration_seconds histogram",
+        ]
+        bounds = [_format_float(bound) for bound in self.buckets] + ["+Inf"]
+        for (route, phase), (counts, total) in sorted(histograms.items()):
+            labels = f'route="{_escape(route)}",phase="{phase}"'
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                lines.append(f'nanohttpy_phase_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"nanohttpy_phase_duration_seconds_sum{{{labels}}} {_format_float(total)}")
+            lines.append(f"nanohttpy_phase_duration_seconds_count{{{labels}}} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_float(value: float) -> str:
+    return repr(float(value))
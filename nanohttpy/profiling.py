@@ -0,0 +1,141 @@
+"""
+On-demand profiling of the handlers with ``cProfile``, e.g. ``NanoHttpy(profiler=Profiler("/tmp/profiles",
+routes=["/items/{id}"], sample_rate=0.01))``. A request is profiled when its route is sampled, or when it carries the
+secret header (``X-NanoHttpy-Profile: <secret>``). Only the handler call is profiled, and its statistics are written
+to a ``pstats`` file per request, readable with ``python -m pstats`` or converted to a flame graph (snakeviz,
+flameprof...).
+
+Without a profiler, the cost for the app is a single attribute check per request.
+"""
+import cProfile
+import hmac
+import itertools
+import os
+import random
+import re
+import time
+import types
+from typing import Any, Callable, Coroutine, Generator, Iterable, Optional, TypeVar
+
+from nanohttpy.exceptions import NanoHttpyError
+from nanohttpy.logging import logger
+from nanohttpy.requests import Request
+
+T = TypeVar("T")
+
+DEFAULT_HEADER = "X-NanoHttpy-Profile"
+
+_re_unsafe_filename_chars = re.compile(r"[^A-Za-z0-9]+")
+
+
+class Profiler:
+    """
+    Profiles a ``sample_rate`` fraction (0 to 1) of the requests to the route patterns ``routes`` (all the routes if
+    None), and the requests whose ``header`` is ``secret``. The statistics are written to ``directory``, at most
+    ``max_profiles`` files, after which the profiling stops.
+
+    The files are written by the thread of the handler: with the event loop based engines, by the loop thread for the
+    non blocking handlers. Sample sparingly.
+    """
+
+    directory: str
+    routes: Optional[frozenset]
+    sample_rate: float
+    header: str
+    max_profiles: int
+    _secret: Optional[bytes]
+    _counter: "itertools.count[int]"
+    _written: int
+
+    def __init__(
+        self,
+        directory: str,
+        routes: Optional[Iterable[str]] = None,
+        sample_rate: float = 0.0,
+        secret: Optional[str] = None,
+        header: str = DEFAULT_HEADER,
+        max_profiles: int = 1000,
+    ) -> None:
+        if not 0.0 <= sample_rate <= 1.0:
+            raise NanoHttpyError(f"sample_rate must be between 0 and 1, got {sample_rate}")
+        if not sample_rate and secret is None:
+            raise NanoHttpyError("Profiler requires a sample_rate or a secret, otherwise nothing is profiled")
+        self.directory = directory
+        self.routes = frozenset(routes) if routes is not None else None
+        self.sample_rate = sample_rate
+        self.header = header
+        self.max_profiles = max_profiles
+        self._secret = secret.encode() if secret is not None else None
+        self._counter = itertools.count(1)
+        self._written = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def should_profile(self, req: Request) -> bool:
+        """Whether the handler call of the request must be profiled. ``req.route`` must be set"""
+        if self._written >= self.max_profiles:
+            return False
+        if self._secret is not None:
+            value = req.headers.get(self.header)
+            if value is not None:
+                # Constant time, not to leak the secret
+                return hmac.compare_digest(value.encode(), self._secret)
+        if self.sample_rate and (self.routes is None or req.route in self.routes):
+            return random.random() < self.sample_rate
+        return False
+
+    def profile_call(self, req: Request, func: Callable[..., T], *args: Any) -> T:
+        """``func(*args)``, profiled"""
+        profile = cProfile.Profile()
+        try:
+            return profile.runcall(func, *args)
+        finally:
+            self._dump(req, profile)
+
+    async def profile_coroutine(self, req: Request, coro: Coroutine[Any, Any, T]) -> T:
+        """
+        Await ``coro``, profiled. The profiler is only enabled while the coroutine runs, not while it is suspended:
+        the other tasks of the event loop are left out.
+        """
+        profile = cProfile.Profile()
+        try:
+            return await _profile_steps(profile, coro)
+        finally:
+            self._dump(req, profile)
+
+    def _dump(self, req: Request, profile: cProfile.Profile) -> None:
+        route = _re_unsafe_filename_chars.sub("_", req.route or "").strip("_") or "root"
+        filename = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{next(self._counter)}-{route}.prof"
+        path = os.path.join(self.directory, filename)
+        try:
+            profile.dump_stats(path)
+        except OSError as e:
+            logger.error("Cannot write the profile of %s %s to %s: %s", req.method, req.full_path, path, e)
+            return
+        self._written += 1
+        logger.info("Profile of %s %s written to %s", req.method, req.full_path, path)
+
+
+@types.coroutine
+def _profile_steps(profile: cProfile.Profile, coro: Coroutine[Any, Any, T]) -> Generator[Any, Any, T]:
+    """Drive ``coro`` step by step, with the profiler enabled during each step only"""
+    value: Any = None
+    error: Optional[BaseException] = None
+    while True:
+        profile.enable()
+        try:
+            if error is None:
+                yielded = coro.send(value)
+            else:
+                yielded = coro.throw(error)
+        except StopIteration as e:
+            return e.value
+        finally:
+            profile.disable()
+        try:
+            value, error = (yield yielded), None
+        except GeneratorExit:
+            coro.close()
+            raise
+        except BaseException as e:  # pylint: disable=broad-except
+            # Cancellation and the like are forwarded to the coroutine
+            value, error = None, e
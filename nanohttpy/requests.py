@@ -1,24 +1,168 @@
-from dataclasses import dataclass, field
-from typing import Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
 
-from nanohttpy.http import URL, HTTPHeaders, fast_parse_request_path, parse_query_string
+from nanohttpy import json
+from nanohttpy.bodies import CHUNK_SIZE, RequestBody
+from nanohttpy.exceptions import BadRequestError
+from nanohttpy.forms import DEFAULT_FORM_LIMITS, FormFields, FormFiles, FormLimits, parse_form
+from nanohttpy.headers import Headers, RawHTTPHeaders
+from nanohttpy.http import URL, HTTPHeaders, fast_parse_request_path, parse_header_options, parse_query_string
+
+_MISSING: Any = object()
 
 
-@dataclass
 class Request:  # pylint: disable=too-many-instance-attributes
+    """
+    Incoming request. Everything that is not needed to route the request (URL, query args, headers, text of the body)
+    is computed the first time it is read, and then cached.
+    """
+
+    __slots__ = (
+        "method",
+        "full_path",  # Requested path, including query string and fragment
+        "request_version",
+        "path_parameters",
+        "route",  # Pattern of the route that matched, e.g. "/hello/{name}", set by NanoHttpy.lookup
+        "_body",
+        "_headers",
+        "_path",
+        "_url",
+        "_args",
+        "_text",
+        "_json",
+        "_form",
+    )
+
     method: str
-    full_path: str  # Requested path, including query string and fragment
+    full_path: str
     request_version: str
-    headers: HTTPHeaders
-    body: bytes
-    url: URL = field(init=False)
-    args: Dict[str, List[str]] = field(init=False)  # The parsed URL params, compatibility with Flask
-    path_parameters: Dict[str, str] = field(init=False)
-
-    def __post_init__(self):
-        self.url = fast_parse_request_path(self.full_path)
-        self.args = parse_query_string(self.url.query) if self.url.query else {}
+    path_parameters: Dict[str, str]
+    route: Optional[str]
+
+    def __init__(
+        self,
+        method: str,
+        full_path: str,
+        request_version: str,
+        headers: Union[Headers, HTTPHeaders, RawHTTPHeaders],
+        body: Union[bytes, RequestBody],
+    ) -> None:
+        self.method = method
+        self.full_path = full_path
+        self.request_version = request_version
+        self._body = body
         self.path_parameters = {}
+        self.route = None
+        # Wrapped in Headers on first access
+        self._headers = headers
+        self._path: Optional[str] = None
+        self._url: Optional[URL] = None
+        self._args: Optional[Dict[str, List[str]]] = None
+        self._text: Optional[str] = None
+        self._json: Any = _MISSING
+        self._form: Optional[Tuple[FormFields, FormFiles]] = None
+
+    @property
+    def path(self) -> str:
+        """Requested path, without query string and fragment. Cheaper than ``url.path``"""
+        path = self._path
+        if path is None:
+            path = self._path = self.full_path.partition("?")[0].partition("#")[0]
+        return path
+
+    @property
+    def url(self) -> URL:
+        url = self._url
+        if url is None:
+            url = self._url = fast_parse_request_path(self.full_path)
+        return url
+
+    @url.setter
+    def url(self, url: URL) -> None:
+        self._url = url
+
+    @property
+    def args(self) -> Dict[str, List[str]]:
+        """The parsed URL params, compatibility with Flask"""
+        args = self._args
+        if args is None:
+            query = self.full_path.partition("#")[0].partition("?")[2]
+            args = self._args = parse_query_string(query) if query else {}
+        return args
+
+    @args.setter
+    def args(self, args: Dict[str, List[str]]) -> None:
+        self._args = args
+
+    @property
+    def headers(self) -> Headers:
+        """Case-insensitive, the values are decoded when read"""
+        headers = self._headers
+        if not isinstance(headers, Headers):
+            headers = self._headers = Headers(headers)
+        return headers
+
+    @headers.setter
+    def headers(self, headers: Union[Headers, HTTPHeaders, RawHTTPHeaders]) -> None:
+        self._headers = headers
+
+    @property
+    def body(self) -> bytes:
+        """The whole body. A body spilled to a temporary file is read again on every access, prefer ``stream()``"""
+        body = self._body
+        return body.read() if isinstance(body, RequestBody) else body
+
+    @body.setter
+    def body(self, body: Union[bytes, RequestBody]) -> None:
+        self._body = body
+        self._text = None
+        self._json = _MISSING
+        self._form = None
+
+    def stream(self, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        """The body by chunks, without loading it in memory if it was spilled to a temporary file"""
+        body = self._body
+        if isinstance(body, RequestBody):
+            return body.iter_chunks(chunk_size)
+        return iter((body,) if body else ())
+
+    @property
+    def text(self) -> str:
+        """The body, decoded with the charset of the Content-Type (utf-8 by default)"""
+        text = self._text
+        if text is None:
+            text = self._text = self.body.decode(self._charset(), errors="replace")
+        return text
+
+    def json(self) -> Any:
+        """The body parsed by the JSON backend of the app. Raises BadRequestError if it is not valid JSON"""
+        value = self._json
+        if value is _MISSING:
+            try:
+                value = self._json = json.loads(self.body)
+            except ValueError as e:
+                raise BadRequestError(f"Invalid JSON body: {e}") from e
+        return value
+
+    def form(self, limits: FormLimits = DEFAULT_FORM_LIMITS) -> FormFields:
+        """
+        Fields of an ``application/x-www-form-urlencoded`` or ``multipart/form-data`` body, empty for the other content
+        types. The body is parsed by chunks, with ``limits`` (only those of the first call of form() or files() apply).
+        Raises BadRequestError if the body is invalid, PayloadTooLargeError if a field or a file is too big.
+        """
+        return self._parse_form(limits)[0]
+
+    def files(self, limits: FormLimits = DEFAULT_FORM_LIMITS) -> FormFiles:
+        """Files of a ``multipart/form-data`` body, parsed along with the fields, see ``form()``"""
+        return self._parse_form(limits)[1]
+
+    def _parse_form(self, limits: FormLimits) -> Tuple[FormFields, FormFiles]:
+        form = self._form
+        if form is None:
+            form = self._form = parse_form(self.headers.get("Content-Type"), self.stream(), limits)
+        return form
+
+    def _charset(self) -> str:
+        return parse_header_options(self.headers.get("Content-Type", ""))[1].get("charset") or "utf-8"
 
     def query(self, key: str, default: str = None) -> Optional[str]:
         """
@@ -35,5 +179,29 @@ class Request:  # pylint: disable=too-many-instance-attributes
         """
         return self.path_parameters.get(key, default)
 
+    def __eq__(self, other: Any) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return (
+            self.method,
+            self.full_path,
+            self.request_version,
+            self.headers,
+            self.body,
+            self.path_parameters,
+        ) == (
+            other.method,
+            other.full_path,
+            other.request_version,
+            other.headers,
+            other.body,
+            other.path_parameters,
+        )
 
+    __hash__ = None  # type: ignore
 
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(method={self.method!r}, full_path={self.full_path!r}, "
+            f"request_version={self.request_version!r}, path_parameters={self.path_parameters!r})"
+        )
@@ -0,0 +1,147 @@
+"""
+Cache of the responses of the routes declared with ``cache_ttl``, e.g. ``@app.get("/items", cache_ttl=30)``: while an
+entry is fresh, the handler is not called. The cached responses carry an ``ETag``, and the requests with a matching
+``If-None-Match`` are answered with a 304.
+"""
+import threading
+import time
+from typing import TYPE_CHECKING, Hashable, NamedTuple, Optional, Sequence, Tuple
+
+from nanohttpy.caching import CacheInfo, LRUCache
+from nanohttpy.http import etag_matches, find_response_header, get_response_header
+from nanohttpy.lazy_loader import LazyLoader
+from nanohttpy.requests import Request
+from nanohttpy.responses import FileResponse, Response, StreamingResponse
+
+if TYPE_CHECKING:
+    import hashlib
+else:
+    # Only needed once a response is cached
+    hashlib = LazyLoader("hashlib", globals(), "hashlib")
+
+CACHEABLE_METHODS = ("GET", "HEAD")
+
+# Headers of the full response that are also sent with a 304 (RFC 7232, section 4.1)
+_NOT_MODIFIED_HEADERS = frozenset(
+    ("etag", "cache-control", "content-location", "date", "expires", "last-modified", "vary")
+)
+
+# Rough size of the status and headers of a cached response
+_RESPONSE_OVERHEAD = 256
+
+
+class CachePolicy(NamedTuple):
+    """Cache settings of a route"""
+
+    ttl: float
+    # Query args part of the key, None for the whole query string
+    query_args: Optional[Tuple[str, ...]] = None
+    # Request headers part of the key
+    headers: Tuple[str, ...] = ()
+
+    @classmethod
+    def create(
+        cls, ttl: float, query_args: Optional[Sequence[str]] = None, headers: Sequence[str] = ()
+    ) -> "CachePolicy":
+        return cls(ttl, tuple(query_args) if query_args is not None else None, tuple(headers))
+
+    def key(self, req: Request) -> Hashable:
+        # The method is part of the key: a path may have a GET and a HEAD handler, with different responses
+        if self.query_args is None:
+            query: Hashable = req.full_path.partition("#")[0].partition("?")[2]
+        else:
+            args = req.args
+            query = tuple(tuple(args.get(name, ())) for name in self.query_args)
+        if self.headers:
+            headers = req.headers
+            return req.method, req.path, query, tuple(headers.get(name) for name in self.headers)
+        return req.method, req.path, query
+
+
+class _CachedResponse(NamedTuple):
+    expires_at: float
+    response: Response
+
+
+def is_cacheable(res: Response) -> bool:
+    """Whether the response can be shared by all the requests having the same cache key"""
+    if res.status_code != 200 or isinstance(res, (StreamingResponse, FileResponse)):
+        return False
+    # The handlers may set the headers in any case
+    headers = res.headers
+    if find_response_header(headers, "Set-Cookie") is not None:
+        return False
+    cache_control = get_response_header(headers, "Cache-Control")
+    if cache_control is None:
+        return True
+    cache_control = cache_control.lower()
+    return "no-store" not in cache_control and "private" not in cache_control
+
+
+def make_etag(body: bytes) -> str:
+    return f'"{hashlib.blake2b(body, digest_size=12).hexdigest()}"'
+
+
+class ResponseCache:
+    """
+    LRU cache of at most ``maxsize`` responses and ``max_bytes`` bytes of bodies, shared by all the cached routes.
+    An expired entry counts as a miss.
+    """
+
+    _cache: LRUCache[Hashable, _CachedResponse]
+    _lock: threading.Lock
+    _expired: int
+
+    def __init__(self, maxsize: int = 1024, max_bytes: int = 64 * 1024 * 1024) -> None:
+        self._cache = LRUCache(
+            maxsize,
+            max_bytes=max_bytes,
+            sizeof=lambda entry: len(entry.response.encoded_body) + _RESPONSE_OVERHEAD,
+        )
+        self._lock = threading.Lock()
+        self._expired = 0
+
+    def info(self) -> CacheInfo:
+        info = self._cache.info()
+        with self._lock:
+            expired = self._expired
+        return info._replace(hits=info.hits - expired, misses=info.misses + expired)
+
+    def get(self, key: Hashable, req: Request) -> Optional[Response]:
+        """The cached response for the request (or a 304), None if absent or expired"""
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._cache.pop(key)
+            with self._lock:
+                self._expired += 1
+            return None
+        return not_modified(req, entry.response)
+
+    def put(self, key: Hashable, ttl: float, req: Request, res: Response) -> Response:
+        """Cache the response if possible, and return the response for the request (or a 304)"""
+        if not is_cacheable(res):
+            return res
+        headers = dict(res.headers)
+        if find_response_header(headers, "ETag") is None:
+            headers["ETag"] = make_etag(res.encoded_body)
+        # A copy, the handler may return the same response object for other requests
+        res = Response(res.encoded_body, res.status_code, headers)
+        self._cache.put(key, _CachedResponse(time.monotonic() + ttl, res))
+        return not_modified(req, res)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+
+def not_modified(req: Request, res: Response) -> Response:
+    """A 304 if the ``If-None-Match`` of the request matches the ETag of the response, otherwise the response"""
+    etag = get_response_header(res.headers, "ETag")
+    if etag is None:
+        return res
+    if_none_match = req.headers.get("If-None-Match")
+    if if_none_match is None or not etag_matches(if_none_match, etag):
+        return res
+    headers = {name: value for name, value in res.headers.items() if name.lower() in _NOT_MODIFIED_HEADERS}
+    return Response(status_code=304, headers=headers)
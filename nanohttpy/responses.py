@@ -1,11 +1,27 @@
 from http import HTTPStatus
-import json
-from typing import Any, Dict, Optional, Type
-from nanohttpy.exceptions import NanoHttpyError
+import os
+import pathlib
+import stat
+import types
+from typing import TYPE_CHECKING, Any, AsyncIterable, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Type, Union
+from nanohttpy import json
+from nanohttpy.concurrency import run_coroutine_sync
+from nanohttpy.exceptions import NanoHttpyError, NotFoundError, RangeNotSatisfiableError
+from nanohttpy.http import is_not_modified_since, parse_range_header
+from nanohttpy.lazy_loader import LazyLoader
 
 from nanohttpy.logging import logger
+from nanohttpy.requests import Request
 from nanohttpy.types import Decorator
 
+if TYPE_CHECKING:
+    from email import utils as email_utils
+    import mimetypes
+else:
+    # Only needed by the files, imported on first use
+    email_utils = LazyLoader("email_utils", globals(), "email.utils")
+    mimetypes = LazyLoader("mimetypes", globals(), "mimetypes")
+
 
 _HTTP_HEADER_ENCODING = "iso-8859-1"
 _RESPONSE_TYPES: Dict[type, Type["Response"]] = {}
@@ -29,10 +45,11 @@ def response_adapter(*adapted_types: type) -> Decorator[Type["Response"]]:
 def adapt_response(handler_result: Any) -> "Response":
     """Try to detect the suitable type of response depending on type of content and wraps it"""
     if isinstance(handler_result, Response):
-        logger.debug(
-            "Handler result is an instance of Response %s, returning as-is",
-            type(handler_result),
-        )
+        if __debug__:
+            logger.debug(
+                "Handler result is an instance of Response %s, returning as-is",
+                type(handler_result),
+            )
         return handler_result
 
     content = handler_result
@@ -43,10 +60,11 @@ def adapt_response(handler_result: Any) -> "Response":
     res = _RESPONSE_TYPES.get(type(content), None)
     if res is None:
         res = Response
-        logger.debug(
-            "No Response found adapting %s, defaulting to Response", type(content)
-        )
-    else:
+        if __debug__:
+            logger.debug(
+                "No Response found adapting %s, defaulting to Response", type(content)
+            )
+    elif __debug__:
         logger.debug(
             "Content is %s, adapting with <%s.%s>",
             type(content),
@@ -61,6 +79,8 @@ def adapt_response(handler_result: Any) -> "Response":
 
 
 class Response:
+    __slots__ = ("status_code", "headers", "encoded_body", "_encoded_headers")
+
     status_code: int
     headers: Dict[str, str]
     encoded_body: bytes
@@ -74,6 +94,7 @@ class Response:
         headers: Optional[Dict[str, str]] = None,
     ) -> None:
         self.status_code = status_code
+        self._encoded_headers: Optional[Dict[bytes, bytes]] = None
         self.encoded_body = self.render(content)
         self._init_headers(headers)
 
@@ -89,23 +110,27 @@ class Response:
             headers["Content-Type"] = content_type
 
         # Per section 3.3.2 of RFC 7230, "a server MUST NOT send a Content-Length header field in any response with a
-        # status code of 1xx (Informational) or 204 (No Content)."
-        if 100 <= self.status_code < 200 or self.status_code == 204:
-            del headers["Content-Length"]
-            del headers["Content-Type"]
+        # status code of 1xx (Informational) or 204 (No Content)." A 304 has no body either, and its Content-Length
+        # may only be the one of the full response.
+        if 100 <= self.status_code < 200 or self.status_code in (204, 304):
+            headers.pop("Content-Length", None)
+            headers.pop("Content-Type", None)
 
         self.headers = headers
 
     @property
     def encoded_headers(self) -> Dict[bytes, bytes]:
-        if not hasattr(self, "_encoded_headers"):
-            self._encoded_headers: Dict[  # pylint: disable=attribute-defined-outside-init
-                bytes, bytes
-            ] = {
+        encoded_headers = self._encoded_headers
+        if encoded_headers is None:
+            encoded_headers = self._encoded_headers = {
                 k.encode(_HTTP_HEADER_ENCODING): v.encode(_HTTP_HEADER_ENCODING)
                 for k, v in self.headers.items()
             }
-        return self._encoded_headers
+        return encoded_headers
+
+    def prepare(self, req: Request) -> "Response":  # pylint: disable=unused-argument
+        """Last step before sending, for the responses depending on the request headers (conditional requests...)"""
+        return self
 
     @property
     def status_reason(self) -> str:
@@ -121,17 +146,232 @@ class Response:
 
 @response_adapter(bytes, str)
 class PlainTextResponse(Response):
+    __slots__ = ()
     _media_type = "text/plain"
 
 
 @response_adapter(dict)
 class JSONResponse(Response):
+    __slots__ = ()
     _media_type = "application/json"
 
     def render(self, content: Any) -> bytes:
-        # Since we encoded in utf-8, no need to worry about ensure_ascii
-        return json.dumps(
-            content, ensure_ascii=False, allow_nan=False, separators=(",", ":")
-        ).encode(
-            self._charset,
-        )
+        # utf-8 encoded by the JSON backend
+        return json.dumps(content)
+
+
+Chunk = Union[bytes, str]
+
+
+@response_adapter(types.GeneratorType, types.AsyncGeneratorType)
+class StreamingResponse(Response):
+    """
+    Response whose body is produced by a sync or async iterator of chunks, sent as they come with
+    ``Transfer-Encoding: chunked`` (or until the connection is closed, for HTTP/1.0 clients).
+    Sync iterators are consumed on the event loop by the async engines: use an async iterator for blocking I/O.
+    """
+
+    __slots__ = ("body_iterator",)
+
+    body_iterator: Union[Iterable[Chunk], AsyncIterable[Chunk]]
+
+    def __init__(
+        self,
+        content: Union[Iterable[Chunk], AsyncIterable[Chunk]],
+        status_code: int = 200,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> None:
+        self.body_iterator = content
+        super().__init__(None, status_code, headers)
+
+    def _init_headers(self, headers: Optional[Dict[str, str]]) -> None:
+        headers = headers or {}
+        if self._media_type is not None:
+            content_type = self._media_type
+            if self._charset:
+                content_type += "; charset=" + self._charset.upper()
+            headers.setdefault("Content-Type", content_type)
+        self.headers = headers
+
+    def iter_sync(self) -> Iterator[bytes]:
+        """The non-empty chunks, encoded. Async iterators are run on the event loop of the calling thread"""
+        iterator = self.body_iterator
+        charset = self._charset
+        if hasattr(iterator, "__aiter__"):
+            aiterator = iterator.__aiter__()  # type: ignore
+            while True:
+                try:
+                    chunk = run_coroutine_sync(aiterator.__anext__())
+                except StopAsyncIteration:
+                    return
+                if chunk:
+                    yield chunk.encode(charset) if isinstance(chunk, str) else chunk
+        else:
+            for chunk in iterator:  # type: ignore
+                if chunk:
+                    yield chunk.encode(charset) if isinstance(chunk, str) else chunk
+
+    async def iter_async(self) -> AsyncIterator[bytes]:
+        """The non-empty chunks, encoded"""
+        iterator = self.body_iterator
+        charset = self._charset
+        if hasattr(iterator, "__aiter__"):
+            async for chunk in iterator:  # type: ignore
+                if chunk:
+                    yield chunk.encode(charset) if isinstance(chunk, str) else chunk
+        else:
+            for chunk in iterator:  # type: ignore
+                if chunk:
+                    yield chunk.encode(charset) if isinstance(chunk, str) else chunk
+
+    def close(self) -> None:
+        """Release the iterator, e.g. when the client disconnected or for a HEAD request"""
+        iterator = self.body_iterator
+        if hasattr(iterator, "aclose"):
+            run_coroutine_sync(iterator.aclose())  # type: ignore
+        elif hasattr(iterator, "close"):
+            iterator.close()  # type: ignore
+
+    async def aclose(self) -> None:
+        iterator = self.body_iterator
+        if hasattr(iterator, "aclose"):
+            await iterator.aclose()  # type: ignore
+        elif hasattr(iterator, "close"):
+            iterator.close()  # type: ignore
+
+
+class NDJSONResponse(StreamingResponse):
+    """
+    One JSON document per line, encoded incrementally.
+    The lines of lists and tuples are grouped in chunks of about ``chunk_size`` bytes, the items of the other iterators
+    are sent as they come.
+    """
+
+    __slots__ = ()
+
+    _media_type = "application/x-ndjson"
+
+    def __init__(
+        self,
+        content: Union[Iterable[Any], AsyncIterable[Any]],
+        status_code: int = 200,
+        headers: Optional[Dict[str, str]] = None,
+        chunk_size: int = 65536,
+    ) -> None:
+        iterator: Union[Iterable[bytes], AsyncIterable[bytes]]
+        if isinstance(content, (list, tuple)):
+            iterator = _grouped_ndjson_lines(content, chunk_size)
+        elif hasattr(content, "__aiter__"):
+            iterator = _async_ndjson_lines(content)  # type: ignore
+        else:
+            iterator = (json.dumps(item) + b"\n" for item in content)  # type: ignore
+        super().__init__(iterator, status_code, headers)
+
+
+def _grouped_ndjson_lines(items: Iterable[Any], chunk_size: int) -> Iterator[bytes]:
+    dumps = json.dumps
+    buffer: List[bytes] = []
+    size = 0
+    for item in items:
+        line = dumps(item) + b"\n"
+        buffer.append(line)
+        size += len(line)
+        if size >= chunk_size:
+            yield b"".join(buffer)
+            buffer.clear()
+            size = 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+async def _async_ndjson_lines(items: AsyncIterable[Any]) -> AsyncIterator[bytes]:
+    async for item in items:
+        yield json.dumps(item) + b"\n"
+
+
+def guess_media_type(path: str) -> str:
+    """Content type of a file, from its name"""
+    media_type, encoding = mimetypes.guess_type(path)
+    # A compressed file (.gz etc...) is sent as is, not as its decompressed type
+    return media_type if media_type is not None and encoding is None else "application/octet-stream"
+
+
+@response_adapter(pathlib.Path, pathlib.PosixPath, pathlib.WindowsPath)
+class FileResponse(Response):
+    """
+    File sent by the engines with sendfile, without copying it through Python. Answers the ``Range`` (single range)
+    and ``If-Modified-Since`` requests with 206 and 304. The content type is guessed from the filename.
+    Raises NotFoundError if the file doesn't exist.
+    """
+
+    __slots__ = ("path", "size", "mtime", "offset", "count")
+
+    path: str
+    size: int
+    mtime: float
+    # Part of the file to send
+    offset: int
+    count: int
+
+    def __init__(
+        self,
+        content: Union[str, "os.PathLike[str]"],
+        status_code: int = 200,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> None:
+        self.path = os.fspath(content)
+        try:
+            st = os.stat(self.path)
+        except (FileNotFoundError, NotADirectoryError) as e:
+            raise NotFoundError() from e
+        if not stat.S_ISREG(st.st_mode):
+            raise NotFoundError()
+        self.size = st.st_size
+        self.mtime = st.st_mtime
+        self.offset = 0
+        self.count = self.size
+        super().__init__(None, status_code, headers)
+
+    def _init_headers(self, headers: Optional[Dict[str, str]]) -> None:
+        headers = headers or {}
+        headers["Content-Length"] = str(self.size)
+        if "Content-Type" not in headers:
+            headers["Content-Type"] = guess_media_type(self.path)
+        headers["Last-Modified"] = email_utils.formatdate(self.mtime, usegmt=True)
+        headers["Accept-Ranges"] = "bytes"
+        self.headers = headers
+
+    def prepare(self, req: Request) -> Response:
+        if self.status_code != 200 or req.method not in ("GET", "HEAD"):
+            return self
+        headers = req.headers
+        if_modified_since = headers.get("If-Modified-Since")
+        if if_modified_since is not None and is_not_modified_since(if_modified_since, self.mtime):
+            self.status_code = 304
+            self.count = 0
+            self.headers.pop("Content-Length", None)
+            return self
+
+        range_header = headers.get("Range")
+        if range_header is None:
+            return self
+        # Only send a part if the file didn't change since the client got the first one
+        if_range = headers.get("If-Range")
+        if if_range is not None and if_range != self.headers["Last-Modified"]:
+            return self
+        try:
+            byte_range = parse_range_header(range_header, self.size)
+        except RangeNotSatisfiableError:
+            self.status_code = 416
+            self.count = 0
+            self.headers["Content-Length"] = "0"
+            self.headers["Content-Range"] = f"bytes */{self.size}"
+            return self
+        if byte_range is not None:
+            first, last = byte_range
+            self.status_code = 206
+            self.offset = first
+            self.count = last - first + 1
+            self.headers["Content-Length"] = str(self.count)
+            self.headers["Content-Range"] = f"bytes {first}-{last}/{self.size}"
+        return self
@@ -1,9 +1,15 @@
 from dataclasses import dataclass, field
 from operator import xor
 import re
-from typing import Dict, Generator, Optional
+from typing import Dict, Generator, List, Optional, Tuple, Type, Union
 
-from nanohttpy.exceptions import MethodNotAllowedError, NanoHttpyError, NotFoundError
+from nanohttpy.caching import CacheInfo, LRUCache
+from nanohttpy.exceptions import (
+    HttpError,
+    MethodNotAllowedError,
+    NanoHttpyError,
+    NotFoundError,
+)
 from nanohttpy.logging import logger
 from nanohttpy.requests import Request
 from nanohttpy.types import DecoratedHandlerFunc
@@ -75,51 +81,187 @@ def check_param(path_comp) -> bool:
     return path_comp[0] in ("{", "<")
 
 
+# Immutable version of a RouteTree: (static children, path param name, wild child, method handlers)
+_CompiledNode = Tuple[
+    Dict[str, "_CompiledNode"],
+    Optional[str],
+    Optional["_CompiledNode"],
+    Dict[str, DecoratedHandlerFunc],
+]
+
+
+# Result of a lookup: the handler and the path parameters, or no handler and the error to raise
+_CacheEntry = Union[
+    Tuple[DecoratedHandlerFunc, Dict[str, str]],
+    Tuple[None, Type[HttpError]],
+]
+
+
+def normalize_path(path: str) -> str:
+    """Canonical form of a path: '/' separated, no empty component"""
+    return "/" + "/".join(tokenize_path(path))
+
+
+def _compile_tree(tree: RouteTree) -> _CompiledNode:
+    wild = tree.get_wild_child()
+    return (
+        {path: _compile_tree(child) for path, child in tree._children.items()},  # pylint: disable=protected-access
+        None if wild is None else wild.path_param,
+        None if wild is None else _compile_tree(wild),
+        dict(tree._method_handlers),  # pylint: disable=protected-access
+    )
+
+
+def _collect_static_routes(
+    node: _CompiledNode, path: str, res: Dict[str, Dict[str, DecoratedHandlerFunc]]
+) -> None:
+    """Collect the nodes that can be reached through static children only, with their handlers"""
+    children, _, _, handlers = node
+    res[path] = handlers
+    for comp, child in children.items():
+        _collect_static_routes(child, f"{path.rstrip('/')}/{comp}", res)
+
+
 class Router:
-    _route_tree: RouteTree
+    """
+    Routes are registered with ``add_route``, then compiled by ``freeze``, which is done automatically on the first
+    lookup after a modification. Once frozen, the paths without parameters are resolved by a single dict lookup.
+
+    With ``cache_size > 0``, the results of the lookups (handler and path parameters, or 404/405) are kept in a LRU
+    cache keyed by method and path, emptied whenever a route is added.
+    """
+
+    _routes: List[Tuple[str, str, DecoratedHandlerFunc]]
+    _root: Optional[_CompiledNode]
+    _static_routes: Dict[str, Dict[str, DecoratedHandlerFunc]]
+    _cache: Optional[LRUCache[Tuple[str, str], _CacheEntry]]
 
-    def __init__(self) -> None:
-        self._route_tree = RouteTree("")
+    def __init__(self, cache_size: int = 0) -> None:
+        self._routes = []
+        self._root = None
+        self._static_routes = {}
+        self._cache = LRUCache(cache_size) if cache_size > 0 else None
+
+    def cache_info(self) -> Optional[CacheInfo]:
+        """Statistics of the lookup cache, None if disabled"""
+        return self._cache.info() if self._cache is not None else None
 
     def add_route(self, method: str, path: str, handler: DecoratedHandlerFunc):
-        # TODO: pre-validation to avoid error handling in the middle + better error message ?
-        curr_route = self._route_tree
+        # Validate the syntax early, conflicts between routes are only reported by freeze()
         for path_comp in tokenize_path(path):
-            if check_param(path_comp):
-                param_name = path_comp[1:-1]
-                curr_route = curr_route.get_or_create_wild_child(param_name)
-                if curr_route.path_param != param_name:
-                    raise NanoHttpyError(
-                        f"Found handler with different wildcard '{curr_route.path_param}' name for request '{method} {path}'"
-                    )
-            else:
-                curr_route = curr_route.get_or_create_child(path_comp)
-        if curr_route.has_handler(method):
-            raise NanoHttpyError(
-                f"A handler is already registered for request '{method} {path}'"
-            )
-        curr_route.set_handler(method, handler)
+            check_param(path_comp)
+        self._routes.append((method, path, handler))
+        self._root = None
+        if self._cache is not None:
+            self._cache.clear()
         logger.debug(
             "Handler <%s> set for request '%s %s'", handler.__name__, method, path
         )
 
+    @property
+    def frozen(self) -> bool:
+        return self._root is not None
+
+    def freeze(self) -> None:
+        """Compile the registered routes, raise a NanoHttpyError listing the conflicting ones"""
+        route_tree = RouteTree("")
+        conflicts: List[str] = []
+        for method, path, handler in self._routes:
+            curr_route = route_tree
+            for path_comp in tokenize_path(path):
+                if check_param(path_comp):
+                    param_name = path_comp[1:-1]
+                    curr_route = curr_route.get_or_create_wild_child(param_name)
+                    if curr_route.path_param != param_name:
+                        conflicts.append(
+                            f"Found handler with different wildcard '{curr_route.path_param}' name for request '{method} {path}'"
+                        )
+                        break
+                else:
+                    curr_route = curr_route.get_or_create_child(path_comp)
+            else:
+                if curr_route.has_handler(method):
+                    conflicts.append(
+                        f"A handler is already registered for request '{method} {path}'"
+                    )
+                else:
+                    curr_route.set_handler(method, handler)
+        if conflicts:
+            raise NanoHttpyError("Conflicting routes:\n  " + "\n  ".join(conflicts))
+
+        root = _compile_tree(route_tree)
+        static_routes: Dict[str, Dict[str, DecoratedHandlerFunc]] = {}
+        _collect_static_routes(root, "/", static_routes)
+        self._static_routes = static_routes
+        self._root = root
+        if self._cache is not None:
+            self._cache.clear()
+        logger.debug(
+            "Router frozen: %d routes, %d static paths", len(self._routes), len(static_routes)
+        )
+
     def get_handler(self, req: Request) -> DecoratedHandlerFunc:
-        method, path = req.method, req.url.path
-        logger.debug("Matching route for request '%s %s'...", method, path)
-        curr_route = self._route_tree
-        for path_comp in tokenize_path(path):
-            opt_route = curr_route.get_child(path_comp, req.path_parameters)
-            if opt_route is None:
-                logger.debug("No match found for path component '%s'", path_comp)
-                raise NotFoundError()
-            curr_route = opt_route
+        if self._root is None:
+            self.freeze()
+        method, path = req.method, req.path
+        if __debug__:
+            logger.debug("Matching route for request '%s %s'...", method, path)
+
+        cache = self._cache
+        if cache is None:
+            return self._resolve(method, path, req.path_parameters)
 
-        handler = curr_route.get_handler(method)
+        key = (method, path)
+        entry = cache.get(key)
+        if entry is None:
+            params: Dict[str, str] = {}
+            try:
+                entry = (self._resolve(method, path, params), params)
+            except (NotFoundError, MethodNotAllowedError) as e:
+                entry = (None, type(e))
+            cache.put(key, entry)
+
+        handler, res = entry
+        if handler is None:
+            raise res()  # type: ignore
+        if res:
+            req.path_parameters.update(res)  # type: ignore
+        return handler
+
+    def _resolve(
+        self, method: str, path: str, params: Dict[str, str]
+    ) -> DecoratedHandlerFunc:
+        handlers = self._static_routes.get(path)
+        if handlers is None:
+            handlers = self._match(path, params)
+
+        handler = handlers.get(method)
         if handler is None:
-            logger.debug("Method %s not allowed for path '%s'", method, path)
+            if __debug__:
+                logger.debug("Method %s not allowed for path '%s'", method, path)
             raise MethodNotAllowedError()
 
-        logger.debug(
-            "Found handler <%s> for request '%s %s'...", handler.__name__, method, path
-        )
+        if __debug__:
+            logger.debug(
+                "Found handler <%s> for request '%s %s'...", handler.__name__, method, path
+            )
         return handler
+
+    def _match(
+        self, path: str, params: Dict[str, str]
+    ) -> Dict[str, DecoratedHandlerFunc]:
+        # Static children take precedence over the wild child, without backtracking
+        node: _CompiledNode = self._root  # type: ignore
+        for path_comp in path.split("/"):
+            if not path_comp:
+                continue
+            next_node = node[0].get(path_comp)
+            if next_node is None:
+                next_node = node[2]
+                if next_node is None:
+                    if __debug__:
+                        logger.debug("No match found for path component '%s'", path_comp)
+                    raise NotFoundError()
+                params[node[1]] = path_comp  # type: ignore
+            node = next_node
+        return node[3]
@@ -0,0 +1,121 @@
+import os
+import stat
+from typing import TYPE_CHECKING, Dict, NamedTuple, Optional, Tuple
+
+from nanohttpy.caching import CacheInfo, LRUCache
+from nanohttpy.exceptions import MethodNotAllowedError, NanoHttpyError, NotFoundError
+from nanohttpy.http import accepts_encoding, is_not_modified_since
+from nanohttpy.lazy_loader import LazyLoader
+from nanohttpy.requests import Request
+from nanohttpy.responses import FileResponse, Response, guess_media_type
+
+if TYPE_CHECKING:
+    from email import utils as email_utils
+    from urllib import parse as urllib_parse
+else:
+    # Imported by the first request served, not by the mount
+    email_utils = LazyLoader("email_utils", globals(), "email.utils")
+    urllib_parse = LazyLoader("urllib_parse", globals(), "urllib.parse")
+
+
+class _CachedFile(NamedTuple):
+    mtime_ns: int
+    size: int
+    body: bytes
+    headers: Dict[str, str]
+
+
+class StaticFiles:
+    """
+    Serves the files of a directory. The files up to ``max_cached_file_size`` bytes are kept in a LRU cache of at most
+    ``cache_max_bytes`` bytes and ``cache_max_files`` files, invalidated when their mtime or size change. The bigger
+    ones are sent with sendfile. A precompressed ``<file>.gz`` sibling is sent to the clients accepting gzip.
+    """
+
+    directory: str
+    max_cached_file_size: int
+    _cache: LRUCache[str, _CachedFile]
+
+    def __init__(
+        self,
+        directory: str,
+        cache_max_bytes: int = 32 * 1024 * 1024,
+        max_cached_file_size: int = 256 * 1024,
+        cache_max_files: int = 10_000,
+    ) -> None:
+        self.directory = os.path.abspath(directory)
+        if not os.path.isdir(self.directory):
+            raise NanoHttpyError(f"Static directory '{directory}' does not exist")
+        self.max_cached_file_size = max_cached_file_size
+        self._cache = LRUCache(
+            cache_max_files, max_bytes=cache_max_bytes, sizeof=lambda f: len(f.body)
+        )
+
+    def cache_info(self) -> CacheInfo:
+        return self._cache.info()
+
+    def serve(self, req: Request, rel_path: str) -> Response:
+        """Response for the file at ``rel_path`` (URL-encoded, relative to the directory)"""
+        if req.method not in ("GET", "HEAD"):
+            raise MethodNotAllowedError()
+        path = self._resolve(rel_path)
+        st = _stat_file(path)
+        if st is None:
+            raise NotFoundError()
+
+        extra_headers: Dict[str, str] = {}
+        gz_st = _stat_file(path + ".gz")
+        if gz_st is not None:
+            # The response depends on the Accept-Encoding of the request, for both variants
+            extra_headers["Vary"] = "Accept-Encoding"
+            if accepts_encoding(req.headers.get("Accept-Encoding"), "gzip"):
+                extra_headers["Content-Encoding"] = "gzip"
+                extra_headers["Content-Type"] = guess_media_type(path)
+                path, st = path + ".gz", gz_st
+
+        if st[1] > self.max_cached_file_size:
+            return FileResponse(path, headers=extra_headers).prepare(req)
+
+        cached = self._cache.get(path)
+        if cached is None or (cached.mtime_ns, cached.size) != st:
+            cached = self._load(path, st)
+        headers = dict(cached.headers)
+        headers.update(extra_headers)
+        if_modified_since = req.headers.get("If-Modified-Since")
+        if if_modified_since is not None and is_not_modified_since(if_modified_since, st[0] / 1e9):
+            return Response(status_code=304, headers=headers)
+        return Response(cached.body, headers=headers)
+
+    def _resolve(self, rel_path: str) -> str:
+        parts = [part for part in urllib_parse.unquote(rel_path).split("/") if part]
+        # Never outside of the directory
+        if not parts or any(part == ".." or "\0" in part or "\\" in part for part in parts):
+            raise NotFoundError()
+        return os.path.join(self.directory, *parts)
+
+    def _load(self, path: str, st: Tuple[int, int]) -> _CachedFile:
+        try:
+            with open(path, "rb") as file:
+                body = file.read()
+        except (FileNotFoundError, NotADirectoryError, IsADirectoryError) as e:
+            raise NotFoundError() from e
+        headers = {
+            "Content-Type": guess_media_type(path),
+            "Last-Modified": email_utils.formatdate(st[0] / 1e9, usegmt=True),
+        }
+        # If the file changed while being read, the size differs and it is reloaded on the next request
+        cached = _CachedFile(st[0], len(body), body, headers)
+        self._cache.put(path, cached)
+        return cached
+
+
+def _stat_file(path: str) -> Optional[Tuple[int, int]]:
+    """(mtime in ns, size) of a regular file, None if it doesn't exist"""
+    try:
+        st = os.stat(path)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    if not stat.S_ISREG(st.st_mode):
+        return None
+    return st.st_mtime_ns, st.st_size
+
@@ -0,0 +1,121 @@
+"""
+Serialization of the responses, shared by the engines: status line, headers and body in a single buffer (or a list of
+buffers for ``writelines``), so that a response is sent with one write.
+"""
+from email.utils import formatdate
+from http import HTTPStatus
+import time
+from typing import Dict, List, Optional, Tuple
+
+from nanohttpy.responses import Response
+
+_HTTP_HEADER_ENCODING = "iso-8859-1"
+
+_STATUS_LINES: Dict[Tuple[str, int], bytes] = {}
+_CONNECTION_HEADERS: Dict[Optional[str], bytes] = {
+    None: b"",
+    "close": b"Connection: close\r\n",
+    "keep-alive": b"Connection: keep-alive\r\n",
+}
+
+_CHUNKED_HEADER = b"Transfer-Encoding: chunked\r\n"
+LAST_CHUNK = b"0\r\n\r\n"
+
+# (second, header line), refreshed at most once per second
+_date_header: Tuple[int, bytes] = (0, b"")
+
+
+def status_line(version: str, status_code: int) -> bytes:
+    """``HTTP/1.1 200 OK\\r\\n``, cached per version and status code"""
+    try:
+        return _STATUS_LINES[(version, status_code)]
+    except KeyError:
+        pass
+    try:
+        reason = HTTPStatus(status_code).phrase
+    except ValueError:
+        reason = ""
+    line = f"{version} {status_code} {reason}\r\n".encode(_HTTP_HEADER_ENCODING)
+    _STATUS_LINES[(version, status_code)] = line
+    return line
+
+
+def date_header() -> bytes:
+    """``Date: ...\\r\\n`` header line, formatted at most once per second"""
+    global _date_header  # pylint: disable=global-statement
+    now = int(time.time())
+    if _date_header[0] != now:
+        _date_header = (
+            now,
+            f"Date: {formatdate(now, usegmt=True)}\r\n".encode(_HTTP_HEADER_ENCODING),
+        )
+    return _date_header[1]
+
+
+def response_connection(response: Response) -> Optional[str]:
+    """Value of the Connection header set by the handler, if any, lowercase. The name is matched case-insensitively"""
+    for name, value in response.headers.items():
+        if name.lower() == "connection":
+            return value.lower()
+    return None
+
+
+def serialize_head(
+    response: Response,
+    version: str = "HTTP/1.1",
+    connection: Optional[str] = None,
+    chunked: bool = False,
+) -> bytes:
+    """
+    Status line and headers, up to the empty line.
+    ``connection`` is the value of the Connection header to add ("close" or "keep-alive"), if the response doesn't
+    already set it. ``chunked`` adds ``Transfer-Encoding: chunked``, the body then being sent with ``encode_chunk``.
+    The headers are not checked again: the application validates the responses of the handlers once, with
+    ``check_response_headers``, and answers with a 500 if one would break the framing of the response.
+    """
+    headers = response.headers
+    if connection is not None and response_connection(response) is not None:
+        connection = None
+    return b"".join(
+        (
+            status_line(version, response.status_code),
+            date_header(),
+            "".join(f"{k}: {v}\r\n" for k, v in headers.items()).encode(
+                _HTTP_HEADER_ENCODING
+            ),
+            _CONNECTION_HEADERS[connection],
+            _CHUNKED_HEADER if chunked else b"",
+            b"\r\n",
+        )
+    )
+
+
+def encode_chunk(data: bytes) -> bytes:
+    """A chunk of a ``Transfer-Encoding: chunked`` body. ``data`` must not be empty, and the body ends with LAST_CHUNK"""
+    return b"%x\r\n%b\r\n" % (len(data), data)
+
+
+def serialize_response_parts(
+    response: Response,
+    version: str = "HTTP/1.1",
+    connection: Optional[str] = None,
+    include_body: bool = True,
+) -> List[bytes]:
+    """Head and body, for ``writelines``. The body is never copied"""
+    head = serialize_head(response, version, connection)
+    if include_body and response.encoded_body:
+        return [head, response.encoded_body]
+    return [head]
+
+
+def serialize_response(
+    response: Response,
+    version: str = "HTTP/1.1",
+    connection: Optional[str] = None,
+    include_body: bool = True,
+) -> bytes:
+    """The whole response in a single buffer. ``include_body`` is False for the responses to HEAD requests"""
+    head = serialize_head(response, version, connection)
+    if include_body and response.encoded_body:
+        return head + response.encoded_body
+    return head
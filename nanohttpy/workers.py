@@ -0,0 +1,187 @@
+import gc
+import os
+import signal
+import socket
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from nanohttpy.exceptions import NanoHttpyError
+from nanohttpy.logging import flush_logs, logger
+
+# A worker dying faster than that after its start is considered as crash-looping, and is restarted with a delay
+_MIN_WORKER_LIFETIME = 1.0
+
+
+def create_server_socket(
+    server_address: Tuple[str, int], reuse_port: bool = False, backlog: int = 1024
+) -> socket.socket:
+    """Create a listening TCP socket, that can be shared by several processes"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if reuse_port:
+            if not hasattr(socket, "SO_REUSEPORT"):
+                raise NanoHttpyError("SO_REUSEPORT is not supported on this platform")
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind(server_address)
+        sock.listen(backlog)
+    except BaseException:
+        sock.close()
+        raise
+    return sock
+
+
+def _raise_system_exit(signum: int, frame: Any) -> None:  # pylint: disable=unused-argument
+    raise SystemExit(0)
+
+
+class Supervisor:
+    """
+    Pre-fork process manager: forks ``workers`` processes running ``worker_main``, restarts the ones that die, and
+    stops them on SIGTERM/SIGINT.
+    """
+
+    worker_main: Callable[[], None]
+    workers: int
+    shutdown_timeout: float
+    _children: Dict[int, float]  # pid -> start time
+    _stopping: bool
+
+    def __init__(
+        self,
+        worker_main: Callable[[], None],
+        workers: int,
+        shutdown_timeout: float = 10.0,
+    ) -> None:
+        self.worker_main = worker_main
+        self.workers = workers
+        self.shutdown_timeout = shutdown_timeout
+        self._children = {}
+        self._stopping = False
+
+    def run(self) -> None:
+        previous_handlers = {
+            sig: signal.signal(sig, self._on_stop_signal)
+            for sig in (signal.SIGTERM, signal.SIGINT)
+        }
+        # Move everything allocated so far (routes, handlers, modules...) out of the GC tracking, so that collections
+        # in the workers don't write into these pages and they stay shared copy-on-write with the parent
+        gc.freeze()
+        try:
+            for _ in range(self.workers):
+                self._spawn()
+            self._supervise()
+        finally:
+            self._stop_children()
+            for sig, handler in previous_handlers.items():
+                signal.signal(sig, handler)
+            gc.unfreeze()
+
+    def _spawn(self) -> None:
+        pid = os.fork()
+        if pid == 0:
+            self._run_worker()
+        self._children[pid] = time.monotonic()
+        logger.info("Started worker process %d", pid)
+
+    def _run_worker(self) -> None:
+        # Only the parent handles the Ctrl+C, the workers are stopped through SIGTERM
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, _raise_system_exit)
+        code = 0
+        try:
+            self.worker_main()
+        except SystemExit as e:
+            code = e.code if isinstance(e.code, int) else 0
+        except BaseException:  # pylint: disable=broad-except
+            logger.exception("Worker process %d crashed", os.getpid())
+            code = 1
+        finally:
+            # Never return in the parent's code. os._exit skips atexit, so the queued logs are written first
+            flush_logs()
+            os._exit(code)  # pylint: disable=protected-access
+
+    def _supervise(self) -> None:
+        while not self._stopping:
+            try:
+                pid, status = os.waitpid(-1, 0)
+            except ChildProcessError:
+                return
+            started = self._children.pop(pid, None)
+            if started is None or self._stopping:
+                continue
+            logger.error(
+                "Worker process %d exited unexpectedly (%s), restarting it",
+                pid,
+                _describe_status(status),
+            )
+            if time.monotonic() - started < _MIN_WORKER_LIFETIME:
+                time.sleep(_MIN_WORKER_LIFETIME)
+            if not self._stopping:
+                self._spawn()
+
+    def _on_stop_signal(self, signum: int, frame: Any) -> None:  # pylint: disable=unused-argument
+        logger.info("Received %s, stopping the workers...", signal.Signals(signum).name)
+        self._stopping = True
+        self._signal_children(signal.SIGTERM)
+
+    def _signal_children(self, sig: int) -> None:
+        for pid in self._children:
+            try:
+                os.kill(pid, sig)
+            except ProcessLookupError:
+                pass
+
+    def _stop_children(self) -> None:
+        self._signal_children(signal.SIGTERM)
+        deadline = time.monotonic() + self.shutdown_timeout
+        while self._children:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid != 0:
+                self._children.pop(pid, None)
+                continue
+            if time.monotonic() > deadline:
+                logger.warning("Workers are taking too long to stop, killing them !")
+                self._signal_children(signal.SIGKILL)
+                deadline = float("inf")
+            time.sleep(0.05)
+        self._children.clear()
+
+
+def _describe_status(status: int) -> str:
+    if os.WIFSIGNALED(status):
+        return f"killed by {signal.Signals(os.WTERMSIG(status)).name}"
+    return f"exit code {os.waitstatus_to_exitcode(status)}"
+
+
+def run_workers(
+    serve: Callable[[Optional[socket.socket]], None],
+    server_address: Tuple[str, int],
+    workers: int,
+    reuse_port: bool = False,
+) -> None:
+    """
+    Run ``serve`` in ``workers`` forked processes. By default the listening socket is bound once by the parent and
+    inherited by the workers, with ``reuse_port`` each worker binds its own socket with SO_REUSEPORT and the kernel
+    balances the connections between them.
+    """
+    if not hasattr(os, "fork"):
+        raise NanoHttpyError("Multi-process workers are not supported on this platform")
+
+    if reuse_port:
+        # Fail early if the address is not usable
+        create_server_socket(server_address, reuse_port=True).close()
+
+        def worker_main() -> None:
+            serve(create_server_socket(server_address, reuse_port=True))
+
+        Supervisor(worker_main, workers).run()
+    else:
+        sock = create_server_socket(server_address)
+        try:
+            Supervisor(lambda: serve(sock), workers).run()
+        finally:
+            sock.close()
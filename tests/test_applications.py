@@ -1,8 +1,12 @@
 # pylint: disable=invalid-name, multiple-statements, too-many-statements, use-implicit-booleaness-not-comparison, unused-argument
+import asyncio
 import inspect
+import threading
 import pytest
 
 from nanohttpy.applications import NanoHttpy
+from nanohttpy.exceptions import NanoHttpyError
+from nanohttpy.responses import Response
 from nanohttpy.http import HTTP_METHODS
 from tests.testutils import make_request
 
@@ -199,3 +203,170 @@ def test_NanoHttpy_handler_decorator_all_methods(func_name, method):
 
     req = make_request(method, f"/{func_name}")
     assert app.lookup(req)(req) == (func_name, {"req": req})
+
+
+def test_NanoHttpy_handler_decorator_stacked_with_params():
+    app = NanoHttpy(debug=True)
+
+    @app.get("/stacked/{name}")
+    @app.post("/stacked/{name}")
+    def stacked(req, name, count: int = 1):
+        return name, count
+
+    for method in ("GET", "POST"):
+        req = make_request(method, "/stacked/value1?count=3")
+        assert app.lookup(req)(req) == ("value1", 3)
+
+
+def test_NanoHttpy_handle_invalid_param():
+    app = NanoHttpy(debug=True)
+
+    @app.get("/typed/{value}")
+    def typed(req, value: int):
+        return str(value)
+
+    assert app.handle(make_request("GET", "/typed/42")).encoded_body == b"42"
+    assert app.handle(make_request("GET", "/typed/abc")).status_code == 400
+
+
+@pytest.mark.parametrize(
+    "headers",
+    [
+        {"Location": "/a\r\nSet-Cookie: evil=1"},
+        {"Location": "/a\nSet-Cookie: evil=1"},
+        {"X-Nul": "a\0b"},
+        {"Set-Cookie: evil": "1"},
+        {"X Space": "1"},
+        {"": "1"},
+        {"X-Price": "10€"},
+    ],
+)
+def test_NanoHttpy_invalid_response_header(headers):
+    app = NanoHttpy(debug=True)
+
+    @app.get("/redirect", cache_ttl=10)
+    def redirect(req):
+        return Response(status_code=302, headers=dict(headers))
+
+    # Never sent as is, which would let the value inject headers or a response
+    assert app.handle(make_request("GET", "/redirect")).status_code == 500
+    assert asyncio.run(app.handle_async(make_request("GET", "/redirect"))).status_code == 500
+    # Not cached either
+    assert app.handle(make_request("GET", "/redirect")).headers == {"Content-Length": "0"}
+
+
+@pytest.mark.parametrize("exception", [SystemExit, KeyboardInterrupt])
+def test_NanoHttpy_exit_propagates(exception):
+    app = NanoHttpy(metrics=True)
+
+    @app.get("/sync")
+    def sync_handler(req):
+        # E.g. the SIGTERM handler of a worker
+        raise exception(0)
+
+    @app.get("/async")
+    async def async_handler(req):
+        raise exception(0)
+
+    for url in ("/sync", "/async"):
+        with pytest.raises(exception):
+            app.handle(make_request("GET", url))
+        with pytest.raises(exception):
+            asyncio.run(app.handle_async(make_request("GET", url)))
+    assert app.metrics.collect()[2] == 0
+
+
+def test_NanoHttpy_async_handler():
+    app = NanoHttpy(debug=True)
+
+    @app.get("/sync/{name}")
+    def sync_handler(req, name):
+        return f"sync {name}"
+
+    @app.get("/async/{name}")
+    async def async_handler(req, name):
+        await asyncio.sleep(0)
+        return f"async {name}"
+
+    @app.get("/async-error")
+    async def async_error(req):
+        raise RuntimeError("boom")
+
+    for url, expected in [("/sync/a", b"sync a"), ("/async/b", b"async b")]:
+        # The synchronous path bridges the async handlers on a dedicated loop
+        assert app.handle(make_request("GET", url)).encoded_body == expected
+        assert asyncio.run(app.handle_async(make_request("GET", url))).encoded_body == expected
+
+    assert app.handle(make_request("GET", "/async-error")).status_code == 500
+    assert asyncio.run(app.handle_async(make_request("GET", "/async-error"))).status_code == 500
+    assert asyncio.run(app.handle_async(make_request("GET", "/missing"))).status_code == 404
+
+    async def handle_from_running_loop():
+        return app.handle(make_request("GET", "/async/b"))
+
+    # Blocking the running loop to run the handler is not possible
+    assert asyncio.run(handle_from_running_loop()).status_code == 500
+
+
+def test_NanoHttpy_async_handlers_run_concurrently():
+    app = NanoHttpy(debug=True)
+    in_flight = []
+
+    @app.get("/slow")
+    async def slow(req):
+        in_flight.append(req)
+        await asyncio.sleep(0.05)
+        return str(len(in_flight))
+
+    async def run():
+        return await asyncio.gather(
+            *[app.handle_async(make_request("GET", "/slow")) for _ in range(100)]
+        )
+
+    responses = asyncio.run(run())
+    # All the requests were started before the first one completed
+    assert all(r.encoded_body == b"100" for r in responses)
+
+
+def test_NanoHttpy_blocking_handler():
+    app = NanoHttpy(debug=True, executor_workers=2)
+
+    @app.get("/inline")
+    def inline(req):
+        return threading.current_thread().name
+
+    @app.get("/blocking", blocking=True)
+    def blocking(req):
+        return threading.current_thread().name
+
+    async def run(url):
+        return await app.handle_async(make_request("GET", url))
+
+    assert asyncio.run(run("/inline")).encoded_body == threading.current_thread().name.encode()
+    assert asyncio.run(run("/blocking")).encoded_body.startswith(b"nanohttpy-blocking")
+    assert app.executor_stats().completed == 1
+
+    with pytest.raises(NanoHttpyError):
+
+        @app.get("/async-blocking", blocking=True)
+        async def async_blocking(req):
+            pass
+
+    # The app default applies to the sync handlers only
+    app = NanoHttpy(debug=True, blocking=True)
+
+    @app.get("/default")
+    def default(req):
+        return threading.current_thread().name
+
+    @app.get("/opt-out", blocking=False)
+    def opt_out(req):
+        return threading.current_thread().name
+
+    @app.get("/async")
+    async def async_handler(req):
+        return threading.current_thread().name
+
+    assert asyncio.run(run("/default")).encoded_body.startswith(b"nanohttpy-blocking")
+    assert not asyncio.run(run("/opt-out")).encoded_body.startswith(b"nanohttpy-blocking")
+    assert not asyncio.run(run("/async")).encoded_body.startswith(b"nanohttpy-blocking")
@@ -0,0 +1,96 @@
+# pylint: disable=multiple-statements,invalid-name,too-many-statements,use-implicit-booleaness-not-comparison,unused-argument
+from typing import List, Optional
+import pytest
+
+from nanohttpy.binding import (
+    ParamBinding,
+    ParamSource,
+    bind_handler,
+    build_binding_plan,
+    convert_bool,
+    path_parameter_names,
+)
+from nanohttpy.exceptions import BadRequestError
+from nanohttpy.requests import Request
+from tests.testutils import assert_raises, make_request
+
+
+def test_path_parameter_names():
+    assert path_parameter_names("/") == set()
+    assert path_parameter_names("/a/b") == set()
+    assert path_parameter_names("/a/{b}/c/<d>") == {"b", "d"}
+
+
+def test_convert_bool():
+    for v in ("1", "true", "True", "yes", "on"):
+        assert convert_bool(v) is True
+    for v in ("0", "false", "FALSE", "no", "off", ""):
+        assert convert_bool(v) is False
+    assert_raises(ValueError, lambda: convert_bool("maybe"))
+
+
+def test_build_binding_plan():
+    def handler(req, name, count: int, ratio: float = 0.5, flag: Optional[bool] = None, tags: List[str] = None):
+        pass
+
+    assert build_binding_plan(handler, "/items/{name}") == [
+        ParamBinding("req", ParamSource.REQUEST),
+        ParamBinding("name", ParamSource.PATH, None, False, None),
+        ParamBinding("count", ParamSource.QUERY, int, False, None),
+        ParamBinding("ratio", ParamSource.QUERY, float, False, 0.5),
+        ParamBinding("flag", ParamSource.QUERY, convert_bool, False, None),
+        ParamBinding("tags", ParamSource.QUERY, None, True, None),
+    ]
+
+    def annotated_req(name, req: Request):
+        pass
+
+    assert build_binding_plan(annotated_req, "/") == [
+        ParamBinding("name", ParamSource.REQUEST),
+        ParamBinding("req", ParamSource.REQUEST),
+    ]
+
+    def no_param():
+        pass
+
+    assert build_binding_plan(no_param, "/") == []
+
+
+@pytest.mark.parametrize(
+    "url, path_parameters, expected",
+    [
+        ("/", {"id": "12"}, {"id": 12, "ratio": 1.0, "flag": None, "ids": None}),
+        (
+            "/?ratio=2.5&flag=yes&ids=1&ids=2",
+            {"id": "-3"},
+            {"id": -3, "ratio": 2.5, "flag": True, "ids": [1, 2]},
+        ),
+        ("/?flag=0", {}, {"id": None, "ratio": 1.0, "flag": False, "ids": None}),
+    ],
+)
+def test_bind_handler_conversion(url, path_parameters, expected):
+    def handler(req, id: int, ratio: float = 1.0, flag: bool = None, ids: List[int] = None):  # pylint: disable=redefined-builtin
+        return {"id": id, "ratio": ratio, "flag": flag, "ids": ids}
+
+    wrapper = bind_handler(handler, "/{id}")
+    assert wrapper(make_request("GET", url, path_parameters=path_parameters)) == expected
+
+
+@pytest.mark.parametrize(
+    "url, path_parameters",
+    [
+        ("/", {"id": "abc"}),
+        ("/?ratio=fast", {"id": "1"}),
+        ("/?flag=maybe", {"id": "1"}),
+        ("/?ids=1&ids=x", {"id": "1"}),
+    ],
+)
+def test_bind_handler_invalid_value(url, path_parameters):
+    def handler(req, id: int, ratio: float = 1.0, flag: bool = None, ids: List[int] = None):  # pylint: disable=redefined-builtin
+        pass
+
+    wrapper = bind_handler(handler, "/{id}")
+    assert_raises(
+        BadRequestError,
+        lambda: wrapper(make_request("GET", url, path_parameters=path_parameters)),
+    )
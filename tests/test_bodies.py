@@ -0,0 +1,128 @@
+# pylint: disable=multiple-statements,invalid-name,too-many-statements,use-implicit-booleaness-not-comparison
+import io
+import pytest
+
+from nanohttpy.bodies import BodyLimits, RequestBody, read_body
+from nanohttpy.exceptions import BadRequestError, PayloadTooLargeError
+from nanohttpy.headers import Headers
+from tests.testutils import assert_raises, make_request
+
+
+def test_RequestBody():
+    body = RequestBody(BodyLimits(max_size=100, spill_threshold=10))
+    body.write(b"12345")
+    body.write(memoryview(b"678"))
+    assert not body.spilled and body.size == 8
+    assert body.finish() == b"12345678"
+    assert list(body.iter_chunks()) == [b"12345", b"678"]
+
+    # Spilled to a temporary file above the threshold
+    body.write(b"9abcdef")
+    assert body.spilled and body.size == 15
+    assert body.finish() is body
+    assert body.read() == b"123456789abcdef"
+    assert list(body.iter_chunks(chunk_size=4)) == [b"1234", b"5678", b"9abc", b"def"]
+
+    assert_raises(PayloadTooLargeError, lambda: body.write(b"x" * 86))
+    body.close()
+
+
+def test_RequestBody_no_limit():
+    body = RequestBody(BodyLimits(max_size=None, spill_threshold=1 << 20))
+    body.write(b"x" * 100_000)
+    assert body.finish() == b"x" * 100_000
+
+
+LIMITS = BodyLimits(max_size=100, spill_threshold=10)
+
+
+@pytest.mark.parametrize(
+    "headers, data, expected",
+    [
+        ({}, b"ignored", b""),
+        ({"Content-Length": "0"}, b"", b""),
+        ({"Content-Length": "5"}, b"12345next request", b"12345"),
+        ({"content-length": "5"}, b"12345", b"12345"),
+        ([(b"Content-Length", b"5"), (b"content-length", b"5")], b"12345", b"12345"),
+        ({"Content-Length": "15"}, b"123456789abcdef", b"123456789abcdef"),
+        ({"Transfer-Encoding": "chunked"}, b"5\r\n12345\r\n3;ext=1\r\n678\r\n0\r\n\r\n", b"12345678"),
+        ({"Transfer-Encoding": "chunked"}, b"A\r\n0123456789\r\n5\r\nabcde\r\n0\r\nTrailer: 1\r\n\r\n", b"0123456789abcde"),
+        ({"Transfer-Encoding": "Chunked"}, b"0\r\n\r\n", b""),
+    ],
+)
+def test_read_body(headers, data, expected):
+    rfile = io.BytesIO(data)
+    body = read_body(rfile, Headers(headers), LIMITS)
+    assert (body if isinstance(body, bytes) else body.read()) == expected
+
+
+@pytest.mark.parametrize(
+    "headers, data",
+    [
+        ({"Content-Length": "5"}, b"12345"),
+        ({"Content-Length": "15"}, b"123456789abcdef"),
+        ({"Transfer-Encoding": "chunked"}, b"5\r\n12345\r\n0\r\nTrailer: 1\r\n\r\n"),
+    ],
+)
+def test_read_body_framing(headers, data):
+    # Nothing of the next request is consumed
+    rfile = io.BytesIO(data + b"GET / HTTP/1.1\r\n")
+    read_body(rfile, Headers(headers), LIMITS)
+    assert rfile.read() == b"GET / HTTP/1.1\r\n"
+
+
+@pytest.mark.parametrize(
+    "headers, data, exception",
+    [
+        ({"Content-Length": "abc"}, b"", BadRequestError),
+        ({"Content-Length": "-1"}, b"", BadRequestError),
+        ({"Content-Length": "+5"}, b"12345", BadRequestError),
+        ({"Content-Length": "1_0"}, b"x" * 10, BadRequestError),
+        ({"Content-Length": " 5"}, b"12345", BadRequestError),
+        ({"Content-Length": "5 "}, b"12345", BadRequestError),
+        ({"Content-Length": "0x5"}, b"12345", BadRequestError),
+        ({"Content-Length": ""}, b"", BadRequestError),
+        ([(b"Content-Length", b"5"), (b"Content-Length", b"6")], b"123456", BadRequestError),
+        ([(b"Content-Length", b"5"), (b"content-length", b"05")], b"12345", BadRequestError),
+        ({"Content-Length": "10"}, b"12345", BadRequestError),
+        ({"Content-Length": "20"}, b"12345", BadRequestError),
+        ({"Content-Length": "101"}, b"", PayloadTooLargeError),
+        ({"Transfer-Encoding": "gzip"}, b"", BadRequestError),
+        ({"Transfer-Encoding": "chunked"}, b"zz\r\n", BadRequestError),
+        ({"Transfer-Encoding": "chunked"}, b"0x10\r\n" + b"x" * 16 + b"\r\n0\r\n\r\n", BadRequestError),
+        ({"Transfer-Encoding": "chunked"}, b"+a\r\n" + b"x" * 16 + b"\r\n0\r\n\r\n", BadRequestError),
+        ({"Transfer-Encoding": "chunked"}, b"-0\r\n" + b"x" * 16 + b"\r\n0\r\n\r\n", BadRequestError),
+        ({"Transfer-Encoding": "chunked"}, b"1_0\r\n" + b"x" * 16 + b"\r\n0\r\n\r\n", BadRequestError),
+        ({"Transfer-Encoding": "chunked"}, b"\r\n" + b"x" * 16 + b"\r\n0\r\n\r\n", BadRequestError),
+        ({"Transfer-Encoding": "chunked"}, b"5\r\n12", BadRequestError),
+        ({"Transfer-Encoding": "chunked"}, b"5\r\n12345XX0\r\n\r\n", BadRequestError),
+        ({"Transfer-Encoding": "chunked"}, b"40\r\n" + b"x" * 64 + b"\r\n40\r\n" + b"x" * 64 + b"\r\n0\r\n\r\n",
+         PayloadTooLargeError),
+    ],
+)
+def test_read_body_errors(headers, data, exception):
+    assert_raises(exception, lambda: read_body(io.BytesIO(data), Headers(headers), LIMITS))
+
+
+def test_read_body_continue():
+    sent = []
+    send_continue = lambda: sent.append(True)
+    assert read_body(io.BytesIO(b"12345"), Headers({"Content-Length": "5"}), LIMITS, send_continue) == b"12345"
+    assert sent == [True]
+    # Not sent when the body won't be read
+    assert_raises(PayloadTooLargeError, lambda: read_body(io.BytesIO(), Headers({"Content-Length": "500"}), LIMITS, send_continue))
+    assert read_body(io.BytesIO(), Headers(), LIMITS, send_continue) == b""
+    assert sent == [True]
+
+
+def test_Request_stream():
+    req = make_request("POST", "/", body=b"12345")
+    assert list(req.stream()) == [b"12345"]
+    assert list(make_request("POST", "/").stream()) == []
+
+    body = RequestBody(LIMITS)
+    body.write(b"123456789abcdef")
+    req = make_request("POST", "/", body=body.finish())
+    assert req.body == b"123456789abcdef"
+    assert list(req.stream(chunk_size=8)) == [b"12345678", b"9abcdef"]
+    assert req.text == "123456789abcdef"
@@ -0,0 +1,44 @@
+# pylint: disable=multiple-statements,invalid-name,too-many-statements,use-implicit-booleaness-not-comparison
+from nanohttpy.caching import CacheInfo, LRUCache
+
+
+def test_LRUCache():
+    cache = LRUCache(2)
+    assert cache.get("a") is None
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    # "b" is the least recently used
+    cache.put("c", 3)
+    assert "b" not in cache
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.info() == CacheInfo(hits=3, misses=1, evictions=1, maxsize=2, currsize=2, currbytes=0)
+
+    cache.put("c", 4)
+    assert cache.get("c") == 4 and len(cache) == 2
+    assert cache.pop("c") == 4 and cache.pop("c") is None
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_LRUCache_max_bytes():
+    cache = LRUCache(10, max_bytes=10)
+    cache.put("a", b"1234")
+    cache.put("b", b"1234")
+    assert cache.info().currbytes == 8
+    # Evicts "a" to make room
+    cache.put("c", b"1234")
+    assert "a" not in cache and cache.info().currbytes == 8
+    # Replacing a value updates the size
+    cache.put("b", b"12")
+    assert cache.info().currbytes == 6
+    # Too big to be cached at all
+    cache.put("d", b"12345678901")
+    assert "d" not in cache and len(cache) == 2
+    assert cache.pop("b") == b"12" and cache.info().currbytes == 4
+
+
+def test_LRUCache_disabled():
+    cache = LRUCache(0)
+    cache.put("a", 1)
+    assert cache.get("a") is None
@@ -0,0 +1,238 @@
+# pylint: disable=multiple-statements,invalid-name,too-many-statements,use-implicit-booleaness-not-comparison,redefined-outer-name
+import asyncio
+import gzip
+import os
+import zlib
+import pytest
+
+from nanohttpy import NanoHttpy
+from nanohttpy.compression import Compression
+from nanohttpy.exceptions import NanoHttpyError
+from nanohttpy.responses import FileResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
+from tests.testutils import assert_raises, make_request
+
+BODY = {"items": [{"id": i, "name": "item"} for i in range(100)]}
+
+
+def compress(res: Response, accept_encoding=None, compression=None) -> Response:
+    headers = {"Accept-Encoding": accept_encoding} if accept_encoding is not None else {}
+    return (compression or Compression()).compress_response(make_request("GET", "/", headers=headers), res)
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        ("gzip", "gzip"),
+        ("deflate, gzip;q=0.5", "gzip"),
+        ("deflate", "deflate"),
+        ("gzip;q=0, deflate", "deflate"),
+        ("*", "gzip"),
+        ("*;q=0.1, gzip;q=0", "deflate"),
+        ("*;q=0.1, gzip;q=0, deflate;q=0", None),
+        ("deflate;q=0.5, *;q=0", "deflate"),
+        ("*;q=0, gzip", "gzip"),
+        ("GZIP;q=0, *", "deflate"),
+        ("br", None),
+        ("identity", None),
+        ("", None),
+        (None, None),
+    ],
+)
+def test_Compression_negotiate(accept_encoding, expected):
+    assert Compression().negotiate(accept_encoding) == expected
+
+
+def test_Compression_negotiate_encodings():
+    assert Compression(encodings=["deflate"]).negotiate("gzip, deflate") == "deflate"
+    assert_raises(NanoHttpyError, lambda: Compression(encodings=["br"]))
+
+
+@pytest.mark.parametrize(
+    "content_type, expected",
+    [
+        ("application/json", True),
+        ("text/html; charset=UTF-8", True),
+        ("TEXT/CSV", True),
+        ("image/svg+xml", True),
+        ("image/png", False),
+        ("application/octet-stream", False),
+        (None, False),
+    ],
+)
+def test_Compression_is_compressible(content_type, expected):
+    assert Compression().is_compressible(content_type) == expected
+
+
+def test_Compression_gzip():
+    res = JSONResponse(BODY)
+    compressed = compress(res, "gzip")
+    assert compressed is not res
+    assert gzip.decompress(compressed.encoded_body) == res.encoded_body
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert compressed.headers["Content-Length"] == str(len(compressed.encoded_body))
+    assert compressed.headers["Content-Type"] == "application/json; charset=UTF-8"
+    assert compressed.headers["Vary"] == "Accept-Encoding"
+    # The original response is untouched, it may be returned again by the handler
+    assert "Content-Encoding" not in res.headers and "Vary" not in res.headers
+
+
+def test_Compression_deflate():
+    res = JSONResponse(BODY)
+    compressed = compress(res, "deflate")
+    assert zlib.decompress(compressed.encoded_body) == res.encoded_body
+    assert compressed.headers["Content-Encoding"] == "deflate"
+
+
+def test_Compression_not_accepted():
+    res = JSONResponse(BODY)
+    uncompressed = compress(res)
+    assert uncompressed.encoded_body == res.encoded_body
+    assert "Content-Encoding" not in uncompressed.headers
+    # Cached responses must not be served to clients accepting gzip
+    assert uncompressed.headers["Vary"] == "Accept-Encoding"
+
+
+@pytest.mark.parametrize(
+    "res",
+    [
+        # Too small
+        JSONResponse({"a": 1}),
+        # Not compressible
+        Response(b"x" * 2000, headers={"Content-Type": "image/png"}),
+        Response(b"x" * 2000),
+        # Already compressed
+        Response(b"x" * 2000, headers={"Content-Type": "text/plain", "Content-Encoding": "br"}),
+        Response(b"x" * 2000, headers={"Content-Type": "text/plain", "Cache-Control": "no-transform"}),
+        # In any case
+        Response(b"x" * 2000, headers={"content-type": "text/plain", "content-encoding": "br"}),
+        Response(b"x" * 2000, headers={"content-type": "text/plain", "cache-control": "No-Transform"}),
+        Response(b"x" * 2000, headers={"content-type": "image/png"}),
+        # No body
+        Response(status_code=204),
+        Response(status_code=304, headers={"Content-Type": "text/plain"}),
+    ],
+)
+def test_Compression_skipped(res):
+    assert compress(res, "gzip") is res
+
+
+def test_Compression_skipped_file(tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_text("a" * 2000)
+    res = FileResponse(path)
+    assert compress(res, "gzip") is res
+
+
+def test_Compression_incompressible():
+    res = PlainTextResponse(os.urandom(2000))
+    compressed = compress(res, "gzip")
+    assert compressed.encoded_body == res.encoded_body
+    assert "Content-Encoding" not in compressed.headers
+    assert compressed.headers["Vary"] == "Accept-Encoding"
+
+
+@pytest.mark.parametrize(
+    "vary, expected",
+    [
+        ("Cookie", "Cookie, Accept-Encoding"),
+        ("accept-encoding", "accept-encoding"),
+        ("*", "*"),
+    ],
+)
+def test_Compression_vary(vary, expected):
+    res = PlainTextResponse("a" * 2000, headers={"Vary": vary})
+    assert compress(res, "gzip").headers["Vary"] == expected
+
+
+def test_Compression_lowercase_headers():
+    res = Response(b"a" * 2000, headers={"content-type": "text/plain", "vary": "Cookie", "etag": '"1"'})
+    compressed = compress(res, "gzip")
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(compressed.encoded_body) == res.encoded_body
+    # Merged, not sent twice
+    assert [name for name in compressed.headers if name.lower() == "vary"] == ["Vary"]
+    assert compressed.headers["Vary"] == "Cookie, Accept-Encoding"
+    assert compressed.headers["etag"] == 'W/"1"'
+
+
+def test_Compression_cache():
+    compression = Compression()
+    res = JSONResponse(BODY)
+    first = compress(res, "gzip", compression)
+    second = compress(res, "gzip", compression)
+    assert first.encoded_body is second.encoded_body
+    compress(res, "deflate", compression)
+    info = compression.cache_info()
+    assert (info.hits, info.misses, info.currsize) == (1, 2, 2)
+
+    # Disabled
+    compression = Compression(cache_size=0)
+    compress(res, "gzip", compression)
+    assert compression.cache_info().currsize == 0
+
+
+def test_Compression_streaming():
+    res = StreamingResponse(iter(["line\n"] * 100), headers={"Content-Type": "text/plain"})
+    compressed = compress(res, "gzip")
+    assert isinstance(compressed, StreamingResponse)
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert compressed.headers["Vary"] == "Accept-Encoding"
+    chunks = list(compressed.iter_sync())
+    # Compressed chunk by chunk
+    assert len(chunks) > 1
+    assert gzip.decompress(b"".join(chunks)) == b"line\n" * 100
+
+
+def test_Compression_streaming_async():
+    async def agen():
+        for _ in range(10):
+            yield "line\n"
+
+    async def collect(res):
+        return [chunk async for chunk in res.iter_async()]
+
+    compressed = compress(StreamingResponse(agen(), headers={"Content-Type": "text/plain"}), "deflate")
+    assert zlib.decompress(b"".join(asyncio.run(collect(compressed)))) == b"line\n" * 10
+
+
+def test_Compression_streaming_close():
+    closed = []
+
+    def gen():
+        try:
+            yield "a"
+            yield "b"
+        finally:
+            closed.append(True)
+
+    compressed = compress(StreamingResponse(gen(), headers={"Content-Type": "text/plain"}), "gzip")
+    next(compressed.iter_sync())
+    compressed.close()
+    assert closed == [True]
+
+
+def test_Compression_streaming_not_accepted():
+    res = StreamingResponse(iter(["a", "b"]), headers={"Content-Type": "text/plain"})
+    uncompressed = compress(res)
+    assert list(uncompressed.iter_sync()) == [b"a", b"b"]
+    assert "Content-Encoding" not in uncompressed.headers
+    assert uncompressed.headers["Vary"] == "Accept-Encoding"
+
+
+def test_NanoHttpy_compression():
+    app = NanoHttpy(compression=True)
+
+    @app.get("/items")
+    def items(req):
+        return BODY
+
+    res = app.handle(make_request("GET", "/items", headers={"Accept-Encoding": "gzip"}))
+    assert res.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(res.encoded_body) == JSONResponse(BODY).encoded_body
+
+    res = asyncio.run(app.handle_async(make_request("GET", "/items", headers={"accept-encoding": "gzip"})))
+    assert res.headers["Content-Encoding"] == "gzip"
+
+    assert NanoHttpy().compression is None
+    compression = Compression(min_size=0)
+    assert NanoHttpy(compression=compression).compression is compression
@@ -0,0 +1,51 @@
+# pylint: disable=multiple-statements,invalid-name,too-many-statements,use-implicit-booleaness-not-comparison
+import asyncio
+import threading
+
+from nanohttpy.concurrency import BlockingExecutor, ExecutorStats, run_coroutine_sync
+from nanohttpy.exceptions import NanoHttpyError
+from tests.testutils import assert_raises
+
+
+def test_run_coroutine_sync():
+    async def double(x):
+        await asyncio.sleep(0)
+        return 2 * x
+
+    assert run_coroutine_sync(double(1)) == 2
+    # The loop of the thread is reused
+    assert run_coroutine_sync(double(2)) == 4
+
+    async def nested():
+        return run_coroutine_sync(double(3))
+
+    assert_raises(NanoHttpyError, lambda: asyncio.run(nested()))
+
+
+def test_BlockingExecutor():
+    executor = BlockingExecutor(2)
+    assert executor.stats() == ExecutorStats(2, 0, 0, 0)
+
+    release = threading.Event()
+    started = threading.Semaphore(0)
+
+    def blocking(i):
+        started.release()
+        release.wait()
+        return (i, threading.current_thread().name)
+
+    async def run():
+        futures = [executor.run(blocking, i) for i in range(5)]
+        # Wait for the pool to be saturated
+        for _ in range(2):
+            await asyncio.get_running_loop().run_in_executor(None, started.acquire)
+        stats = executor.stats()
+        release.set()
+        return stats, await asyncio.gather(*futures)
+
+    stats, results = asyncio.run(run())
+    assert stats == ExecutorStats(2, 3, 2, 0)
+    assert [i for i, _ in results] == list(range(5))
+    assert all(name.startswith("nanohttpy-blocking") for _, name in results)
+    assert executor.stats() == ExecutorStats(2, 0, 0, 5)
+    executor.shutdown()
@@ -0,0 +1,460 @@
+# pylint: disable=multiple-statements,invalid-name,too-many-statements,use-implicit-booleaness-not-comparison,unused-argument,redefined-outer-name
+import http.client
+import json
+import pathlib
+import socket
+import threading
+import time
+from typing import Iterator, Optional, Tuple
+import pytest
+
+from nanohttpy.applications import NanoHttpy
+from nanohttpy.engines.python import PythonEngine, ThreadedPythonEngine
+from nanohttpy.metrics import PHASES, Metrics
+from nanohttpy.responses import NDJSONResponse, Response
+from nanohttpy.workers import create_server_socket
+
+
+FILE_CONTENT = bytes(range(256)) * 4096
+
+
+def make_app(tmp_dir: Optional[pathlib.Path] = None) -> NanoHttpy:
+    app = NanoHttpy(
+        max_body_size=1_000_000, body_spill_threshold=1000, metrics=Metrics(phases=PHASES), metrics_path="/metrics"
+    )
+
+    if tmp_dir is not None:
+        (tmp_dir / "data.bin").write_bytes(FILE_CONTENT)
+
+        @app.route("/file", methods=["GET", "HEAD"])
+        def file(req):
+            return tmp_dir / "data.bin"
+
+    @app.get("/hello/{name}")
+    def hello(req, name):
+        return {"message": f"Hello {name}!"}
+
+    @app.route("/echo", methods=["GET", "HEAD", "POST"])
+    def echo(req):
+        return req.body or b"empty"
+
+    @app.post("/upload")
+    def upload(req):
+        return {"size": sum(len(chunk) for chunk in req.stream()), "head": req.body[:5].decode()}
+
+    @app.route("/stream", methods=["GET", "HEAD"])
+    def stream(req):
+        for i in range(3):
+            yield f"line {i}\n"
+
+    @app.get("/bye")
+    def bye(req):
+        return Response(b"bye", headers={"connection": "close"})
+
+    @app.get("/astream")
+    async def astream(req):
+        return NDJSONResponse(agen())
+
+    async def agen():
+        for i in range(3):
+            yield {"i": i}
+
+    return app
+
+
+def start_engine(engine_cls, app: NanoHttpy, **kwargs) -> Tuple[int, threading.Thread]:
+    sock = create_server_socket(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    ready = threading.Event()
+    holder = {}
+
+    def serve():
+        holder["engine"] = engine = engine_cls(("127.0.0.1", port), app, sock=sock, **kwargs)
+        ready.set()
+        try:
+            engine.serve_forever()
+        except Exception:  # pylint: disable=broad-except
+            pass
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    ready.wait()
+    return port, holder["engine"]
+
+
+@pytest.fixture
+def threaded_engine(tmp_path) -> Iterator[int]:
+    port, engine = start_engine(ThreadedPythonEngine, make_app(tmp_path), max_connections=4, keep_alive_timeout=2)
+    yield port
+    engine.shutdown()
+
+
+def read_until_closed(s: socket.socket) -> bytes:
+    """Everything the server sends until it closes the connection"""
+    data = b""
+    while True:
+        chunk = s.recv(65536)
+        if not chunk:
+            return data
+        data += chunk
+
+
+def raw_exchange(port: int, payload: bytes) -> bytes:
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as s:
+        s.sendall(payload)
+        s.shutdown(socket.SHUT_WR)
+        return read_until_closed(s)
+
+
+def test_PythonEngine():
+    port, engine = start_engine(PythonEngine, make_app())
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        conn.request("GET", "/hello/you")
+        res = conn.getresponse()
+        assert res.status == 200
+        assert res.read() == b'{"message":"Hello you!"}'
+        # HTTP/1.0 engine, the connection is closed after each response
+        assert res.will_close
+    finally:
+        engine.shutdown()
+
+
+def test_ThreadedPythonEngine_keep_alive(threaded_engine):
+    conn = http.client.HTTPConnection("127.0.0.1", threaded_engine, timeout=5)
+    for name in ("a", "b", "c"):
+        conn.request("GET", f"/hello/{name}")
+        res = conn.getresponse()
+        assert res.status == 200
+        assert not res.will_close
+        assert res.read() == f'{{"message":"Hello {name}!"}}'.encode()
+        sock = conn.sock
+    # The same connection was used for every request
+    assert conn.sock is sock
+
+    conn.request("HEAD", "/echo")
+    res = conn.getresponse()
+    assert res.status == 200
+    assert res.getheader("Content-Length") == "5"
+    assert res.read() == b""
+
+    conn.request("POST", "/echo", body=b"payload")
+    assert conn.getresponse().read() == b"payload"
+    conn.close()
+
+
+def test_ThreadedPythonEngine_connection_close(threaded_engine):
+    data = raw_exchange(
+        threaded_engine,
+        b"GET /hello/a HTTP/1.1\r\nHost: x\r\n\r\n"
+        b"GET /hello/b HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n"
+        b"GET /hello/c HTTP/1.1\r\nHost: x\r\n\r\n",
+    )
+    assert data.count(b"HTTP/1.1 200 OK") == 2
+    assert b"Hello a!" in data and b"Hello b!" in data and b"Hello c!" not in data
+
+    # HTTP/1.0 closes by default
+    data = raw_exchange(
+        threaded_engine,
+        b"GET /hello/a HTTP/1.0\r\n\r\nGET /hello/b HTTP/1.0\r\n\r\n",
+    )
+    assert b"Hello a!" in data and b"Hello b!" not in data
+
+
+def test_ThreadedPythonEngine_max_connections(threaded_engine):
+    # Saturate the connection slots with idle keep-alive connections
+    conns = []
+    for _ in range(4):
+        conn = http.client.HTTPConnection("127.0.0.1", threaded_engine, timeout=5)
+        conn.request("GET", "/hello/idle")
+        conn.getresponse().read()
+        conns.append(conn)
+
+    # The next connection is only served once an idle one is released
+    blocked = http.client.HTTPConnection("127.0.0.1", threaded_engine, timeout=0.5)
+    blocked.request("GET", "/hello/blocked")
+    with pytest.raises(socket.timeout):
+        blocked.getresponse()
+    blocked.close()
+
+    conns[0].close()
+    conn = http.client.HTTPConnection("127.0.0.1", threaded_engine, timeout=5)
+    conn.request("GET", "/hello/next")
+    assert conn.getresponse().status == 200
+    for c in conns[1:] + [conn]:
+        c.close()
+
+
+def check_streaming(port: int):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    conn.request("GET", "/stream")
+    res = conn.getresponse()
+    assert res.getheader("Transfer-Encoding") == "chunked" and res.getheader("Content-Length") is None
+    assert res.read() == b"line 0\nline 1\nline 2\n"
+    # The connection is still usable after a chunked body
+    conn.request("GET", "/astream")
+    res = conn.getresponse()
+    assert res.getheader("Content-Type") == "application/x-ndjson; charset=UTF-8"
+    assert res.read() == b'{"i":0}\n{"i":1}\n{"i":2}\n'
+    conn.request("HEAD", "/stream")
+    res = conn.getresponse()
+    assert res.getheader("Transfer-Encoding") == "chunked" and res.read() == b""
+    conn.request("GET", "/hello/a")
+    assert conn.getresponse().read() == b'{"message":"Hello a!"}'
+    conn.close()
+
+    # HTTP/1.0 clients don't know chunked encoding: raw body until the connection is closed
+    data = raw_exchange(port, b"GET /stream HTTP/1.0\r\nConnection: keep-alive\r\n\r\nGET /hello/a HTTP/1.0\r\n\r\n")
+    assert b"Transfer-Encoding" not in data and b"Connection: close" in data
+    assert data.endswith(b"\r\n\r\nline 0\nline 1\nline 2\n")
+
+    # Raw chunked framing
+    data = raw_exchange(port, b"GET /stream HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n")
+    assert data.endswith(b"\r\n\r\n7\r\nline 0\n\r\n7\r\nline 1\n\r\n7\r\nline 2\n\r\n0\r\n\r\n")
+
+
+def check_file(port: int):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    conn.request("GET", "/file")
+    res = conn.getresponse()
+    assert res.status == 200 and res.getheader("Content-Type") == "application/octet-stream"
+    assert res.read() == FILE_CONTENT
+    last_modified = res.getheader("Last-Modified")
+
+    conn.request("GET", "/file", headers={"Range": "bytes=1000-1999"})
+    res = conn.getresponse()
+    assert res.status == 206 and res.getheader("Content-Range") == f"bytes 1000-1999/{len(FILE_CONTENT)}"
+    assert res.read() == FILE_CONTENT[1000:2000]
+
+    conn.request("GET", "/file", headers={"Range": "bytes=999999999-"})
+    res = conn.getresponse()
+    assert res.status == 416 and res.read() == b""
+
+    conn.request("GET", "/file", headers={"If-Modified-Since": last_modified})
+    res = conn.getresponse()
+    assert res.status == 304 and res.read() == b""
+
+    conn.request("HEAD", "/file")
+    res = conn.getresponse()
+    assert res.getheader("Content-Length") == str(len(FILE_CONTENT)) and res.read() == b""
+
+    # The connection is still in sync
+    conn.request("GET", "/hello/a")
+    assert conn.getresponse().read() == b'{"message":"Hello a!"}'
+    conn.close()
+
+
+def check_upload(port: int):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    # Small, spilled to a temporary file, and chunked
+    for body, encode_chunked in ((b"hello", False), (b"x" * 500_000, False), (iter([b"hello", b" ", b"world"]), True)):
+        conn.request("POST", "/upload", body=body, encode_chunked=encode_chunked)
+        res = conn.getresponse()
+        size = 500_000 if isinstance(body, bytes) and len(body) > 5 else (5 if body == b"hello" else 11)
+        assert res.status == 200
+        assert json.loads(res.read()) == {"size": size, "head": "hello" if size != 500_000 else "xxxxx"}
+    # GET without body, the connection stays in sync
+    conn.request("GET", "/hello/a")
+    assert conn.getresponse().read() == b'{"message":"Hello a!"}'
+    conn.close()
+
+    # Too large: rejected from the Content-Length, before the body is sent
+    data = raw_exchange(port, b"POST /upload HTTP/1.1\r\nHost: x\r\nContent-Length: 2000000\r\n\r\n")
+    assert data.startswith(b"HTTP/1.1 413 ") and b"Connection: close" in data
+    # Too large, chunked
+    chunk = b"%x\r\n%b\r\n" % (100_000, b"x" * 100_000)
+    data = raw_exchange(port, b"POST /upload HTTP/1.1\r\nHost: x\r\nTransfer-Encoding: chunked\r\n\r\n" + chunk * 11)
+    assert data.startswith(b"HTTP/1.1 413 ")
+
+    # Expect: 100-continue
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as s:
+        s.sendall(b"POST /upload HTTP/1.1\r\nHost: x\r\nContent-Length: 5\r\nExpect: 100-continue\r\n\r\n")
+        assert s.recv(1024) == b"HTTP/1.1 100 Continue\r\n\r\n"
+        s.sendall(b"hello")
+        assert b'{"size":5,"head":"hello"}' in s.recv(1024)
+    data = raw_exchange(
+        port, b"POST /upload HTTP/1.1\r\nHost: x\r\nContent-Length: 2000000\r\nExpect: 100-continue\r\n\r\n"
+    )
+    assert data.startswith(b"HTTP/1.1 413 ")
+
+    # Malformed chunked body
+    data = raw_exchange(port, b"POST /upload HTTP/1.1\r\nHost: x\r\nTransfer-Encoding: chunked\r\n\r\nzz\r\n")
+    assert data.startswith(b"HTTP/1.1 400 Bad Request\r\n")
+
+
+def check_handler_connection_close(port: int):
+    # Closed when the handler asks for it, whatever the case of the header name, which is not repeated
+    data = raw_exchange(
+        port,
+        b"GET /bye HTTP/1.1\r\nHost: x\r\n\r\n"
+        b"GET /hello/a HTTP/1.1\r\nHost: x\r\n\r\n",
+    )
+    assert data.count(b"HTTP/1.1 200 OK") == 1 and data.endswith(b"\r\n\r\nbye")
+    assert data.lower().count(b"connection:") == 1 and b"Hello a!" not in data
+
+
+def check_metrics(port: int):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    conn.request("GET", "/hello/a")
+    conn.getresponse().read()
+    conn.request("GET", "/metrics")
+    res = conn.getresponse()
+    assert res.getheader("Content-Type") == "text/plain; version=0.0.4; charset=utf-8"
+    body = res.read().decode()
+    conn.close()
+    assert 'nanohttpy_requests_total{route="/hello/{name}",status="200"}' in body
+    # Measured by the engine
+    for phase in ("parse", "route", "handler", "serialize", "write"):
+        assert f'nanohttpy_phase_duration_seconds_count{{route="/hello/{{name}}",phase="{phase}"}}' in body
+
+
+def test_ThreadedPythonEngine_metrics(threaded_engine):
+    check_metrics(threaded_engine)
+
+
+def test_ThreadedPythonEngine_handler_connection_close(threaded_engine):
+    check_handler_connection_close(threaded_engine)
+
+
+def test_ThreadedPythonEngine_upload(threaded_engine):
+    check_upload(threaded_engine)
+
+
+def test_ThreadedPythonEngine_streaming(threaded_engine):
+    check_streaming(threaded_engine)
+
+
+def test_ThreadedPythonEngine_file(threaded_engine):
+    check_file(threaded_engine)
+
+
+@pytest.fixture
+def uvloop_engine(tmp_path) -> Iterator[int]:
+    pytest.importorskip("uvloop")
+    from nanohttpy.engines.uvloop import UvloopEngine  # pylint: disable=import-outside-toplevel
+
+    port, engine = start_engine(UvloopEngine, make_app(tmp_path), keep_alive_timeout=1)
+    yield port
+    engine.loop.call_soon_threadsafe(engine.loop.stop)
+
+
+def test_UvloopEngine_streaming(uvloop_engine):
+    check_streaming(uvloop_engine)
+
+
+def test_UvloopEngine_metrics(uvloop_engine):
+    check_metrics(uvloop_engine)
+
+
+def test_UvloopEngine_handler_connection_close(uvloop_engine):
+    check_handler_connection_close(uvloop_engine)
+
+
+def test_UvloopEngine_upload(uvloop_engine):
+    check_upload(uvloop_engine)
+
+
+def test_UvloopEngine_file(uvloop_engine):
+    check_file(uvloop_engine)
+
+    # Pipelined behind a response still in the write buffer
+    data = raw_exchange(
+        uvloop_engine,
+        b"GET /stream HTTP/1.1\r\nHost: x\r\n\r\n"
+        b"GET /file HTTP/1.1\r\nHost: x\r\nRange: bytes=0-99\r\n\r\n"
+        b"GET /file HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n",
+    )
+    assert data.endswith(b"\r\n\r\n" + FILE_CONTENT)
+    assert (b"\r\n\r\n" + FILE_CONTENT[:100] + b"HTTP/1.1 200 OK") in data
+
+
+def test_UvloopEngine_pipelining(uvloop_engine):
+    # Answered in order, even when a slower response (streaming) comes first
+    data = raw_exchange(
+        uvloop_engine,
+        b"GET /stream HTTP/1.1\r\nHost: x\r\n\r\n"
+        b"GET /hello/a HTTP/1.1\r\nHost: x\r\n\r\n"
+        b"POST /echo HTTP/1.1\r\nHost: x\r\nContent-Length: 4\r\n\r\nbody",
+    )
+    assert data.count(b"HTTP/1.1 200 OK") == 3
+    assert data.index(b"line 2") < data.index(b"Hello a!") < data.index(b"\r\n\r\nbody")
+
+    # More pipelined requests than the reading stops for: all answered once the pipeline drains
+    count = 50
+    data = raw_exchange(uvloop_engine, b"".join(b"GET /hello/%d HTTP/1.1\r\nHost: x\r\n\r\n" % i for i in range(count)))
+    assert data.count(b"HTTP/1.1 200 OK") == count
+    positions = [data.index(b"Hello %d!" % i) for i in range(count)]
+    assert positions == sorted(positions)
+
+
+def test_UvloopEngine_http10(uvloop_engine):
+    # Closed after the response, the second request is not answered
+    with socket.create_connection(("127.0.0.1", uvloop_engine), timeout=5) as s:
+        s.sendall(b"GET /hello/a HTTP/1.0\r\n\r\nGET /hello/b HTTP/1.0\r\n\r\n")
+        data = read_until_closed(s)
+    assert data.startswith(b"HTTP/1.0 200 OK") and b"Hello a!" in data and b"Hello b!" not in data
+
+    # Kept open when asked, the client must know it
+    with socket.create_connection(("127.0.0.1", uvloop_engine), timeout=5) as s:
+        s.sendall(b"GET /hello/a HTTP/1.0\r\nConnection: keep-alive\r\n\r\n")
+        data = b""
+        while b"Hello a!" not in data:
+            data += s.recv(65536)
+        assert b"Connection: keep-alive" in data
+        s.sendall(b"GET /hello/b HTTP/1.0\r\n\r\n")
+        data = read_until_closed(s)
+    assert b"Hello b!" in data and b"keep-alive" not in data
+
+
+def test_UvloopEngine_idle_timeout(uvloop_engine):
+    with socket.create_connection(("127.0.0.1", uvloop_engine), timeout=5) as s:
+        s.sendall(b"GET /hello/a HTTP/1.1\r\nHost: x\r\n\r\n")
+        start = time.monotonic()
+        data = read_until_closed(s)
+        elapsed = time.monotonic() - start
+    # Answered, then closed by the server after keep_alive_timeout (1s) without a new request
+    assert b"Hello a!" in data and b"Connection: close" not in data
+    assert 0.5 < elapsed < 4
+
+    # Same for a partial request: the timeout keeps running until the request is complete
+    with socket.create_connection(("127.0.0.1", uvloop_engine), timeout=5) as s:
+        s.sendall(b"GET /hello/a HTTP/1.1\r\nHo")
+        start = time.monotonic()
+        data = read_until_closed(s)
+        elapsed = time.monotonic() - start
+    assert data == b"" and 0.5 < elapsed < 4
+
+    # Also behind a pipelined request
+    with socket.create_connection(("127.0.0.1", uvloop_engine), timeout=5) as s:
+        s.sendall(b"GET /hello/a HTTP/1.1\r\nHost: x\r\n\r\nPOST /echo HTTP/1.1\r\nContent-Length: 10\r\n\r\nbo")
+        start = time.monotonic()
+        data = read_until_closed(s)
+        elapsed = time.monotonic() - start
+    assert b"Hello a!" in data and b"\r\n\r\nbo" not in data and 0.5 < elapsed < 4
+
+
+def test_UvloopEngine_upgrade_ignored(uvloop_engine):
+    # Answered in HTTP/1.1, as well as the requests pipelined behind
+    data = raw_exchange(
+        uvloop_engine,
+        b"GET /hello/a HTTP/1.1\r\nHost: x\r\nConnection: Upgrade, HTTP2-Settings\r\nUpgrade: h2c\r\n"
+        b"HTTP2-Settings: AAMAAABkAARAAAAAAAIAAAAA\r\n\r\n"
+        b"GET /hello/b HTTP/1.1\r\nHost: x\r\n\r\n"
+        b"GET /hello/c HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n",
+    )
+    assert data.startswith(b"HTTP/1.1 200 OK") and data.count(b"HTTP/1.1 200 OK") == 3
+    assert data.index(b"Hello a!") < data.index(b"Hello b!") < data.index(b"Hello c!")
+
+
+def test_UvloopEngine_malformed_after_valid(uvloop_engine):
+    data = raw_exchange(
+        uvloop_engine,
+        b"GET /hello/a HTTP/1.1\r\nHost: x\r\n\r\n"
+        b"GET /hello/b HTTP/1.1\r\nHost: x\r\n\r\n"
+        b"NOT AN HTTP REQUEST\r\n\r\n"
+        b"GET /hello/c HTTP/1.1\r\nHost: x\r\n\r\n",
+    )
+    # The valid requests are answered first, then the 400, and the connection is closed
+    assert data.index(b"Hello a!") < data.index(b"Hello b!") < data.index(b"HTTP/1.1 400 Bad Request")
+    assert data.endswith(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+    assert b"Hello c!" not in data
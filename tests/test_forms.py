@@ -0,0 +1,208 @@
+# pylint: disable=multiple-statements,invalid-name,too-many-statements,use-implicit-booleaness-not-comparison
+import tracemalloc
+from typing import Iterator, List
+
+import pytest
+
+from nanohttpy.bodies import BodyLimits, RequestBody
+from nanohttpy.exceptions import BadRequestError, PayloadTooLargeError
+from nanohttpy.forms import FormLimits, MultipartParser, UrlencodedParser, parse_form
+from nanohttpy.http import parse_header_options
+from tests.testutils import assert_raises, make_request
+
+BOUNDARY = "----WebKitFormBoundary7MA4YWxkTrZu0gW"
+MULTIPART = f"multipart/form-data; boundary={BOUNDARY}"
+URLENCODED = "application/x-www-form-urlencoded"
+
+
+def multipart_body(*parts: bytes, preamble: bytes = b"", epilogue: bytes = b"") -> bytes:
+    delimiter = b"--" + BOUNDARY.encode()
+    body = preamble
+    for part in parts:
+        body += delimiter + b"\r\n" + part + b"\r\n"
+    return body + delimiter + b"--\r\n" + epilogue
+
+
+def field(name: str, value: bytes) -> bytes:
+    return f'Content-Disposition: form-data; name="{name}"\r\n\r\n'.encode() + value
+
+
+def file(name: str, filename: str, content: bytes, content_type: str = "application/octet-stream") -> bytes:
+    return (
+        f'Content-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+        f"Content-Type: {content_type}\r\n\r\n"
+    ).encode() + content
+
+
+def split(data: bytes, size: int) -> List[bytes]:
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("text/plain", ("text/plain", {})),
+        ('Text/Plain; Charset="utf-16"', ("text/plain", {"charset": "utf-16"})),
+        (f"multipart/form-data; boundary={BOUNDARY}", ("multipart/form-data", {"boundary": BOUNDARY})),
+        ('form-data; name="file"; filename="a;b.txt"', ("form-data", {"name": "file", "filename": "a;b.txt"})),
+        ('form-data; name="file"; filename="C:\\dir\\a.txt"', ("form-data", {"name": "file", "filename": "C:\\dir\\a.txt"})),
+        ("", ("", {})),
+    ],
+)
+def test_parse_header_options(value, expected):
+    assert parse_header_options(value) == expected
+
+
+@pytest.mark.parametrize(
+    "body, expected",
+    [
+        (b"", {}),
+        (b"a=1&b=2&a=3", {"a": ["1", "3"], "b": ["2"]}),
+        (b"name=J%C3%A9r%C3%A9my+D&empty=&flag", {"name": ["Jérémy D"], "empty": [""], "flag": [""]}),
+        (b"a=1&&b=%26%3D", {"a": ["1"], "b": ["&="]}),
+        ("café=crème".encode(), {"café": ["crème"]}),
+    ],
+)
+@pytest.mark.parametrize("chunk_size", [1, 3, 1000])
+def test_UrlencodedParser(body, expected, chunk_size):
+    parser = UrlencodedParser()
+    for data in split(body, chunk_size):
+        parser.feed(data)
+    assert parser.finish() == expected
+
+
+def test_UrlencodedParser_limits():
+    limits = FormLimits(max_parts=2, max_field_size=10)
+    assert_raises(BadRequestError, lambda: parse_form(URLENCODED, [b"a=1&b=2&c=3"], limits), "Too many form fields")
+    assert_raises(PayloadTooLargeError, lambda: parse_form(URLENCODED, [b"a=0123456789"], limits))
+    # Without separator, the field is rejected before the end of the body
+    parser = UrlencodedParser(limits)
+    parser.feed(b"a=12345")
+    assert_raises(PayloadTooLargeError, lambda: parser.feed(b"67890"))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 5, 17, 64, 100_000])
+def test_MultipartParser(chunk_size):
+    body = multipart_body(
+        field("title", "Café".encode()),
+        field("title", b""),
+        file("upload", "notes.txt", b"line 1\r\nline 2\r\n--not a delimiter\r\n", "text/plain"),
+        file("upload", "empty.bin", b""),
+        field("last", b"\r\n"),
+        preamble=b"This is the preamble\r\n",
+        epilogue=b"This is the epilogue",
+    )
+    parser = MultipartParser(BOUNDARY)
+    for data in split(body, chunk_size):
+        parser.feed(data)
+    fields, files = parser.finish()
+    assert fields == {"title": ["Café", ""], "last": ["\r\n"]}
+    assert list(files) == ["upload"]
+    notes, empty = files["upload"]
+    assert (notes.name, notes.filename, notes.content_type) == ("upload", "notes.txt", "text/plain")
+    assert notes.read() == b"line 1\r\nline 2\r\n--not a delimiter\r\n"
+    assert notes.size == 35 and not notes.spilled
+    assert (empty.filename, empty.content_type, empty.read()) == ("empty.bin", "application/octet-stream", b"")
+
+
+def test_MultipartParser_filenames():
+    body = multipart_body(
+        file("a", "café.txt", b"1"),
+        b"Content-Disposition: form-data; name=\"b\"; filename*=UTF-8''%E2%82%AC%20rates.txt\r\n\r\n2",
+        b"Content-Disposition: form-data; name=b; filename=\"\"\r\n\r\n",
+    )
+    _, files = parse_form(MULTIPART, [body])
+    assert [f.filename for f in files["a"]] == ["café.txt"]
+    assert [f.filename for f in files["b"]] == ["€ rates.txt", ""]
+    assert files["a"][0].content_type == "application/octet-stream" and files["b"][0].content_type is None
+
+
+def test_MultipartParser_spill(tmp_path):
+    content = bytes(range(256)) * 100
+    body = multipart_body(file("big", "big.bin", content), file("small", "small.bin", b"small"))
+    _, files = parse_form(MULTIPART, split(body, 1000), FormLimits(spill_threshold=1000))
+    big, small = files["big"][0], files["small"][0]
+    assert big.spilled and not small.spilled
+    assert big.size == len(content) and big.read() == content
+    assert b"".join(big.iter_chunks(4096)) == content
+    big.save(str(tmp_path / "big.bin"))
+    assert (tmp_path / "big.bin").read_bytes() == content
+    big.close()
+
+
+@pytest.mark.parametrize(
+    "content_type, body, limits, exception, match",
+    [
+        ("multipart/form-data", b"", FormLimits(), BadRequestError, "without boundary"),
+        (MULTIPART, b"", FormLimits(), BadRequestError, "Incomplete"),
+        (MULTIPART, multipart_body(field("a", b"1"))[:-10], FormLimits(), BadRequestError, "Incomplete"),
+        (MULTIPART, multipart_body(b"\r\nno headers"), FormLimits(), BadRequestError, "without a form-data name"),
+        (MULTIPART, multipart_body(b"Invalid header\r\n\r\n1"), FormLimits(), BadRequestError, "Invalid multipart part"),
+        (MULTIPART, f"--{BOUNDARY}garbage\r\n".encode(), FormLimits(), BadRequestError, "Invalid multipart delimiter"),
+        (MULTIPART, multipart_body(b"X-Big: " + b"x" * 20_000), FormLimits(), BadRequestError, "headers too large"),
+        (MULTIPART, multipart_body(field("a", b"1"), field("b", b"2")), FormLimits(max_parts=1), BadRequestError,
+         "Too many form parts"),
+        (MULTIPART, multipart_body(field("a", b"x" * 11)), FormLimits(max_field_size=10), PayloadTooLargeError, None),
+        (MULTIPART, multipart_body(file("a", "a", b"x" * 11)), FormLimits(max_file_size=10), PayloadTooLargeError, None),
+    ],
+    ids=[
+        "no-boundary",
+        "empty",
+        "truncated",
+        "no-name",
+        "invalid-header",
+        "invalid-delimiter",
+        "big-headers",
+        "max-parts",
+        "max-field-size",
+        "max-file-size",
+    ],
+)
+def test_parse_form_errors(content_type, body, limits, exception, match):
+    assert_raises(exception, lambda: parse_form(content_type, split(body, 7), limits), match)
+
+
+def test_parse_form_other_content_types():
+    assert parse_form(None, [b"a=1"]) == ({}, {})
+    assert parse_form("application/json", [b'{"a": 1}']) == ({}, {})
+
+
+def test_Request_form():
+    req = make_request("POST", "/", headers={"content-type": URLENCODED}, body=b"a=1&b=2")
+    assert req.form() == {"a": ["1"], "b": ["2"]}
+    assert req.form() is req.form()
+    assert req.files() == {}
+
+    body = multipart_body(field("a", b"1"), file("f", "f.txt", b"content"))
+    req = make_request("POST", "/", headers={"Content-Type": MULTIPART}, body=body)
+    assert req.form() == {"a": ["1"]}
+    assert req.files()["f"][0].read() == b"content"
+    req.body = multipart_body(field("b", b"2"))
+    assert req.form() == {"b": ["2"]} and req.files() == {}
+
+    assert make_request("POST", "/", body=b"a=1").form() == {}
+
+
+def chunks_from(body: RequestBody) -> Iterator[bytes]:
+    yield from body.iter_chunks()
+
+
+def test_Request_form_bounded_memory():
+    # An upload spilled to a temporary file is parsed by chunks, without loading it in memory
+    size = 8 * 1024 * 1024
+    body = RequestBody(BodyLimits(max_size=None, spill_threshold=1024 * 1024))
+    body.write(f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="f"; filename="f.bin"\r\n\r\n'.encode())
+    chunk = b"x" * 65536
+    for _ in range(size // len(chunk)):
+        body.write(chunk)
+    body.write(f"\r\n--{BOUNDARY}--\r\n".encode())
+    req = make_request("POST", "/", headers={"Content-Type": MULTIPART})
+    req.body = body
+    tracemalloc.start()
+    try:
+        upload = req.files()["f"][0]
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert upload.size == size and upload.spilled
+    assert peak < 1024 * 1024 + 4 * 65536
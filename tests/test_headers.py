@@ -0,0 +1,65 @@
+# pylint: disable=multiple-statements,invalid-name,too-many-statements,use-implicit-booleaness-not-comparison
+import email.message
+
+import pytest
+
+from nanohttpy.headers import Headers
+from tests.testutils import assert_raises
+
+RAW = [(b"Host", b"localhost"), (b"Accept", b"text/html"), (b"X-Caf\xe9", b"cr\xe8me"), (b"accept", b"*/*")]
+
+
+def test_Headers_lookup():
+    headers = Headers(RAW)
+    assert headers["host"] == headers["HOST"] == headers.get("Host") == "localhost"
+    assert headers["X-CAF\xe9"] == "crème"
+    assert headers["Accept"] == "text/html"
+    assert headers.get("Missing") is None
+    assert headers.get("Missing", "default") == "default"
+    assert headers.get("Ünïcödé €") is None
+    assert_raises(KeyError, lambda: headers["Missing"])
+    assert "ACCEPT" in headers and "Missing" not in headers and 1 not in headers
+
+
+def test_Headers_repeated():
+    headers = Headers(RAW)
+    assert headers.get_all("ACCEPT") == ["text/html", "*/*"]
+    assert headers.get_all("Missing") == []
+    assert list(headers) == ["Host", "Accept", "X-Café"]
+    assert len(headers) == 3
+    assert dict(headers) == {"Host": "localhost", "Accept": "text/html", "X-Café": "crème"}
+    assert headers.multi_items() == [("Host", "localhost"), ("Accept", "text/html"), ("X-Café", "crème"), ("accept", "*/*")]
+    assert headers.raw is RAW
+
+
+def test_Headers_from_mapping():
+    message = email.message.Message()
+    message["Host"] = "localhost"
+    message["Cookie"] = "a=1"
+    message["Cookie"] = "b=2"
+    headers = Headers(message)
+    assert headers.raw == [(b"Host", b"localhost"), (b"Cookie", b"a=1"), (b"Cookie", b"b=2")]
+    assert headers.get_all("cookie") == ["a=1", "b=2"]
+    assert Headers({"content-type": "text/plain"})["Content-Type"] == "text/plain"
+    assert Headers(Headers(RAW)).raw is RAW
+    assert Headers().raw == [] and len(Headers()) == 0
+
+
+@pytest.mark.parametrize(
+    "other, expected",
+    [
+        ({"host": "localhost", "Accept": "text/html"}, True),
+        (Headers([(b"ACCEPT", b"text/html"), (b"HOST", b"localhost")]), True),
+        ({"Host": "localhost"}, False),
+        ({"Host": "localhost", "Accept": "*/*"}, False),
+        (Headers([(b"Host", b"localhost"), (b"Accept", b"text/html"), (b"Accept", b"*/*")]), False),
+    ],
+)
+def test_Headers_eq(other, expected):
+    assert (Headers([(b"Host", b"localhost"), (b"Accept", b"text/html")]) == other) is expected
+
+
+def test_Headers_slots():
+    headers = Headers(RAW)
+    assert not hasattr(headers, "__dict__")
+    assert repr(Headers([(b"Host", b"localhost")])) == "Headers([('Host', 'localhost')])"
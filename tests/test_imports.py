@@ -0,0 +1,75 @@
+# pylint: disable=multiple-statements,invalid-name,too-many-statements,use-implicit-booleaness-not-comparison
+import os
+import subprocess
+import sys
+import textwrap
+
+import nanohttpy
+
+_PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(nanohttpy.__file__)))
+
+# Cumulative import time of the package, in ms. Generous to not fail on slow machines, overridden by the environment
+# variable NANOHTTPY_IMPORT_TIME_BUDGET_MS. For reference, it was about 170 ms on the machine where it was set before
+# the imports were made lazy, and 75 to 90 ms after.
+IMPORT_TIME_BUDGET_MS = float(os.environ.get("NANOHTTPY_IMPORT_TIME_BUDGET_MS", 150))
+
+# Only needed to handle the requests or by optional features, they must not be imported to define the routes
+LAZY_MODULES = [
+    "asyncio",
+    "concurrent.futures",
+    "cProfile",
+    "email.utils",
+    "hashlib",
+    "json",
+    "mimetypes",
+    "tempfile",
+    "zlib",
+    "nanohttpy.compression",
+    "nanohttpy.engines.python",
+    "nanohttpy.engines.uvloop",
+    "nanohttpy.metrics",
+    "nanohttpy.profiling",
+]
+
+_DEFINE_ROUTES = textwrap.dedent(
+    """
+    import sys
+    from nanohttpy import NanoHttpy
+
+    app = NanoHttpy()
+
+    @app.get("/hello/{name}", cache_ttl=10)
+    async def hello(req, name: str):
+        return {"message": f"Hello {name}!"}
+
+    app.mount_static("/static", ".")
+    from nanohttpy.exceptions import NotFoundError
+    assert str(NotFoundError()).startswith("404 Not Found: ")
+    print(" ".join(sys.modules))
+    """
+)
+
+
+def run_python(*args: str) -> subprocess.CompletedProcess:
+    env = dict(os.environ, PYTHONPATH=_PACKAGE_DIR)
+    return subprocess.run([sys.executable, *args], env=env, capture_output=True, text=True, check=True, timeout=60)
+
+
+def test_import_is_lazy():
+    modules = set(run_python("-c", _DEFINE_ROUTES).stdout.split())
+    assert "nanohttpy.applications" in modules
+    assert [module for module in LAZY_MODULES if module in modules] == []
+
+
+def import_time_ms() -> float:
+    for line in run_python("-X", "importtime", "-c", "import nanohttpy").stderr.splitlines():
+        _, cumulative, name = line.split("|")
+        if name.strip() == "nanohttpy":
+            return int(cumulative) / 1000
+    raise AssertionError("nanohttpy not found in the output of -X importtime")
+
+
+def test_import_time_budget():
+    # The best of a few runs, the first one may fill the bytecode cache
+    best = min(import_time_ms() for _ in range(3))
+    assert best <= IMPORT_TIME_BUDGET_MS, f"import nanohttpy took {best:.1f} ms, over the {IMPORT_TIME_BUDGET_MS} ms budget"
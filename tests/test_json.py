@@ -0,0 +1,103 @@
+# pylint: disable=multiple-statements,invalid-name,too-many-statements,use-implicit-booleaness-not-comparison,redefined-outer-name
+import importlib.util
+from typing import Iterator
+import pytest
+
+from nanohttpy import NanoHttpy, json
+from nanohttpy.exceptions import BadRequestError, NanoHttpyError
+from nanohttpy.json import JSONBackend, current_backend, get_backend, set_backend
+from nanohttpy.responses import JSONResponse
+from tests.testutils import assert_raises, make_request
+
+INSTALLED_BACKENDS = [
+    name for name in ("orjson", "ujson") if importlib.util.find_spec(name) is not None
+] + ["json"]
+
+
+@pytest.fixture(autouse=True)
+def restore_backend() -> Iterator[None]:
+    backend = json._backend  # pylint: disable=protected-access
+    yield
+    json._backend = backend  # pylint: disable=protected-access
+
+
+@pytest.mark.parametrize("name", INSTALLED_BACKENDS)
+@pytest.mark.parametrize(
+    "obj, expected",
+    [
+        ({"message": "Hello World!"}, b'{"message":"Hello World!"}'),
+        ({"a": [1, 2.5, None, True], "b": {}}, b'{"a":[1,2.5,null,true],"b":{}}'),
+        ({"name": "Jérémy", "url": "a/b"}, '{"name":"Jérémy","url":"a/b"}'.encode()),
+        ({1: "int key"}, b'{"1":"int key"}'),
+    ],
+)
+def test_backends_dumps(name, obj, expected):
+    backend = get_backend(name)
+    assert backend.name == name
+    assert backend.dumps(obj) == expected
+    assert backend.loads(expected) == json.get_backend("json").loads(expected)
+
+
+def test_get_backend_default():
+    assert get_backend().name == INSTALLED_BACKENDS[0]
+
+
+def test_get_backend_errors():
+    assert_raises(NanoHttpyError, lambda: get_backend("simplejson"))
+    if "ujson" not in INSTALLED_BACKENDS:
+        assert_raises(NanoHttpyError, lambda: get_backend("ujson"))
+
+
+def test_set_backend():
+    custom = JSONBackend("custom", lambda obj: b"custom", lambda data: "custom")
+    set_backend(custom)
+    assert current_backend() is custom
+    assert JSONResponse({"a": 1}).encoded_body == b"custom"
+    assert make_request("POST", "/", body=b"{}").json() == "custom"
+
+    assert set_backend("json").name == "json"
+    assert JSONResponse({"a": 1}).encoded_body == b'{"a":1}'
+
+
+def test_NanoHttpy_json_backend():
+    # A process-wide setting, not an option of the application: creating one never changes the backend of the others
+    custom = JSONBackend("custom", lambda obj: b"custom", lambda data: "custom")
+    set_backend(custom)
+    app = NanoHttpy()
+
+    @app.get("/")
+    def index(req):
+        return {"a": 1}
+
+    NanoHttpy()
+    assert current_backend() is custom
+    assert app.handle(make_request("GET", "/")).encoded_body == b"custom"
+    set_backend(None)
+
+    # The former constructor argument points to set_backend
+    assert_raises(NanoHttpyError, lambda: NanoHttpy(json_backend="json"), "nanohttpy.json.set_backend")
+    assert current_backend().name == get_backend().name
+
+
+@pytest.mark.parametrize("name", INSTALLED_BACKENDS)
+def test_Request_json(name):
+    set_backend(name)
+    req = make_request("POST", "/", body=b'{"a": [1, 2]}')
+    assert req.json() == {"a": [1, 2]}
+    # Parsed once
+    assert req.json() is req.json()
+
+    assert_raises(BadRequestError, make_request("POST", "/", body=b'{"a": ').json)
+    assert_raises(BadRequestError, make_request("POST", "/", body=b"").json)
+
+
+def test_Request_json_handler():
+    app = NanoHttpy()
+
+    @app.post("/sum")
+    def sum_handler(req):
+        return {"sum": sum(req.json()["values"])}
+
+    res = app.handle(make_request("POST", "/sum", body=b'{"values": [1, 2, 3]}'))
+    assert res.status_code == 200 and res.encoded_body == b'{"sum":6}'
+    assert app.handle(make_request("POST", "/sum", body=b"not json")).status_code == 400
@@ -0,0 +1,158 @@
+# pylint: disable=multiple-statements,invalid-name,too-many-statements,use-implicit-booleaness-not-comparison
+import io
+import json
+import logging
+import threading
+
+from nanohttpy import NanoHttpy
+from nanohttpy.logging import AccessLogFormatter, BackgroundHandler, access_logger, flush_logs, logger
+from tests.testutils import make_request
+
+
+class SlowStream(io.StringIO):
+    def __init__(self) -> None:
+        super().__init__()
+        self.writes = 0
+        self.release = threading.Event()
+
+    def write(self, s: str) -> int:
+        self.release.wait(5)
+        self.writes += 1
+        return super().write(s)
+
+
+def test_BackgroundHandler_batches():
+    stream = SlowStream()
+    handler = BackgroundHandler(logging.StreamHandler(stream))
+    test_logger = logging.Logger("test")
+    test_logger.addHandler(handler)
+
+    # The caller is never blocked by the slow stream
+    for i in range(100):
+        test_logger.info("message %d", i)
+    stream.release.set()
+    handler.flush()
+    assert stream.getvalue().splitlines() == [f"message {i}" for i in range(100)]
+    # The records queued while the stream was blocked are written at once
+    assert stream.writes < 100
+    handler.close()
+
+
+def test_BackgroundHandler_drops_when_full():
+    stream = SlowStream()
+    handler = BackgroundHandler(logging.StreamHandler(stream), max_queue=10)
+    test_logger = logging.Logger("test")
+    test_logger.addHandler(handler)
+
+    for i in range(100):
+        test_logger.info("message %d", i)
+    assert handler.dropped > 0
+    stream.release.set()
+    handler.flush()
+    assert len(stream.getvalue().splitlines()) == 100 - handler.dropped
+    handler.close()
+
+
+def test_BackgroundHandler_formats_traceback_in_writer():
+    stream = io.StringIO()
+    handler = BackgroundHandler(logging.StreamHandler(stream))
+    test_logger = logging.Logger("test")
+    test_logger.addHandler(handler)
+
+    try:
+        raise ValueError("boom")
+    except ValueError as e:
+        test_logger.error("%s", e, exc_info=e)
+    handler.flush()
+    assert stream.getvalue().startswith("boom\nTraceback")
+    assert "ValueError: boom" in stream.getvalue()
+    handler.close()
+
+
+def test_BackgroundHandler_bad_record(monkeypatch):
+    stream = io.StringIO()
+    handler = BackgroundHandler(logging.StreamHandler(stream))
+    errors = []
+    monkeypatch.setattr(handler, "handleError", errors.append)
+    test_logger = logging.Logger("test")
+    test_logger.addHandler(handler)
+
+    # The caller is not disturbed by a message that can't be formatted, the record is reported and dropped
+    test_logger.info("%d requests", "many")
+    test_logger.info("valid")
+    handler.flush()
+    assert [record.msg for record in errors] == ["%d requests"]
+    assert stream.getvalue() == "valid\n"
+    handler.close()
+
+
+def test_BackgroundHandler_starts_one_thread():
+    stream = io.StringIO()
+    handler = BackgroundHandler(logging.StreamHandler(stream))
+    barrier = threading.Barrier(8)
+
+    def emit(i):
+        barrier.wait()
+        handler.emit(logging.LogRecord("test", logging.INFO, __file__, 0, "message %d", (i,), None))
+
+    threads = [threading.Thread(target=emit, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    handler.flush()
+    assert sorted(stream.getvalue().splitlines()) == sorted(f"message {i}" for i in range(8))
+    handler.close()
+
+
+def test_access_log():
+    stream = io.StringIO()
+    target = logging.StreamHandler(stream)
+    target.setFormatter(AccessLogFormatter())
+    handler = BackgroundHandler(target)
+    access_logger.addHandler(handler)
+    try:
+        app = NanoHttpy(access_log=True)
+
+        @app.get("/hello")
+        def hello(_):
+            return "Hello"
+
+        app.handle(make_request("GET", "/hello?name=world"))
+        app.handle(make_request("POST", "/hello"))
+        flush_logs()
+    finally:
+        access_logger.removeHandler(handler)
+        handler.close()
+
+    entries = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [(e["method"], e["path"], e["status"]) for e in entries] == [
+        ("GET", "/hello?name=world", 200),
+        ("POST", "/hello", 405),
+    ]
+    assert all(e["version"] == "HTTP/1.1" and e["duration_ms"] >= 0 and e["time"] for e in entries)
+
+
+def test_access_log_disabled():
+    stream = io.StringIO()
+    handler = BackgroundHandler(logging.StreamHandler(stream))
+    access_logger.addHandler(handler)
+    try:
+        app = NanoHttpy()
+
+        @app.get("/hello")
+        def hello(_):
+            return "Hello"
+
+        app.handle(make_request("GET", "/hello"))
+        flush_logs()
+    finally:
+        access_logger.removeHandler(handler)
+        handler.close()
+    assert stream.getvalue() == ""
+
+
+def test_flush_logs():
+    # The default handlers are flushed without hanging, even if nothing was logged by this process
+    logger.debug("not logged")
+    flush_logs()
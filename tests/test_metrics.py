@@ -0,0 +1,193 @@
+# pylint: disable=multiple-statements,invalid-name,too-many-statements,use-implicit-booleaness-not-comparison,redefined-outer-name
+import asyncio
+import threading
+import time
+
+from nanohttpy import NanoHttpy
+from nanohttpy.exceptions import NanoHttpyError
+from nanohttpy.metrics import CONTENT_TYPE, PHASES, UNMATCHED_ROUTE, Metrics
+from tests.testutils import assert_raises, make_request
+
+
+def request(route, method="GET"):
+    req = make_request(method, "/")
+    req.route = route
+    return req
+
+
+def test_Metrics_record():
+    metrics = Metrics(buckets=(0.001, 0.01), phases=PHASES)
+    shard = metrics.shard()
+    metrics.record_handling(shard, request("/a"), 200, 0.0005, 0.005)
+    metrics.record_handling(shard, request("/a"), 200, 0.0005, 0.05)
+    metrics.record_handling(shard, request("/a"), 500, 0.002, 0.0001)
+    metrics.record_handling(shard, request(None), 404, 0.0005, None)
+    metrics.record_engine_phases(request("/a"), 0.0001, None, 0.02)
+
+    requests, histograms, in_flight = metrics.collect()
+    assert requests == {("/a", 200): 2, ("/a", 500): 1, (UNMATCHED_ROUTE, 404): 1}
+    assert histograms[("/a", "route")][0] == [2, 1, 0]
+    assert histograms[("/a", "handler")] == ([1, 1, 1], 0.005 + 0.05 + 0.0001)
+    assert histograms[("/a", "parse")][0] == [1, 0, 0]
+    assert histograms[("/a", "write")][0] == [0, 0, 1]
+    assert ("/a", "serialize") not in histograms
+    assert histograms[(UNMATCHED_ROUTE, "route")][0] == [1, 0, 0]
+    assert (UNMATCHED_ROUTE, "handler") not in histograms
+    assert in_flight == 0
+
+
+def test_Metrics_phases():
+    metrics = Metrics(buckets=(0.001,), phases=["write", "handler"])
+    assert metrics.phases == ("handler", "write")
+    assert metrics.timed_handling and metrics.timed_engine
+    shard = metrics.shard()
+    for _ in range(300):
+        metrics.record_handling(shard, request("/a"), 200, 0.0005, 0.005)
+        metrics.record_engine_phases(request("/a"), 0.0001, None, 0.0001)
+    requests, histograms, _ = metrics.collect()
+    assert requests == {("/a", 200): 300}
+    assert sorted(histograms) == [("/a", "handler"), ("/a", "write")]
+    assert histograms[("/a", "handler")][0] == [0, 300]
+
+    # Only the counters by default
+    metrics = Metrics()
+    assert metrics.phases == () and not metrics.timed_handling and not metrics.timed_engine
+    metrics = Metrics(phases=["parse"])
+    assert not metrics.timed_handling and metrics.timed_engine
+    metrics = Metrics(phases=[])
+    assert not metrics.timed_handling and not metrics.timed_engine
+    assert_raises(NanoHttpyError, lambda: Metrics(phases=["handler", "render"]), "render")
+
+
+def test_Metrics_flush():
+    metrics = Metrics(buckets=(0.001,), phases=PHASES)
+    shard = metrics.shard()
+    # Aggregated in bulk every 256 requests, the pending ones are included when collected
+    for i in range(1000):
+        metrics.record_handling(shard, request("/a"), 200, 0.0001 if i % 2 else 0.1, 0.0001)
+        metrics.record_engine_phases(request("/a"), 0.0001, 0.0001, 0.0001)
+    route_metrics = shard.routes["/a"]
+    pending = len(route_metrics.pending_handling)
+    assert 0 < pending < 2 * 256
+    requests, histograms, _ = metrics.collect()
+    assert requests == {("/a", 200): 1000}
+    assert histograms[("/a", "route")][0] == [500, 500]
+    for phase in ("handler", "parse", "serialize", "write"):
+        assert histograms[("/a", phase)][0] == [1000, 0]
+    # Collecting doesn't flush
+    assert len(route_metrics.pending_handling) == pending
+
+
+def test_Metrics_threads():
+    metrics = Metrics(phases=PHASES)
+
+    def record():
+        shard = metrics.shard()
+        for _ in range(100):
+            metrics.record_handling(shard, request("/a"), 200, 0.001, 0.001)
+
+    threads = [threading.Thread(target=record) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    requests, histograms, _ = metrics.collect()
+    assert requests == {("/a", 200): 400}
+    assert sum(histograms[("/a", "handler")][0]) == 400
+    assert len(metrics._shards) == 4  # pylint: disable=protected-access
+
+
+def test_Metrics_render():
+    metrics = Metrics(buckets=(0.001, 0.01), phases=PHASES)
+    metrics.shard().in_flight += 1
+    metrics.record_handling(metrics.shard(), request('/a/{b}"'), 200, 0.0005, 0.005)
+    assert metrics.render() == (
+        "# HELP nanohttpy_requests_total Requests handled, by route pattern and status code.\n"
+        "# TYPE nanohttpy_requests_total counter\n"
+        'nanohttpy_requests_total{route="/a/{b}\\"",status="200"} 1\n'
+        "# HELP nanohttpy_requests_in_flight Requests being handled.\n"
+        "# TYPE nanohttpy_requests_in_flight gauge\n"
+        "nanohttpy_requests_in_flight 1\n"
+        "# HELP nanohttpy_phase_duration_seconds Duration of the phases of the requests, by route pattern.\n"
+        "# TYPE nanohttpy_phase_duration_seconds histogram\n"
+        'nanohttpy_phase_duration_seconds_bucket{route="/a/{b}\\"",phase="handler",le="0.001"} 0\n'
+        'nanohttpy_phase_duration_seconds_bucket{route="/a/{b}\\"",phase="handler",le="0.01"} 1\n'
+        'nanohttpy_phase_duration_seconds_bucket{route="/a/{b}\\"",phase="handler",le="+Inf"} 1\n'
+        'nanohttpy_phase_duration_seconds_sum{route="/a/{b}\\"",phase="handler"} 0.005\n'
+        'nanohttpy_phase_duration_seconds_count{route="/a/{b}\\"",phase="handler"} 1\n'
+        'nanohttpy_phase_duration_seconds_bucket{route="/a/{b}\\"",phase="route",le="0.001"} 1\n'
+        'nanohttpy_phase_duration_seconds_bucket{route="/a/{b}\\"",phase="route",le="0.01"} 1\n'
+        'nanohttpy_phase_duration_seconds_bucket{route="/a/{b}\\"",phase="route",le="+Inf"} 1\n'
+        'nanohttpy_phase_duration_seconds_sum{route="/a/{b}\\"",phase="route"} 0.0005\n'
+        'nanohttpy_phase_duration_seconds_count{route="/a/{b}\\"",phase="route"} 1\n'
+    )
+
+
+def test_NanoHttpy_metrics(tmp_path):
+    app = NanoHttpy(metrics=Metrics(phases=PHASES), metrics_path="/metrics")
+    app.mount_static("/static", str(tmp_path))
+
+    @app.get("/hello/{name}")
+    def hello(req, name: str):
+        return f"Hello {name}"
+
+    @app.get("/fail")
+    async def fail(req):
+        raise ValueError()
+
+    app.handle(make_request("GET", "/hello/a"))
+    app.handle(make_request("GET", "/hello/b"))
+    asyncio.run(app.handle_async(make_request("GET", "/fail")))
+    app.handle(make_request("GET", "/nope"))
+    app.handle(make_request("GET", "/static/nope"))
+
+    requests, histograms, in_flight = app.metrics.collect()
+    assert requests == {
+        ("/hello/{name}", 200): 2,
+        ("/fail", 500): 1,
+        (UNMATCHED_ROUTE, 404): 1,
+        ("/static/{path}", 404): 1,
+    }
+    assert sum(histograms[("/hello/{name}", "handler")][0]) == 2
+    assert in_flight == 0
+
+    res = app.handle(make_request("GET", "/metrics"))
+    assert res.headers["Content-Type"] == CONTENT_TYPE
+    assert b'nanohttpy_requests_total{route="/hello/{name}",status="200"} 2\n' in res.encoded_body
+    # The scrape itself is in flight while rendered
+    assert b"nanohttpy_requests_in_flight 1\n" in res.encoded_body
+
+
+def test_NanoHttpy_metrics_without_phases(monkeypatch):
+    # The default
+    app = NanoHttpy(metrics=True)
+
+    @app.get("/hello")
+    def hello(req):
+        return "Hello"
+
+    # Only counted: no timestamp is taken
+    def perf_counter():
+        raise AssertionError("timed")
+
+    monkeypatch.setattr(time, "perf_counter", perf_counter)
+    app.handle(make_request("GET", "/hello"))
+    asyncio.run(app.handle_async(make_request("GET", "/nope")))
+    monkeypatch.undo()
+    requests, histograms, in_flight = app.metrics.collect()
+    assert requests == {("/hello", 200): 1, (UNMATCHED_ROUTE, 404): 1}
+    assert histograms == {} and in_flight == 0
+
+
+def test_NanoHttpy_metrics_disabled():
+    app = NanoHttpy()
+    assert app.metrics is None
+    assert_raises(NanoHttpyError, lambda: NanoHttpy(metrics_path="/metrics"))
+
+    @app.get("/hello")
+    def hello(req):
+        return "Hello"
+
+    req = make_request("GET", "/hello")
+    app.handle(req)
+    assert req.route == "/hello"
@@ -0,0 +1,124 @@
+# pylint: disable=multiple-statements,invalid-name,too-many-statements,use-implicit-booleaness-not-comparison,redefined-outer-name
+import asyncio
+import os
+import pstats
+import pytest
+
+from nanohttpy import NanoHttpy
+from nanohttpy.exceptions import NanoHttpyError
+from nanohttpy.profiling import Profiler
+from tests.testutils import assert_raises, make_request
+
+
+def profiled_functions(path):
+    return {function for _, _, function in pstats.Stats(str(path)).stats}  # type: ignore
+
+
+def make_app(profiler):
+    app = NanoHttpy(profiler=profiler)
+
+    @app.get("/sync/{name}")
+    def sync_handler(req, name: str):
+        return {"name": "".join(sorted(name))}
+
+    @app.get("/async")
+    async def async_handler(req):
+        await asyncio.sleep(0)
+        return {"name": "".join(sorted("async"))}
+
+    @app.get("/blocking", blocking=True)
+    def blocking_handler(req):
+        return {"name": "".join(sorted("blocking"))}
+
+    return app
+
+
+@pytest.mark.parametrize(
+    "headers, expected",
+    [
+        ({"X-NanoHttpy-Profile": "s3cret"}, True),
+        ({"x-nanohttpy-profile": "s3cret"}, True),
+        ({"X-NanoHttpy-Profile": "wrong"}, False),
+        ({}, False),
+    ],
+)
+def test_Profiler_secret(tmp_path, headers, expected):
+    app = make_app(Profiler(str(tmp_path), secret="s3cret"))
+    res = app.handle(make_request("GET", "/sync/b", headers=headers))
+    assert res.status_code == 200
+    files = list(tmp_path.iterdir())
+    assert len(files) == (1 if expected else 0)
+    if expected:
+        assert files[0].name.endswith("-sync_name.prof")
+        assert "sync_handler" in profiled_functions(files[0])
+
+
+def test_Profiler_sampling(tmp_path):
+    app = make_app(Profiler(str(tmp_path), routes=["/sync/{name}"], sample_rate=1.0))
+    app.handle(make_request("GET", "/sync/a"))
+    app.handle(make_request("GET", "/async"))
+    app.handle(make_request("GET", "/nope"))
+    assert len(list(tmp_path.iterdir())) == 1
+
+    app = make_app(Profiler(str(tmp_path / "none"), sample_rate=0.000001))
+    for _ in range(10):
+        app.handle(make_request("GET", "/sync/a"))
+    assert len(list((tmp_path / "none").iterdir())) == 0
+
+
+@pytest.mark.parametrize(
+    "path, function", [("/sync/b", "sync_handler"), ("/async", "async_handler"), ("/blocking", "blocking_handler")]
+)
+def test_Profiler_handle_async(tmp_path, path, function):
+    app = make_app(Profiler(str(tmp_path), sample_rate=1.0))
+    res = asyncio.run(app.handle_async(make_request("GET", path)))
+    assert res.status_code == 200
+    (profile,) = tmp_path.iterdir()
+    assert function in profiled_functions(profile)
+
+
+def test_Profiler_async_only_steps(tmp_path):
+    profiler = Profiler(str(tmp_path), sample_rate=1.0)
+
+    def other_task_function():
+        pass
+
+    async def other_task():
+        other_task_function()
+
+    async def handler():
+        await asyncio.sleep(0.01)
+        return 42
+
+    async def main():
+        task = asyncio.create_task(profiler.profile_coroutine(make_request("GET", "/"), handler()))
+        await asyncio.sleep(0)
+        await other_task()
+        return await task
+
+    assert asyncio.run(main()) == 42
+    (profile,) = tmp_path.iterdir()
+    functions = profiled_functions(profile)
+    assert "handler" in functions
+    # Run while the profiled coroutine was suspended
+    assert "other_task_function" not in functions
+
+
+def test_Profiler_errors(tmp_path):
+    app = make_app(Profiler(str(tmp_path), sample_rate=1.0, max_profiles=2))
+
+    @app.get("/fail")
+    async def fail(req):
+        raise ValueError()
+
+    assert asyncio.run(app.handle_async(make_request("GET", "/fail"))).status_code == 500
+    assert app.handle(make_request("GET", "/fail")).status_code == 500
+    # Limit reached
+    app.handle(make_request("GET", "/sync/a"))
+    assert len(os.listdir(tmp_path)) == 2
+
+
+def test_Profiler_options(tmp_path):
+    assert_raises(NanoHttpyError, lambda: Profiler(str(tmp_path)))
+    assert_raises(NanoHttpyError, lambda: Profiler(str(tmp_path), sample_rate=2))
+    assert NanoHttpy().profiler is None
@@ -50,3 +50,59 @@ def test_Request_url_parsing(input_url: str, expected_url: URL, expected_args: d
     assert req.args == expected_args
 
 
+@pytest.mark.parametrize(
+    "input_url, expected_path",
+    [
+        ("/path/only", "/path/only"),
+        ("/?query=only", "/"),
+        ("/#fragment-only", "/"),
+        ("/search?client=firefox-b-d&q=test#fragment", "/search"),
+        ("/path#fragment?not=query", "/path"),
+        ("", ""),
+    ],
+)
+def test_Request_path(input_url: str, expected_path: str):
+    req = make_request("", input_url)
+    assert req.path == expected_path
+    assert req.path == req.url.path
+
+
+def test_Request_lazy_attributes():
+    req = make_request("GET", "/path?q=1#fragment?not=query")
+    # Nothing is parsed until it is read
+    assert req._url is None and req._args is None  # pylint: disable=protected-access
+    assert req.args == {"q": ["1"]}
+    assert req._url is None  # pylint: disable=protected-access
+    assert req.url is req.url
+    assert not hasattr(req, "__dict__")
+
+    req.args = {"overridden": ["yes"]}
+    assert req.query("overridden") == "yes"
+
+
+def test_Request_raw_headers():
+    req = Request("GET", "/", "1.1", [(b"Host", b"localhost"), (b"X-Caf\xe9", b"cr\xe8me")], b"")
+    assert req.headers == {"Host": "localhost", "X-Café": "crème"}
+    assert req.headers["host"] == "localhost"
+    assert req.headers is req.headers
+    req.headers = {"Content-Type": "text/plain"}
+    assert req.headers.get("content-type") == "text/plain"
+
+
+@pytest.mark.parametrize(
+    "headers, body, expected",
+    [
+        ({}, "café".encode(), "café"),
+        ({"Content-Type": "text/plain; charset=latin-1"}, "café".encode("latin-1"), "café"),
+        ({"content-type": 'text/plain; charset="utf-16"'}, "café".encode("utf-16"), "café"),
+    ],
+)
+def test_Request_text(headers: HTTPHeaders, body: bytes, expected: str):
+    assert make_request("POST", "/", headers=headers, body=body).text == expected
+
+
+def test_Request_equality():
+    assert make_request("GET", "/a?b=c") == make_request("GET", "/a?b=c")
+    assert make_request("GET", "/a?b=c") != make_request("GET", "/a?b=d")
+    assert make_request("GET", "/a", path_parameters={"a": "b"}) != make_request("GET", "/a")
+    assert_raises(TypeError, lambda: hash(make_request("GET", "/")))
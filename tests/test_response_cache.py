@@ -0,0 +1,250 @@
+# pylint: disable=multiple-statements,invalid-name,too-many-statements,use-implicit-booleaness-not-comparison,redefined-outer-name
+import asyncio
+import gzip
+import time
+import pytest
+
+from nanohttpy import NanoHttpy
+from nanohttpy.compression import Compression
+from nanohttpy.exceptions import NanoHttpyError
+from nanohttpy.http import etag_matches
+from nanohttpy.response_cache import CachePolicy, ResponseCache, is_cacheable, make_etag
+from nanohttpy.responses import PlainTextResponse, Response, StreamingResponse
+from tests.testutils import assert_raises, make_request
+
+
+@pytest.mark.parametrize(
+    "if_none_match, etag, expected",
+    [
+        ('"a"', '"a"', True),
+        ('"b", "a"', '"a"', True),
+        ('W/"a"', '"a"', True),
+        ('"a"', 'W/"a"', True),
+        ("*", '"a"', True),
+        ('"b"', '"a"', False),
+        ('"a', '"a"', False),
+    ],
+)
+def test_etag_matches(if_none_match, etag, expected):
+    assert etag_matches(if_none_match, etag) == expected
+
+
+@pytest.mark.parametrize(
+    "path, headers, policy, same_key_as",
+    [
+        ("/a?x=1&y=2", {}, CachePolicy.create(1), "/a?x=1&y=2"),
+        ("/a?x=1&y=2", {}, CachePolicy.create(1, ["x"]), "/a?x=1&y=3"),
+        ("/a?x=1", {}, CachePolicy.create(1, []), "/a?x=2#fragment"),
+        ("/a", {"Accept-Language": "fr"}, CachePolicy.create(1, headers=["Accept-Language"]), "/a"),
+    ],
+)
+def test_CachePolicy_key(path, headers, policy, same_key_as):
+    assert policy.key(make_request("GET", path, headers=headers)) == policy.key(
+        make_request("GET", same_key_as, headers=headers)
+    )
+
+
+def test_CachePolicy_key_differs():
+    policy = CachePolicy.create(1, ["x"], ["Accept-Language"])
+    key = policy.key(make_request("GET", "/a?x=1", headers={"Accept-Language": "fr"}))
+    assert key != policy.key(make_request("GET", "/a?x=2", headers={"Accept-Language": "fr"}))
+    assert key != policy.key(make_request("GET", "/a?x=1", headers={"accept-language": "en"}))
+    assert key != policy.key(make_request("GET", "/b?x=1", headers={"Accept-Language": "fr"}))
+    assert CachePolicy.create(1).key(make_request("GET", "/a?x=1")) != CachePolicy.create(1).key(
+        make_request("GET", "/a?x=2")
+    )
+    assert CachePolicy.create(1).key(make_request("GET", "/a")) != CachePolicy.create(1).key(make_request("HEAD", "/a"))
+
+
+@pytest.mark.parametrize(
+    "res, expected",
+    [
+        (PlainTextResponse("a"), True),
+        (PlainTextResponse("a", status_code=404), False),
+        (PlainTextResponse("a", headers={"Set-Cookie": "a=b"}), False),
+        (PlainTextResponse("a", headers={"Cache-Control": "no-store"}), False),
+        (PlainTextResponse("a", headers={"Cache-Control": "private, max-age=10"}), False),
+        (PlainTextResponse("a", headers={"Cache-Control": "max-age=10"}), True),
+        (PlainTextResponse("a", headers={"set-cookie": "a=b"}), False),
+        (PlainTextResponse("a", headers={"cache-control": "no-store"}), False),
+        (PlainTextResponse("a", headers={"CACHE-CONTROL": "Private"}), False),
+        (StreamingResponse(iter(["a"])), False),
+    ],
+)
+def test_is_cacheable(res, expected):
+    assert is_cacheable(res) == expected
+
+
+def test_ResponseCache():
+    cache = ResponseCache()
+    req = make_request("GET", "/a")
+    assert cache.get("a", req) is None
+    original = PlainTextResponse("hello")
+    res = cache.put("a", 10, req, original)
+    assert res.encoded_body == b"hello" and res.headers["ETag"] == make_etag(b"hello")
+    assert "ETag" not in original.headers
+    assert cache.get("a", req) is res
+    assert cache.info()[:3] == (1, 1, 0)
+
+    # Conditional requests
+    etag = res.headers["ETag"]
+    not_modified = cache.get("a", make_request("GET", "/a", headers={"If-None-Match": etag}))
+    assert not_modified.status_code == 304 and not_modified.encoded_body == b""
+    assert not_modified.headers == {"ETag": etag}
+    assert cache.get("a", make_request("GET", "/a", headers={"If-None-Match": '"other"'})) is res
+    assert cache.put("b", 10, make_request("GET", "/b", headers={"If-None-Match": etag}), original).status_code == 304
+
+    # The ETag set by the handler is kept
+    assert cache.put("c", 10, req, PlainTextResponse("a", headers={"ETag": '"v1"'})).headers["ETag"] == '"v1"'
+    # Not cacheable: returned as is
+    error = PlainTextResponse("a", status_code=500)
+    assert cache.put("d", 10, req, error) is error and cache.get("d", req) is None
+
+
+def test_ResponseCache_ttl():
+    cache = ResponseCache()
+    req = make_request("GET", "/a")
+    cache.put("a", 0.05, req, PlainTextResponse("a"))
+    assert cache.get("a", req) is not None
+    time.sleep(0.06)
+    assert cache.get("a", req) is None
+    info = cache.info()
+    assert (info.hits, info.misses, info.currsize) == (1, 1, 0)
+
+
+def test_ResponseCache_eviction():
+    req = make_request("GET", "/a")
+    cache = ResponseCache(maxsize=2)
+    for key in "abc":
+        cache.put(key, 10, req, PlainTextResponse(key))
+    assert cache.get("a", req) is None and cache.get("c", req) is not None
+    assert cache.info().evictions == 1
+
+    cache = ResponseCache(max_bytes=2000)
+    for key in "abc":
+        cache.put(key, 10, req, PlainTextResponse(key * 600))
+    assert cache.info().currsize == 2 and cache.info().evictions == 1
+    cache.clear()
+    assert cache.info().currsize == 0
+
+
+def test_NanoHttpy_cache_ttl():
+    app = NanoHttpy()
+    calls = []
+
+    @app.get("/items", cache_ttl=60, cache_query=["page"])
+    def items(req, page: int = 1):
+        calls.append(page)
+        return {"page": page}
+
+    @app.get("/uncached")
+    def uncached(req):
+        calls.append(0)
+        return "a"
+
+    res = app.handle(make_request("GET", "/items?page=2&utm=a"))
+    assert res.encoded_body == b'{"page":2}' and "ETag" in res.headers
+    assert app.handle(make_request("GET", "/items?page=2&utm=b")).encoded_body == b'{"page":2}'
+    assert asyncio.run(app.handle_async(make_request("GET", "/items?page=2"))).encoded_body == b'{"page":2}'
+    assert app.handle(make_request("GET", "/items?page=3")).encoded_body == b'{"page":3}'
+    assert calls == [2, 3]
+
+    res = app.handle(make_request("GET", "/items?page=2", headers={"If-None-Match": res.headers["ETag"]}))
+    assert res.status_code == 304
+    assert calls == [2, 3]
+    info = app.response_cache_info()
+    assert (info.hits, info.misses, info.currsize) == (3, 2, 2)
+
+    # Routes without cache_ttl are not cached
+    app.handle(make_request("GET", "/uncached"))
+    app.handle(make_request("GET", "/uncached"))
+    assert calls == [2, 3, 0, 0]
+
+
+def test_NanoHttpy_cache_ttl_async_handler():
+    app = NanoHttpy()
+    calls = []
+
+    @app.route("/items", methods=["GET", "POST"], cache_ttl=60)
+    async def items(req):
+        calls.append(req.method)
+        return {"items": []}
+
+    for method in ("GET", "GET", "POST", "POST"):
+        asyncio.run(app.handle_async(make_request(method, "/items")))
+    assert calls == ["GET", "POST", "POST"]
+
+
+def test_NanoHttpy_cache_ttl_per_method():
+    app = NanoHttpy()
+
+    @app.get("/items", cache_ttl=60)
+    def get_items(req):
+        return "get"
+
+    @app.route("/items", methods=["HEAD"], cache_ttl=60)
+    def head_items(req):
+        return Response(headers={"X-Handler": "head"})
+
+    for _ in range(2):
+        assert app.handle(make_request("GET", "/items")).encoded_body == b"get"
+        assert app.handle(make_request("HEAD", "/items")).headers["X-Handler"] == "head"
+    info = app.response_cache_info()
+    assert (info.hits, info.misses, info.currsize) == (2, 2, 2)
+
+
+def test_NanoHttpy_cache_ttl_lowercase_headers():
+    app = NanoHttpy()
+    calls = []
+
+    @app.get("/session", cache_ttl=60)
+    def session(req):
+        calls.append(req.path)
+        return Response(b"hello", headers={"set-cookie": f"session={len(calls)}"})
+
+    @app.get("/private", cache_ttl=60)
+    def private(req):
+        calls.append(req.path)
+        return Response(b"hello", headers={"cache-control": "no-store", "etag": '"v1"'})
+
+    for path in ("/session", "/private"):
+        first = app.handle(make_request("GET", path))
+        second = app.handle(make_request("GET", path))
+        assert first.status_code == second.status_code == 200
+        assert "ETag" not in first.headers and "ETag" not in second.headers
+    assert calls == ["/session", "/session", "/private", "/private"]
+    assert app.handle(make_request("GET", "/session")).headers["set-cookie"] == "session=5"
+    assert app.response_cache_info().currsize == 0
+
+    # The ETag of the handler is kept, not duplicated, and sent back with the 304
+    @app.get("/tagged", cache_ttl=60)
+    def tagged(req):
+        return Response(b"hello", headers={"etag": '"v1"', "cache-control": "max-age=60"})
+
+    res = app.handle(make_request("GET", "/tagged"))
+    assert res.headers["etag"] == '"v1"' and "ETag" not in res.headers
+    res = app.handle(make_request("GET", "/tagged", headers={"If-None-Match": '"v1"'}))
+    assert res.status_code == 304 and res.headers == {"etag": '"v1"', "cache-control": "max-age=60"}
+
+
+def test_NanoHttpy_cache_ttl_compression():
+    app = NanoHttpy(compression=Compression(min_size=0))
+
+    @app.get("/text", cache_ttl=60)
+    def text(req):
+        return "a" * 100
+
+    etag = app.handle(make_request("GET", "/text")).headers["ETag"]
+    res = app.handle(make_request("GET", "/text", headers={"Accept-Encoding": "gzip"}))
+    assert gzip.decompress(res.encoded_body) == b"a" * 100
+    # The compressed body is another representation
+    assert res.headers["ETag"] == "W/" + etag
+    res = app.handle(make_request("GET", "/text", headers={"Accept-Encoding": "gzip", "If-None-Match": "W/" + etag}))
+    assert res.status_code == 304
+
+
+def test_NanoHttpy_cache_options():
+    app = NanoHttpy()
+    assert_raises(NanoHttpyError, lambda: app.get("/a", cache_query=["x"]))
+    assert_raises(NanoHttpyError, lambda: app.get("/a", cache_headers=["Accept"]))
+    assert isinstance(app.response_cache_info().hits, int)
@@ -0,0 +1,190 @@
+# pylint: disable=multiple-statements,invalid-name,too-many-statements,use-implicit-booleaness-not-comparison
+import asyncio
+from email.utils import formatdate
+import os
+import pathlib
+import pytest
+
+from nanohttpy.exceptions import NotFoundError, RangeNotSatisfiableError
+from nanohttpy.http import parse_range_header
+from nanohttpy.responses import FileResponse, NDJSONResponse, PlainTextResponse, StreamingResponse, adapt_response
+from tests.testutils import assert_raises, make_request
+
+
+def test_adapt_response_generators():
+    def gen():
+        yield "a"
+
+    async def agen():
+        yield "a"
+
+    assert isinstance(adapt_response(gen()), StreamingResponse)
+    assert isinstance(adapt_response(agen()), StreamingResponse)
+    res = adapt_response((gen(), 201, {"X-Test": "1"}))
+    assert res.status_code == 201 and res.headers == {"X-Test": "1"}
+
+
+def test_StreamingResponse():
+    res = StreamingResponse(iter(["a", b"", b"b", "é"]), headers={"Content-Type": "text/csv"})
+    # Never a Content-Length, the body is not known in advance
+    assert res.headers == {"Content-Type": "text/csv"}
+    assert res.encoded_body == b""
+    # Empty chunks would end a chunked body
+    assert list(res.iter_sync()) == [b"a", b"b", "é".encode()]
+
+
+def test_StreamingResponse_async_iterator():
+    async def agen():
+        for chunk in ("a", "b"):
+            await asyncio.sleep(0)
+            yield chunk
+
+    assert list(StreamingResponse(agen()).iter_sync()) == [b"a", b"b"]
+
+    async def collect(res):
+        return [chunk async for chunk in res.iter_async()]
+
+    assert asyncio.run(collect(StreamingResponse(agen()))) == [b"a", b"b"]
+    assert asyncio.run(collect(StreamingResponse(["a", "b"]))) == [b"a", b"b"]
+
+
+def test_StreamingResponse_close():
+    closed = []
+
+    def gen():
+        try:
+            yield "a"
+            yield "b"
+        finally:
+            closed.append("sync")
+
+    async def agen():
+        try:
+            yield "a"
+            yield "b"
+        finally:
+            closed.append("async")
+
+    res = StreamingResponse(gen())
+    next(res.iter_sync())
+    res.close()
+    res = StreamingResponse(agen())
+    next(res.iter_sync())
+    res.close()
+    assert closed == ["sync", "async"]
+
+
+def test_NDJSONResponse():
+    res = NDJSONResponse([{"a": 1}, [1, 2], "x"])
+    assert res.headers == {"Content-Type": "application/x-ndjson; charset=UTF-8"}
+    assert list(res.iter_sync()) == [b'{"a":1}\n[1,2]\n"x"\n']
+
+    # Lists are grouped in chunks
+    chunks = list(NDJSONResponse([{"i": i} for i in range(100)], chunk_size=100).iter_sync())
+    assert 1 < len(chunks) < 100
+    assert all(len(chunk) < 110 for chunk in chunks)
+    assert b"".join(chunks) == b"".join(b'{"i":%d}\n' % i for i in range(100))
+
+    # Generators are sent item by item
+    assert list(NDJSONResponse(i for i in range(3)).iter_sync()) == [b"0\n", b"1\n", b"2\n"]
+
+    async def agen():
+        yield {"a": 1}
+        yield {"b": 2}
+
+    assert list(NDJSONResponse(agen()).iter_sync()) == [b'{"a":1}\n', b'{"b":2}\n']
+
+
+def test_Response_not_streaming():
+    assert not isinstance(PlainTextResponse("a"), StreamingResponse)
+
+
+@pytest.mark.parametrize(
+    "value, size, expected",
+    [
+        ("bytes=0-9", 100, (0, 9)),
+        ("bytes=10-", 100, (10, 99)),
+        ("bytes=90-200", 100, (90, 99)),
+        ("bytes=-10", 100, (90, 99)),
+        ("bytes=-200", 100, (0, 99)),
+        (" bytes = 5 - 6 ", 100, (5, 6)),
+        # Ignored
+        ("bytes=0-9,20-29", 100, None),
+        ("items=0-9", 100, None),
+        ("bytes=9-0", 100, None),
+        ("bytes=a-b", 100, None),
+        ("bytes=--5", 100, None),
+        ("bytes=-", 100, None),
+        ("bytes=5", 100, None),
+    ],
+)
+def test_parse_range_header(value, size, expected):
+    assert parse_range_header(value, size) == expected
+
+
+@pytest.mark.parametrize("value, size", [("bytes=100-", 100), ("bytes=-0", 100), ("bytes=-5", 0)])
+def test_parse_range_header_not_satisfiable(value, size):
+    assert_raises(RangeNotSatisfiableError, lambda: parse_range_header(value, size))
+
+
+@pytest.fixture
+def text_file(tmp_path) -> pathlib.Path:
+    path = tmp_path / "file.txt"
+    path.write_bytes(bytes(range(100)))
+    os.utime(path, (784111777, 784111777))
+    return path
+
+
+def test_FileResponse(text_file):
+    res = adapt_response(text_file)
+    assert isinstance(res, FileResponse)
+    assert res.headers == {
+        "Content-Length": "100",
+        "Content-Type": "text/plain",
+        "Last-Modified": "Sun, 06 Nov 1994 08:49:37 GMT",
+        "Accept-Ranges": "bytes",
+    }
+    assert (res.offset, res.count) == (0, 100)
+    assert res.encoded_body == b""
+    assert res.prepare(make_request("GET", "/")) is res and res.status_code == 200
+
+    assert FileResponse(str(text_file), headers={"Content-Type": "text/csv"}).headers["Content-Type"] == "text/csv"
+    gz_file = text_file.with_name("file.txt.gz")
+    gz_file.write_bytes(b"")
+    assert FileResponse(gz_file).headers["Content-Type"] == "application/octet-stream"
+
+    assert_raises(NotFoundError, lambda: FileResponse(text_file.with_name("missing")))
+    assert_raises(NotFoundError, lambda: FileResponse(text_file.parent))
+    assert_raises(NotFoundError, lambda: FileResponse(text_file / "child"))
+
+
+@pytest.mark.parametrize(
+    "headers, status_code, offset, count, content_range",
+    [
+        ({"Range": "bytes=10-19"}, 206, 10, 10, "bytes 10-19/100"),
+        ({"range": "bytes=-5"}, 206, 95, 5, "bytes 95-99/100"),
+        ({"Range": "bytes=200-"}, 416, 0, 0, "bytes */100"),
+        ({"Range": "bytes=0-1,5-6"}, 200, 0, 100, None),
+        ({"Range": "bytes=10-19", "If-Range": "Sun, 06 Nov 1994 08:49:37 GMT"}, 206, 10, 10, "bytes 10-19/100"),
+        ({"Range": "bytes=10-19", "If-Range": "Mon, 07 Nov 1994 08:49:37 GMT"}, 200, 0, 100, None),
+        ({"If-Modified-Since": "Sun, 06 Nov 1994 08:49:37 GMT"}, 304, 0, 0, None),
+        ({"If-Modified-Since": formatdate(784111777 - 1, usegmt=True)}, 200, 0, 100, None),
+        ({"If-Modified-Since": "not a date"}, 200, 0, 100, None),
+    ],
+)
+def test_FileResponse_prepare(text_file, headers, status_code, offset, count, content_range):
+    res = FileResponse(text_file).prepare(make_request("GET", "/", headers=headers))
+    assert (res.status_code, res.offset, res.count) == (status_code, offset, count)
+    assert res.headers.get("Content-Range") == content_range
+    if status_code == 304:
+        assert "Content-Length" not in res.headers
+    else:
+        assert res.headers["Content-Length"] == str(count)
+
+
+def test_FileResponse_prepare_ignored(text_file):
+    # Only for successful GET and HEAD
+    res = FileResponse(text_file).prepare(make_request("POST", "/", headers={"Range": "bytes=0-9"}))
+    assert res.status_code == 200 and res.count == 100
+    res = FileResponse(text_file, status_code=404).prepare(make_request("GET", "/", headers={"Range": "bytes=0-9"}))
+    assert res.status_code == 404 and res.count == 100
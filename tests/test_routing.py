@@ -2,7 +2,7 @@
 import pytest
 from nanohttpy.http import HTTPHeaders
 from nanohttpy.requests import Request
-from nanohttpy.routing import RouteTree, Router, check_param, tokenize_path
+from nanohttpy.routing import RouteTree, Router, check_param, normalize_path, tokenize_path
 from nanohttpy.exceptions import MethodNotAllowedError, NanoHttpyError, NotFoundError
 
 from tests.testutils import assert_raises, make_request
@@ -229,12 +229,6 @@ def test_Router():
     r.add_route("GET", "/{param1}/b", param1_b)
     r.add_route("GET", "/{param1}/{param2}", param1_param2)
 
-    # Handler already registered
-    assert_raises(NanoHttpyError, lambda: r.add_route("GET", "/", root))
-
-    # Handler already registered with different path_param
-    assert_raises(NanoHttpyError, lambda: r.add_route("GET", "/{different}", param1))
-
     req = make_request("GET", "/")
     assert r.get_handler(req).__name__ == "root"
     assert req.path_parameters == {}
@@ -278,3 +272,113 @@ def test_Router():
     req = make_request("GET", "/key/another-key")
     assert r.get_handler(req).__name__ == "param1_param2"
     assert req.path_parameters == {"param1": "key", "param2": "another-key"}
+
+
+def test_Router_conflicts():
+    def handler():
+        pass
+
+    r = Router()
+    r.add_route("GET", "/", handler)
+    r.add_route("GET", "/{param1}", handler)
+    r.add_route("POST", "/", handler)
+    r.freeze()
+    assert r.frozen
+
+    # Conflicts are reported when the router is frozen, not when the routes are added
+    r.add_route("GET", "/", handler)
+    assert not r.frozen
+    assert_raises(NanoHttpyError, r.freeze, match="already registered for request 'GET /'")
+    assert_raises(NanoHttpyError, lambda: r.get_handler(make_request("GET", "/")))
+
+    # Handler already registered with different path_param
+    r = Router()
+    r.add_route("GET", "/{param1}", handler)
+    r.add_route("GET", "/{different}/b", handler)
+    assert_raises(NanoHttpyError, r.freeze, match="different wildcard 'param1'")
+
+    # Syntax errors are still reported immediately
+    assert_raises(NanoHttpyError, lambda: r.add_route("GET", "/{param", handler))
+
+
+def test_Router_static_fast_path():
+    def static():
+        pass
+
+    def param():
+        pass
+
+    r = Router()
+    r.add_route("GET", "/a/b", static)
+    r.add_route("GET", "/a/{p}", param)
+    r.add_route("GET", "/a/{p}/c", param)
+    r.freeze()
+
+    # Every path that can be reached through static components only is resolved with one lookup
+    assert set(r._static_routes) == {"/", "/a", "/a/b"}  # pylint: disable=protected-access
+
+    req = make_request("GET", "/a/b")
+    assert r.get_handler(req) is static
+    assert req.path_parameters == {}
+    req = make_request("GET", "//a/b/")
+    assert r.get_handler(req) is static
+    req = make_request("GET", "/a/x/c")
+    assert r.get_handler(req) is param
+    assert req.path_parameters == {"p": "x"}
+    # The static component takes precedence, without backtracking on the wildcard
+    assert_raises(NotFoundError, lambda: r.get_handler(make_request("GET", "/a/b/c")))
+    # Intermediate paths are known, but have no handler
+    assert_raises(MethodNotAllowedError, lambda: r.get_handler(make_request("GET", "/a")))
+    assert_raises(MethodNotAllowedError, lambda: r.get_handler(make_request("POST", "/a/b")))
+
+    # Adding a route unfreezes the router, the next lookup takes it into account
+    r.add_route("POST", "/a/b", param)
+    assert r.get_handler(make_request("POST", "/a/b")) is param
+
+
+def test_normalize_path():
+    assert normalize_path("") == "/"
+    assert normalize_path("///") == "/"
+    assert normalize_path("a/b/") == "/a/b"
+    assert normalize_path("//a//{b}") == "/a/{b}"
+
+
+def test_Router_cache():
+    def static():
+        pass
+
+    def param():
+        pass
+
+    r = Router(cache_size=3)
+    r.add_route("GET", "/a", static)
+    r.add_route("GET", "/b/{p}", param)
+
+    for _ in range(3):
+        req = make_request("GET", "/b/x")
+        assert r.get_handler(req) is param
+        assert req.path_parameters == {"p": "x"}
+    # The cached parameters are copied in each request
+    req.path_parameters["p"] = "modified"
+    req = make_request("GET", "/b/x")
+    r.get_handler(req)
+    assert req.path_parameters == {"p": "x"}
+    assert r.cache_info()[:2] == (3, 1)
+
+    # Negative results are cached as well
+    for _ in range(2):
+        assert_raises(NotFoundError, lambda: r.get_handler(make_request("GET", "/c")))
+        assert_raises(MethodNotAllowedError, lambda: r.get_handler(make_request("POST", "/a")))
+    assert r.cache_info()[:2] == (5, 3)
+
+    # Least recently used entries are evicted
+    r.get_handler(make_request("GET", "/a"))
+    info = r.cache_info()
+    assert info.evictions == 1 and info.currsize == 3
+
+    # Adding a route invalidates the cache, including the negative results
+    r.add_route("GET", "/c", static)
+    assert r.cache_info().currsize == 0
+    assert r.get_handler(make_request("GET", "/c")) is static
+
+    assert Router().cache_info() is None
@@ -0,0 +1,123 @@
+# pylint: disable=multiple-statements,invalid-name,too-many-statements,use-implicit-booleaness-not-comparison,redefined-outer-name
+import gzip
+import os
+import pathlib
+import pytest
+
+from nanohttpy import NanoHttpy
+from nanohttpy.exceptions import MethodNotAllowedError, NanoHttpyError, NotFoundError
+from nanohttpy.responses import FileResponse
+from nanohttpy.staticfiles import StaticFiles
+from tests.testutils import assert_raises, make_request
+
+
+@pytest.fixture
+def static_dir(tmp_path) -> pathlib.Path:
+    (tmp_path / "css").mkdir()
+    (tmp_path / "css" / "style.css").write_text("body {}")
+    (tmp_path / "app.js").write_text("console.log('app')")
+    (tmp_path / "app.js.gz").write_bytes(gzip.compress(b"console.log('app')"))
+    (tmp_path / "big.bin").write_bytes(b"x" * 2000)
+    (tmp_path / "my file.txt").write_text("spaces")
+    return tmp_path
+
+
+def serve(static: StaticFiles, path: str, method="GET", headers=None):
+    return static.serve(make_request(method, path, headers=headers), path)
+
+
+def test_StaticFiles(static_dir):
+    static = StaticFiles(str(static_dir), max_cached_file_size=1000)
+    res = serve(static, "/css/style.css")
+    assert res.status_code == 200 and res.encoded_body == b"body {}"
+    assert res.headers["Content-Type"] == "text/css" and "Last-Modified" in res.headers
+    assert "Vary" not in res.headers
+    assert serve(static, "/my%20file.txt").encoded_body == b"spaces"
+    assert serve(static, "/css/style.css", method="HEAD").status_code == 200
+
+    # Big files are sent by the engine with sendfile
+    res = serve(static, "/big.bin", headers={"Range": "bytes=0-9"})
+    assert isinstance(res, FileResponse) and res.status_code == 206
+
+    assert_raises(MethodNotAllowedError, lambda: serve(static, "/css/style.css", method="POST"))
+    assert_raises(NanoHttpyError, lambda: StaticFiles(str(static_dir / "missing")))
+
+
+@pytest.mark.parametrize(
+    "path",
+    ["/missing.css", "/css", "/", "/../test_staticfiles.py", "/css/%2E%2E/%2E%2E/etc/passwd", "/css/..%2Fapp.js",
+     "/css/..\\app.js", "/app.js%00.css", "/css/style.css/child"],
+)
+def test_StaticFiles_not_found(static_dir, path):
+    static = StaticFiles(str(static_dir / "css"))
+    assert_raises(NotFoundError, lambda: serve(static, path))
+
+
+def test_StaticFiles_cache(static_dir):
+    static = StaticFiles(str(static_dir))
+    serve(static, "/css/style.css")
+    serve(static, "/css/style.css")
+    info = static.cache_info()
+    assert (info.hits, info.misses, info.currsize, info.currbytes) == (1, 1, 1, 7)
+
+    # Invalidated when the file changes
+    path = static_dir / "css" / "style.css"
+    path.write_text("body { color: red }")
+    os.utime(path, ns=(0, path.stat().st_mtime_ns + 1_000_000_000))
+    assert serve(static, "/css/style.css").encoded_body == b"body { color: red }"
+    assert static.cache_info().currbytes == 19
+
+    # Bounded by bytes
+    static = StaticFiles(str(static_dir), cache_max_bytes=20)
+    serve(static, "/css/style.css")
+    serve(static, "/my%20file.txt")
+    serve(static, "/app.js")
+    info = static.cache_info()
+    assert (info.currsize, info.currbytes, info.evictions) == (1, 18, 2)
+
+
+def test_StaticFiles_If_Modified_Since(static_dir):
+    static = StaticFiles(str(static_dir))
+    last_modified = serve(static, "/css/style.css").headers["Last-Modified"]
+    res = serve(static, "/css/style.css", headers={"If-Modified-Since": last_modified})
+    assert res.status_code == 304 and res.encoded_body == b"" and "Content-Length" not in res.headers
+
+
+def test_StaticFiles_gzip(static_dir):
+    static = StaticFiles(str(static_dir))
+    res = serve(static, "/app.js", headers={"Accept-Encoding": "gzip, deflate"})
+    assert res.headers["Content-Encoding"] == "gzip" and res.headers["Vary"] == "Accept-Encoding"
+    assert res.headers["Content-Type"] == "text/javascript"
+    assert gzip.decompress(res.encoded_body) == b"console.log('app')"
+
+    for headers in ({}, {"accept-encoding": "gzip;q=0, deflate"}):
+        res = serve(static, "/app.js", headers=headers)
+        assert "Content-Encoding" not in res.headers and res.headers["Vary"] == "Accept-Encoding"
+        assert res.encoded_body == b"console.log('app')"
+
+
+def test_NanoHttpy_mount_static(static_dir):
+    app = NanoHttpy()
+
+    @app.get("/assets/generated.css")
+    def generated(_):
+        return "generated"
+
+    app.mount_static("/assets", str(static_dir))
+    app.mount_static("/assets/css-only/", str(static_dir / "css"))
+
+    res = app.handle(make_request("GET", "/assets/css/style.css"))
+    assert res.status_code == 200 and res.encoded_body == b"body {}"
+    assert app.handle(make_request("GET", "/assets/css-only/style.css")).encoded_body == b"body {}"
+    # The routes take precedence
+    assert app.handle(make_request("GET", "/assets/generated.css")).encoded_body == b"generated"
+    assert app.handle(make_request("GET", "/assets/missing.css")).status_code == 404
+    assert app.handle(make_request("GET", "/assetsx/css/style.css")).status_code == 404
+    assert app.handle(make_request("GET", "/other")).status_code == 404
+    assert app.handle(make_request("POST", "/assets/css/style.css")).status_code == 405
+
+
+def test_NanoHttpy_mount_static_root(static_dir):
+    app = NanoHttpy()
+    app.mount_static("/", str(static_dir))
+    assert app.handle(make_request("GET", "/css/style.css")).encoded_body == b"body {}"
@@ -0,0 +1,114 @@
+# pylint: disable=multiple-statements,invalid-name,too-many-statements,use-implicit-booleaness-not-comparison
+import re
+import pytest
+
+from nanohttpy import wire
+from nanohttpy.exceptions import NanoHttpyError
+from nanohttpy.http import check_response_headers
+from nanohttpy.responses import JSONResponse, PlainTextResponse, Response
+from nanohttpy.wire import (
+    date_header,
+    response_connection,
+    serialize_head,
+    serialize_response,
+    serialize_response_parts,
+    status_line,
+)
+from tests.testutils import assert_raises
+
+
+@pytest.mark.parametrize(
+    "version, status_code, expected",
+    [
+        ("HTTP/1.1", 200, b"HTTP/1.1 200 OK\r\n"),
+        ("HTTP/1.0", 404, b"HTTP/1.0 404 Not Found\r\n"),
+        ("HTTP/1.1", 599, b"HTTP/1.1 599 \r\n"),
+    ],
+)
+def test_status_line(version, status_code, expected):
+    assert status_line(version, status_code) == expected
+    # Cached
+    assert status_line(version, status_code) is status_line(version, status_code)
+
+
+def test_date_header(monkeypatch):
+    monkeypatch.setattr(wire.time, "time", lambda: 784111777.5)
+    assert date_header() == b"Date: Sun, 06 Nov 1994 08:49:37 GMT\r\n"
+    # Formatted once per second
+    assert date_header() is date_header()
+    monkeypatch.setattr(wire.time, "time", lambda: 784111778.1)
+    assert date_header() == b"Date: Sun, 06 Nov 1994 08:49:38 GMT\r\n"
+
+
+def strip_date(data: bytes) -> bytes:
+    return re.sub(rb"Date: [^\r]*\r\n", b"", data)
+
+
+@pytest.mark.parametrize(
+    "response, version, connection, include_body, expected",
+    [
+        (
+            PlainTextResponse("Hello"),
+            "HTTP/1.1",
+            None,
+            True,
+            b"HTTP/1.1 200 OK\r\nContent-Length: 5\r\nContent-Type: text/plain; charset=UTF-8\r\n\r\nHello",
+        ),
+        (
+            JSONResponse({"a": 1}, status_code=201),
+            "HTTP/1.0",
+            "keep-alive",
+            True,
+            b"HTTP/1.0 201 Created\r\nContent-Length: 7\r\nContent-Type: application/json; charset=UTF-8\r\n"
+            b"Connection: keep-alive\r\n\r\n{\"a\":1}",
+        ),
+        (
+            PlainTextResponse("Hello"),
+            "HTTP/1.1",
+            "close",
+            False,
+            b"HTTP/1.1 200 OK\r\nContent-Length: 5\r\nContent-Type: text/plain; charset=UTF-8\r\n"
+            b"Connection: close\r\n\r\n",
+        ),
+        (
+            Response(status_code=204, headers={"Connection": "close"}),
+            "HTTP/1.1",
+            "close",
+            True,
+            b"HTTP/1.1 204 No Content\r\nConnection: close\r\n\r\n",
+        ),
+        (
+            Response(status_code=204, headers={"connection": "Close"}),
+            "HTTP/1.0",
+            "keep-alive",
+            True,
+            b"HTTP/1.0 204 No Content\r\nconnection: Close\r\n\r\n",
+        ),
+    ],
+)
+def test_serialize_response(response, version, connection, include_body, expected):
+    data = serialize_response(response, version, connection, include_body)
+    assert data.startswith(status_line(version, response.status_code) + date_header())
+    assert strip_date(data) == expected
+    assert b"".join(serialize_response_parts(response, version, connection, include_body)) == data
+    assert data.startswith(serialize_head(response, version, connection))
+
+
+def test_check_response_headers():
+    # Validated once by the application, serialize_head relies on it
+    check_response_headers({"Location": "/a", "X-Name": "café"})
+    assert_raises(NanoHttpyError, lambda: check_response_headers({"Location": "/a\r\nSet-Cookie: evil=1"}), "Location")
+    assert_raises(NanoHttpyError, lambda: check_response_headers({"Bad Name": "1"}), "Bad Name")
+    assert_raises(NanoHttpyError, lambda: check_response_headers({"X-Price": "10€"}), "X-Price")
+    assert b"\r\nX-Name: caf\xe9\r\n" in serialize_head(Response(headers={"X-Name": "café"}))
+
+
+def test_response_connection():
+    assert response_connection(Response(headers={"CONNECTION": "Close"})) == "close"
+    assert response_connection(Response(headers={"Content-Type": "text/plain"})) is None
+
+
+def test_Response_slots():
+    res = PlainTextResponse("Hello")
+    assert not hasattr(res, "__dict__")
+    assert res.encoded_headers == {b"Content-Length": b"5", b"Content-Type": b"text/plain; charset=UTF-8"}
@@ -0,0 +1,89 @@
+# pylint: disable=multiple-statements,invalid-name,too-many-statements,use-implicit-booleaness-not-comparison
+import os
+import signal
+import socket
+import subprocess
+import sys
+import textwrap
+import time
+import urllib.request
+import pytest
+
+from nanohttpy.workers import create_server_socket
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="requires fork()")
+
+_APP = textwrap.dedent(
+    """
+    import os, sys
+    from nanohttpy import NanoHttpy
+
+    app = NanoHttpy()
+
+    @app.get("/pid")
+    def pid(req):
+        return str(os.getpid())
+
+    app.run(port=int(sys.argv[1]), workers=2)
+    """
+)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _get(url: str, timeout: float = 5.0) -> bytes:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as res:
+                return res.read()
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
+
+
+def test_create_server_socket():
+    sock = create_server_socket(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    try:
+        with socket.create_connection(("127.0.0.1", port)):
+            pass
+    finally:
+        sock.close()
+
+    if hasattr(socket, "SO_REUSEPORT"):
+        socks = [create_server_socket(("127.0.0.1", port), reuse_port=True) for _ in range(2)]
+        for s in socks:
+            s.close()
+
+
+def test_NanoHttpy_run_workers():
+    port = _free_port()
+    proc = subprocess.Popen(
+        [sys.executable, "-c", _APP, str(port)],
+        env={**os.environ, "PYTHONPATH": os.getcwd()},
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        killed_pid = int(_get(f"http://127.0.0.1:{port}/pid"))
+        assert killed_pid != proc.pid
+
+        # A crashed worker is replaced, and the other one keeps serving meanwhile
+        os.kill(killed_pid, signal.SIGKILL)
+        pids = set()
+        deadline = time.monotonic() + 10
+        while len(pids) < 2 and time.monotonic() < deadline:
+            pids.add(int(_get(f"http://127.0.0.1:{port}/pid")))
+            time.sleep(0.05)
+        assert len(pids) == 2 and killed_pid not in pids
+
+        proc.send_signal(signal.SIGTERM)
+        assert proc.wait(timeout=10) == 0
+    finally:
+        proc.kill()
+        proc.wait()
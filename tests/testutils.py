@@ -19,10 +19,10 @@ def make_request(
     method: str,
     full_path: str,
     request_version: str = "HTTP/1.1",
-    headers: HTTPHeaders = HTTPHeaders(),
+    headers: Optional[HTTPHeaders] = None,
     body: bytes = b"",
     path_parameters: Dict[str, str] = None
 ) -> Request:
-    req = Request(method, full_path, request_version, headers, body)
-    req.path_parameters = path_parameters or {} 
+    req = Request(method, full_path, request_version, headers or {}, body)
+    req.path_parameters = path_parameters or {}
     return req